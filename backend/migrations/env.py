@@ -18,6 +18,7 @@ from src.config import settings  # noqa: E402
 from src.auth import models as auth_models  # noqa: E402
 from src.stats import models as stats_models  # noqa: E402
 from src.theme import models as theme_models  # noqa: E402
+from src.content import models as content_models  # noqa: E402
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,52 @@
+"""add_unique_language_text_to_content
+
+Revision ID: 3f1c2a9d7e41
+Revises: b04749779960
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7e41'
+down_revision: Union[str, Sequence[str], None] = 'b04749779960'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ограничения предложения из src/content/service.py на момент миграции:
+# строка btree-индекса PostgreSQL не может быть больше ~2704 байт
+MAX_SENTENCE_LENGTH = 1000
+MAX_SENTENCE_BYTES = 2000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицы контента создаются через create_all при старте приложения,
+    # поэтому на свежей базе их может ещё не быть — индекс тогда создаст create_all
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    for table in ('words', 'sentences'):
+        if table not in tables:
+            continue
+        if table == 'sentences':
+            # Старые предложения длиннее лимита загрузчика не помещаются в строку
+            # индекса (language, text): без удаления создание индекса упадёт
+            op.execute(
+                f"DELETE FROM sentences WHERE length(text) > {MAX_SENTENCE_LENGTH} "
+                f"OR octet_length(text) > {MAX_SENTENCE_BYTES}"
+            )
+        # Удаляем дубликаты, оставляя запись с минимальным id
+        op.execute(
+            f"DELETE FROM {table} a USING {table} b "
+            f"WHERE a.language = b.language AND a.text = b.text AND a.id > b.id"
+        )
+        op.create_index(f'uq_{table}_language_text', table, ['language', 'text'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_sentences_language_text', table_name='sentences', if_exists=True)
+    op.drop_index('uq_words_language_text', table_name='words', if_exists=True)
@@ -0,0 +1,34 @@
+"""add_frequency_to_words
+
+Revision ID: 8b2e5d0c4a17
+Revises: 3f1c2a9d7e41
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e5d0c4a17'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9d7e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблица words создаётся через create_all при старте приложения,
+    # поэтому на свежей базе её может ещё не быть — колонку тогда создаст create_all
+    if 'words' not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.add_column('words', sa.Column('frequency', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'words' not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.drop_column('words', 'frequency')
@@ -0,0 +1,60 @@
+"""add_user_wpm_stats
+
+Revision ID: c71d4e9a2b06
+Revises: 8b2e5d0c4a17
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c71d4e9a2b06'
+down_revision: Union[str, Sequence[str], None] = '8b2e5d0c4a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_wpm_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('language', sa.Text(), nullable=False),
+    sa.Column('typing_mode', sa.Text(), nullable=False),
+    sa.Column('test_type', sa.Text(), nullable=False),
+    sa.Column('sessions_count', sa.Integer(), nullable=False),
+    sa.Column('wpm_sum', sa.Float(), nullable=False),
+    sa.Column('avg_wpm', sa.Float(), nullable=False),
+    sa.Column('best_wpm', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'language', 'typing_mode', 'test_type', name='uq_user_wpm_stats_category')
+    )
+    op.create_index(op.f('ix_user_wpm_stats_id'), 'user_wpm_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_user_wpm_stats_user_id'), 'user_wpm_stats', ['user_id'], unique=False)
+    op.create_index('ix_user_wpm_stats_best', 'user_wpm_stats', ['language', 'typing_mode', 'test_type', 'best_wpm'], unique=False)
+    op.create_index('ix_user_wpm_stats_avg', 'user_wpm_stats', ['language', 'typing_mode', 'test_type', 'avg_wpm'], unique=False)
+
+    # Заполняем агрегаты по уже сохранённым сессиям (один раз, дальше они обновляются при вставке)
+    op.execute("""
+        INSERT INTO user_wpm_stats
+            (user_id, language, typing_mode, test_type, sessions_count, wpm_sum, avg_wpm, best_wpm, updated_at)
+        SELECT user_id, language, typing_mode, test_type, COUNT(*), SUM(wpm), AVG(wpm), MAX(wpm), MAX(created_at)
+        FROM typing_sessions
+        WHERE language <> '' AND typing_mode <> '' AND test_type <> ''
+        GROUP BY user_id, language, typing_mode, test_type
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_wpm_stats_avg', table_name='user_wpm_stats')
+    op.drop_index('ix_user_wpm_stats_best', table_name='user_wpm_stats')
+    op.drop_index(op.f('ix_user_wpm_stats_user_id'), table_name='user_wpm_stats')
+    op.drop_index(op.f('ix_user_wpm_stats_id'), table_name='user_wpm_stats')
+    op.drop_table('user_wpm_stats')
@@ -0,0 +1,43 @@
+"""add_char_error_stats
+
+Revision ID: d4a8f1c3e590
+Revises: c71d4e9a2b06
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8f1c3e590'
+down_revision: Union[str, Sequence[str], None] = 'c71d4e9a2b06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Статистика по уже сохранённым историям заполняется скриптом
+    # python -m scripts.backfill_char_error_stats (разбор JSON истории не переносим между БД)
+    op.create_table('char_error_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('char', sa.Text(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'char', name='uq_char_error_stats_user_char')
+    )
+    op.create_index(op.f('ix_char_error_stats_id'), 'char_error_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_char_error_stats_user_id'), 'char_error_stats', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_char_error_stats_user_id'), table_name='char_error_stats')
+    op.drop_index(op.f('ix_char_error_stats_id'), table_name='char_error_stats')
+    op.drop_table('char_error_stats')
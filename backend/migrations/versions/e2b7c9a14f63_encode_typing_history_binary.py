@@ -0,0 +1,186 @@
+"""encode_typing_history_binary
+
+Revision ID: e2b7c9a14f63
+Revises: d4a8f1c3e590
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c9a14f63'
+down_revision: Union[str, Sequence[str], None] = 'd4a8f1c3e590'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Сколько сессий конвертировать за один запрос
+BATCH_SIZE = 1000
+
+# Формат v1 из src/stats/history_codec.py, зафиксированный на момент миграции:
+# миграция не должна меняться вместе с кодом приложения
+HISTORY_FORMAT_VERSION = 1
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated typing history")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_history(history) -> bytes:
+    """Закодировать историю (список слов из словарей {char, correct, time}) в формат v1"""
+    word_lengths, chars, correct, times = [], [], [], []
+    for word in history:
+        word_lengths.append(len(word))
+        for c in word:
+            chars.append(c.get("char", "") or "")
+            correct.append(bool(c.get("correct", True)))
+            times.append(int(round(c.get("time", 0) or 0)))
+
+    out = bytearray([HISTORY_FORMAT_VERSION])
+    _write_varint(out, len(word_lengths))
+    for length in word_lengths:
+        _write_varint(out, length)
+    for char in chars:
+        if len(char) == 1:
+            _write_varint(out, ord(char) + 1)
+        else:
+            raw = char.encode("utf-8")
+            out.append(0)
+            _write_varint(out, len(raw))
+            out += raw
+    bitset = bytearray((len(correct) + 7) // 8)
+    for index, value in enumerate(correct):
+        if value:
+            bitset[index >> 3] |= 1 << (index & 7)
+    out += bitset
+    previous = 0
+    for time in times:
+        delta = time - previous
+        previous = time
+        _write_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+    return bytes(out)
+
+
+def decode_history(data: bytes) -> list:
+    """Раскодировать историю формата v1 в список слов из словарей {char, correct, time}"""
+    data = bytes(data)
+    if not data or data[0] != HISTORY_FORMAT_VERSION:
+        raise ValueError("Unknown typing history format")
+    words_count, pos = _read_varint(data, 1)
+    word_lengths = []
+    for _ in range(words_count):
+        length, pos = _read_varint(data, pos)
+        word_lengths.append(length)
+    total = sum(word_lengths)
+
+    chars = []
+    for _ in range(total):
+        code, pos = _read_varint(data, pos)
+        if code:
+            chars.append(chr(code - 1))
+        else:
+            length, pos = _read_varint(data, pos)
+            if pos + length > len(data):
+                raise ValueError("Truncated typing history")
+            chars.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+
+    bitset_end = pos + (total + 7) // 8
+    if bitset_end > len(data):
+        raise ValueError("Truncated typing history")
+    bitset = data[pos:bitset_end]
+    pos = bitset_end
+
+    history = []
+    index = 0
+    time = 0
+    for length in word_lengths:
+        word = []
+        for _ in range(length):
+            value, pos = _read_varint(data, pos)
+            time += (value >> 1) ^ -(value & 1)
+            word.append({
+                "char": chars[index],
+                "correct": bool(bitset[index >> 3] & (1 << (index & 7))),
+                "time": time,
+            })
+            index += 1
+        history.append(word)
+    if pos != len(data):
+        raise ValueError("Trailing bytes in typing history")
+    return history
+
+
+def _convert(source: str, target: str, convert) -> None:
+    """Переложить историю из столбца source в target пачками по id"""
+    conn = op.get_bind()
+    sessions = sa.table(
+        'typing_sessions', sa.column('id', sa.Integer), sa.column(source), sa.column(target)
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(sessions.c.id, sessions.c[source])
+            .where(sessions.c.id > last_id)
+            .order_by(sessions.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            sessions.update().where(sessions.c.id == sa.bindparam('_id')).values({target: sa.bindparam('_value')}),
+            [{'_id': row[0], '_value': convert(row[1])} for row in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def _json_to_binary(history_json):
+    try:
+        return encode_history(json.loads(history_json))
+    except (ValueError, TypeError, AttributeError):
+        # Повреждённая история и раньше пропускалась всеми читателями
+        return encode_history([])
+
+
+def _binary_to_json(history_data):
+    try:
+        return json.dumps(decode_history(history_data))
+    except ValueError:
+        return '[]'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('typing_sessions', sa.Column('history_data', sa.LargeBinary(), nullable=True))
+    _convert('history', 'history_data', _json_to_binary)
+    op.drop_column('typing_sessions', 'history')
+    op.alter_column('typing_sessions', 'history_data', new_column_name='history', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('typing_sessions', sa.Column('history_json', sa.Text(), nullable=True))
+    _convert('history', 'history_json', _binary_to_json)
+    op.drop_column('typing_sessions', 'history')
+    op.alter_column('typing_sessions', 'history_json', new_column_name='history', nullable=False)
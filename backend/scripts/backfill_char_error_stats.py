@@ -0,0 +1,80 @@
+"""
+Скрипт для заполнения статистики ошибок по символам (char_error_stats) по уже сохранённым сессиям.
+Новые сессии учитываются автоматически при сохранении; скрипт нужен один раз после миграции.
+Скрипт идемпотентен: статистика каждого пользователя пересчитывается заново.
+Использование:
+    python -m scripts.backfill_char_error_stats
+    python -m scripts.backfill_char_error_stats --user-id 42
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import AsyncSessionLocal
+import src.auth.models  # noqa: F401  регистрируем User до использования связей
+from src.stats.models import CharErrorStat, TypingSession
+from src.stats.service import record_char_errors
+from src.stats.utils import count_char_errors_encoded
+
+# Сколько историй читать из БД за раз
+BATCH_SIZE = 500
+
+
+async def backfill_user(db: AsyncSession, user_id: int) -> int:
+    """
+    Пересчитать статистику ошибок пользователя по всем его сессиям
+
+    Returns:
+        Количество различных символов в статистике
+    """
+    counts: dict[str, list[int]] = {}
+    result = await db.stream(
+        select(TypingSession.history)
+        .where(TypingSession.user_id == user_id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    async for history_data in result.scalars():
+        for char, (total, errors) in count_char_errors_encoded(history_data).items():
+            stat = counts.setdefault(char, [0, 0])
+            stat[0] += total
+            stat[1] += errors
+
+    await db.execute(delete(CharErrorStat).where(CharErrorStat.user_id == user_id))
+    await record_char_errors(db, user_id, counts)
+    await db.commit()
+    return len(counts)
+
+
+async def backfill(user_id: int | None = None) -> None:
+    """Пересчитать статистику всех пользователей с сессиями (или одного пользователя)"""
+    async with AsyncSessionLocal() as db:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            result = await db.execute(select(TypingSession.user_id).distinct())
+            user_ids = list(result.scalars().all())
+
+        print(f"📊 Пользователей для пересчёта: {len(user_ids)}")
+        for index, uid in enumerate(user_ids, start=1):
+            chars = await backfill_user(db, uid)
+            print(f"✓ [{index}/{len(user_ids)}] пользователь {uid}: {chars} символов")
+
+    print("✅ Статистика ошибок заполнена")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Заполнить char_error_stats по сохранённым сессиям")
+    parser.add_argument("--user-id", type=int, help="Пересчитать только этого пользователя")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(backfill(args.user_id))
@@ -1,6 +1,7 @@
 """
-Скрипт для загрузки предложений из sentences.json в базу данных через API загрузки контента.
-Запуск: python -m scripts.load_sentences
+Скрипт для загрузки предложений из sentences.json в базу данных через очередь загрузки контента.
+Запуск: python -m scripts.load_sentences           # поставить задачу в очередь Redis для воркеров API
+        python -m scripts.load_sentences --inline  # обработать в этом процессе (API увидит новый контент после перезапуска)
 """
 import asyncio
 import json
@@ -12,13 +13,21 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import AsyncSessionLocal
-from src.content.service import upload_text_content
+from src.redis_client import redis_client
+from src.content.jobs import ingestion_queue, JobStatus
 import src.stats.models  # ensure TypingSession and related models are registered before importing User
 from src.auth.models import User, Role
 from sqlalchemy import select
 
-async def load_sentences_from_json():
-    """Загружает предложения из sentences.json через сервис загрузки контента"""
+async def load_sentences_from_json(inline: bool = False):
+    """
+    Загружает предложения из sentences.json через очередь загрузки контента
+
+    По умолчанию задача уходит воркерам API: они сохраняют контент и сразу
+    пополняют свои in-memory пулы слов и предложений. При обработке в этом
+    процессе (inline или без Redis) пулы запущенного API о новых строках
+    не узнают до его перезапуска.
+    """
     
     # Путь к файлу с предложениями (в той же директории, что и скрипт)
     json_path = Path(__file__).parent / "sentences.json"
@@ -62,22 +71,38 @@ async def load_sentences_from_json():
         
         print(f"👤 Используем пользователя: {admin_user.username} (ID: {admin_user.id})")
         
-        try:
-            # Загружаем текст через сервис
-            print("⏳ Обработка текста и загрузка в базу данных...")
-            words_count, sentences_count = await upload_text_content(
-                db=session,
-                raw_text=raw_text,
-                language="ru"
-            )
-            
-            print("\n✅ Успешно загружено!")
-            print(f"   📝 Слов: {words_count}")
-            print(f"   📄 Предложений: {sentences_count}")
-            
-        except Exception as e:
-            print(f"\n❌ Ошибка при загрузке: {e}")
-            raise
+        if not inline:
+            await redis_client.connect()
+            try:
+                await redis_client.redis.ping()
+            except Exception as e:
+                # Без Redis задачу некому забрать — обрабатываем сами
+                print(f"⚠️  Redis недоступен ({e}), обрабатываем текст в этом процессе")
+                await redis_client.disconnect()
+                # Очередь без Redis работает в памяти процесса
+                redis_client.redis = None
+            else:
+                # Отдаём задачу воркерам API через Redis, прогресс — GET /api/content/jobs/{id}
+                job_id = await ingestion_queue.enqueue(raw_text, language="ru")
+                await redis_client.disconnect()
+                print(f"\n📬 Задача поставлена в очередь: {job_id}")
+                print(f"   Прогресс: GET /api/content/jobs/{job_id}")
+                return
+        
+        # Загружаем текст тем же путём, что и фоновые задачи API
+        print("⏳ Обработка текста и загрузка в базу данных...")
+        print("   Запущенный API увидит новый контент только после перезапуска")
+        job_id = await ingestion_queue.enqueue(raw_text, language="ru")
+        job = await ingestion_queue.process_job(session, job_id)
+        
+        if job is None or job["status"] != JobStatus.DONE:
+            error = job.get("error") if job else "job not found"
+            print(f"\n❌ Ошибка при загрузке: {error}")
+            raise RuntimeError(error)
+        
+        print("\n✅ Успешно загружено!")
+        print(f"   📝 Слов: {job['words_created']}")
+        print(f"   📄 Предложений: {job['sentences_created']}")
 
 
 if __name__ == "__main__":
@@ -86,7 +111,7 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
     
-    asyncio.run(load_sentences_from_json())
+    asyncio.run(load_sentences_from_json(inline="--inline" in sys.argv))
     
     print()
     print("=" * 60)
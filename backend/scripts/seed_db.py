@@ -14,6 +14,7 @@ from src.database import AsyncSessionLocal, engine, Base
 from src.auth.models import User
 from src.theme.models import Theme
 from src.stats.models import TypingSession
+from src.stats.history_codec import encode_history
 from src.auth.utils import get_password_hash
 
 
@@ -98,7 +99,7 @@ def generate_typing_session(user_id: int, days_ago: int = 0) -> TypingSession:
         accuracy=accuracy,
         duration=duration,
         words=json.dumps(words),
-        history=json.dumps(history),
+        history=encode_history(history),
         typing_mode=mode,
         language=language,
         created_at=created_at
@@ -3,9 +3,13 @@ from sqlalchemy import select, delete, update
 from fastapi import HTTPException, status
 
 from ..auth.models import User
-from ..stats.models import TypingSession, CoinTransaction
+from ..stats.models import TypingSession, CoinTransaction, UserWpmStat, CharErrorStat
 from ..theme.models import Theme
-from ..stats.service import broadcast_leaderboard_update
+from ..stats.leaderboard import coin_leaderboard
+from ..stats.broadcaster import leaderboard_broadcaster
+from ..stats.service import apply_coin_delta, publish_rank_update, record_char_errors
+from ..stats.utils import count_char_errors_encoded
+from ..stats.wpm_leaderboard import wpm_leaderboard
 from ..redis_client import redis_client
 from .schemas import UserAdminUpdate
 
@@ -24,20 +28,22 @@ async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
 
 async def update_user_coins(db: AsyncSession, user_id: int, amount: int) -> User:
     """Добавить или вычесть монеты пользователю"""
-    user = await get_user_by_id(db, user_id)
-    if getattr(user, "shilka_coins", None) is None:
-        user.shilka_coins = 0
-    user.shilka_coins += amount
-    if user.shilka_coins < 0:
-        user.shilka_coins = 0  # Не допускаем отрицательный баланс
+    # Баланс меняется атомарно в БД и не уходит ниже нуля
+    user = await apply_coin_delta(db, user_id, amount)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {user_id} not found"
+        )
     await db.commit()
-    await db.refresh(user)
+    await coin_leaderboard.set_coins(user.id, user.shilka_coins)
     
     # Инвалидируем кэш лидерборда
     await redis_client.invalidate_pattern("fastapi-cache:get_leaderboard*")
     
     # Отправляем обновление через WebSocket
-    await broadcast_leaderboard_update(db)
+    await publish_rank_update(db, user.id)
+    await leaderboard_broadcaster.request_update()
     
     return user
 
@@ -86,6 +92,7 @@ async def update_user(db: AsyncSession, user_id: int, update_data: UserAdminUpda
     
     await db.commit()
     await db.refresh(user)
+    await coin_leaderboard.set_coins(user.id, user.shilka_coins)
     return user
 
 
@@ -93,9 +100,11 @@ async def delete_user(db: AsyncSession, user_id: int) -> None:
     """Удалить пользователя"""
     user = await get_user_by_id(db, user_id)
     # Удаляем зависимые записи вручную, чтобы не попытаться обнулить обязательные FK
-    # Сначала транзакции монет, затем сессии набора
+    # Сначала транзакции монет, затем сессии набора и их агрегаты
     await db.execute(delete(CoinTransaction).where(CoinTransaction.user_id == user_id))
     await db.execute(delete(TypingSession).where(TypingSession.user_id == user_id))
+    await db.execute(delete(UserWpmStat).where(UserWpmStat.user_id == user_id))
+    await db.execute(delete(CharErrorStat).where(CharErrorStat.user_id == user_id))
 
     # Удаляем/обнуляем связанные темы: сначала снимаем ссылку selected_theme_id у пользователей,
     # у которых выбрана тема, принадлежащая удаляемому пользователю, затем удаляем сами темы.
@@ -118,12 +127,13 @@ async def delete_user(db: AsyncSession, user_id: int) -> None:
     await db.delete(user)
     try:
         await db.commit()
+        await coin_leaderboard.remove(user_id)
         
         # Инвалидируем кэш лидерборда
         await redis_client.invalidate_pattern("fastapi-cache:get_leaderboard*")
         
         # Отправляем обновление через WebSocket
-        await broadcast_leaderboard_update(db)
+        await leaderboard_broadcaster.request_update()
         
     except Exception as e:
         # Возвращаем понятную ошибку вместо 500 с сырым стектрейсом
@@ -153,6 +163,13 @@ async def delete_session(db: AsyncSession, session_id: int) -> None:
             detail=f"Session with id {session_id} not found"
         )
     await db.delete(session)
+    # Вычитаем символы сессии из статистики ошибок пользователя
+    await record_char_errors(db, session.user_id, count_char_errors_encoded(session.history), sign=-1)
+    category = wpm_leaderboard.category(session)
+    if category is not None:
+        # Лучший результат нельзя «вычесть» — пересчитываем агрегаты категории
+        await db.flush()
+        await wpm_leaderboard.refresh(db, session.user_id, *category)
     await db.commit()
 
 
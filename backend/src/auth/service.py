@@ -8,6 +8,7 @@ from fastapi import HTTPException, status
 from . import models
 from . import utils
 from .schemas import UserCreate
+from ..stats.leaderboard import coin_leaderboard
 
 
 async def register_user(user: UserCreate, db: AsyncSession):
@@ -33,6 +34,7 @@ async def register_user(user: UserCreate, db: AsyncSession):
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    await coin_leaderboard.set_coins(db_user.id, db_user.shilka_coins)
     return db_user
 
 
@@ -17,5 +17,31 @@ settings = {
         "host": os.getenv("REDIS_HOST", "redis"),
         "port": int(os.getenv("REDIS_PORT", "6379")),
         "db": int(os.getenv("REDIS_DB", "0"))
+    },
+    "leaderboard": {
+        # Сколько лучших пользователей отдаёт лидерборд
+        "size": int(os.getenv("LEADERBOARD_SIZE", "100")),
+        # Не чаще одной рассылки обновления лидерборда за интервал (мс) на все воркеры
+        "broadcast_interval_ms": int(os.getenv("LEADERBOARD_BROADCAST_INTERVAL_MS", "250"))
+    },
+    "outbox": {
+        # Как часто воркер проверяет outbox, если его не разбудили (мс)
+        "poll_interval_ms": int(os.getenv("OUTBOX_POLL_INTERVAL_MS", "1000")),
+        # Сколько событий обрабатывается за один проход
+        "batch_size": int(os.getenv("OUTBOX_BATCH_SIZE", "100")),
+        # После стольких неудачных попыток событие остаётся в таблице для разбора
+        "max_attempts": int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    },
+    "websocket": {
+        # Сколько неотправленных сообщений может накопиться у клиента, прежде чем его отключат
+        "send_queue_size": int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "32"))
+    },
+    "content": {
+        # Количество процессов для разбора загружаемых текстов (0 — разбирать в event loop)
+        "process_workers": int(os.getenv("CONTENT_PROCESS_WORKERS", "2")),
+        # Сколько готовых наборов держать для каждой комбинации (язык, режим, количество)
+        "bundle_ring_size": int(os.getenv("CONTENT_BUNDLE_RING_SIZE", "32")),
+        # Максимальное количество поддерживаемых комбинаций (регистрирует только сервер)
+        "bundle_max_keys": int(os.getenv("CONTENT_BUNDLE_MAX_KEYS", "16"))
     }
 }
\ No newline at end of file
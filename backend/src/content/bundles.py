@@ -0,0 +1,194 @@
+"""
+Заранее подготовленные наборы контента для мгновенного старта теста
+"""
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .pool import WordPool, word_pool, sentence_pool
+
+logger = logging.getLogger(__name__)
+
+# Как часто обработчик проверяет кольца, даже если его не будили (секунды)
+REPLENISH_INTERVAL = 1.0
+
+
+class BundleMode:
+    WORDS = "words"
+    SENTENCES = "sentences"
+    # Предложения, суммарно дающие count слов (GET /sentences?words=)
+    SENTENCE_WORDS = "sentence_words"
+
+
+BundleKey = Tuple[str, str, int]
+
+# Комбинации, которые фронтенд запрашивает чаще всего: готовим их с самого старта
+DEFAULT_BUNDLES: List[BundleKey] = [
+    (language, mode, count)
+    for language in ("ru", "en")
+    for mode, count in ((BundleMode.WORDS, 25), (BundleMode.SENTENCES, 10), (BundleMode.SENTENCES, 5))
+]
+
+
+def serialize(items: List[tuple]) -> bytes:
+    """Сериализовать записи пула так же, как это делает JSONResponse"""
+    return json.dumps(
+        [item._asdict() for item in items],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class BundleStore:
+    """
+    Кольца готовых JSON-ответов для каждой комбинации (язык, режим, количество).
+
+    Старт теста — это извлечение уже сериализованного ответа из кольца:
+    без обращения к БД, выборки и сериализации. Кольца поддерживаются
+    только для комбинаций, зарегистрированных сервером (DEFAULT_BUNDLES):
+    запрос с произвольным количеством не создаёт кольцо, иначе любой
+    анонимный клиент мог бы закрепить в памяти max_keys колец крупных
+    наборов. Остальные комбинации выбираются из in-memory пулов на месте.
+    Каждый набор помнит версию пула, из которой собран, и отбрасывается,
+    если пул с тех пор изменился.
+    """
+
+    def __init__(self, ring_size: int, max_keys: int):
+        self.ring_size = ring_size
+        self.max_keys = max_keys
+        self._rings: Dict[BundleKey, Deque[Tuple[int, bytes]]] = {}
+        self._wakeup = asyncio.Event()
+        self._worker_task: Optional[asyncio.Task] = None
+        self._is_running = False
+
+    @staticmethod
+    def _pool(mode: str) -> WordPool:
+        return word_pool if mode == BundleMode.WORDS else sentence_pool
+
+    def register(self, language: str, mode: str, count: int) -> bool:
+        """
+        Начать поддерживать кольцо для комбинации
+
+        Returns:
+            False, если достигнут лимит комбинаций
+        """
+        key = (language, mode, count)
+        if key not in self._rings:
+            if len(self._rings) >= self.max_keys:
+                return False
+            self._rings[key] = deque()
+        self._wakeup.set()
+        return True
+
+    def pop(self, language: str, mode: str, count: int) -> Optional[bytes]:
+        """
+        Взять готовый ответ из кольца
+
+        Returns:
+            Сериализованный JSON или None, если готового набора нет
+            или комбинация не зарегистрирована
+        """
+        ring = self._rings.get((language, mode, count))
+        if ring is None:
+            return None
+
+        version = self._pool(mode).version(language)
+        while ring:
+            bundle_version, payload = ring.popleft()
+            if bundle_version == version:
+                if len(ring) < self.ring_size // 2:
+                    self._wakeup.set()
+                return payload
+        self._wakeup.set()
+        return None
+
+    def build(self, language: str, mode: str, count: int) -> Optional[bytes]:
+        """Собрать один набор из пула (None, если пул языка пуст или не загружен)"""
+        pool = self._pool(mode)
+        if not pool.size(language):
+            return None
+        if mode == BundleMode.WORDS:
+            items = word_pool.sample(language, count)
+        elif mode == BundleMode.SENTENCES:
+            items = sentence_pool.sample(language, count)
+        else:
+            items = sentence_pool.sample_words(language, count)
+        return serialize(items)
+
+    async def replenish(self) -> int:
+        """
+        Дополнить все кольца до ring_size
+
+        Returns:
+            Количество собранных наборов
+        """
+        built = 0
+        for key, ring in list(self._rings.items()):
+            language, mode, count = key
+            version = self._pool(mode).version(language)
+            # Наборы из устаревшей версии пула больше не будут выданы
+            while ring and ring[0][0] != version:
+                ring.popleft()
+            while len(ring) < self.ring_size:
+                payload = self.build(language, mode, count)
+                if payload is None:
+                    break
+                ring.append((version, payload))
+                built += 1
+                # Отдаём управление event loop после каждого набора: сборка крупного
+                # набора занимает заметное время, а колец и наборов в них много
+                await asyncio.sleep(0)
+        return built
+
+    def available(self, language: str, mode: str, count: int) -> int:
+        """Количество готовых наборов в кольце комбинации"""
+        ring = self._rings.get((language, mode, count))
+        return len(ring) if ring is not None else 0
+
+    async def start_worker(self):
+        """Запустить фоновое пополнение колец"""
+        if self._is_running:
+            return
+        for key in DEFAULT_BUNDLES:
+            self.register(*key)
+        self._is_running = True
+        self._worker_task = asyncio.create_task(self._work())
+        logger.info("Started content bundle replenisher")
+
+    def stop_worker(self):
+        """Остановить фоновое пополнение колец"""
+        self._is_running = False
+        if self._worker_task:
+            self._worker_task.cancel()
+            logger.info("Stopped content bundle replenisher")
+
+    async def _work(self):
+        try:
+            while self._is_running:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=REPLENISH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                try:
+                    await self.replenish()
+                except Exception as e:
+                    logger.error(f"Error in bundle replenisher: {e}")
+        except asyncio.CancelledError:
+            logger.info("Bundle replenisher cancelled")
+        finally:
+            self._is_running = False
+
+    def clear(self):
+        """Сбросить все кольца и зарегистрированные комбинации"""
+        self._rings = {}
+
+
+# Глобальное хранилище готовых наборов
+bundle_store = BundleStore(
+    ring_size=settings["content"]["bundle_ring_size"],
+    max_keys=settings["content"]["bundle_max_keys"],
+)
@@ -0,0 +1,271 @@
+"""
+Фоновая очередь загрузки контента с отчётом о прогрессе
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import AsyncSessionLocal
+from ..redis_client import redis_client
+from .processing import text_processing_pool
+from .service import STREAM_BLOCK_SIZE, save_content
+from .utils import split_into_blocks
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "content:jobs:queue"
+JOB_KEY = "content:job:{job_id}"
+JOB_TEXT_KEY = "content:job:{job_id}:text"
+# Выполняемые задачи: score — время последнего обновления прогресса
+ACTIVE_KEY = "content:jobs:active"
+
+# Сколько хранится состояние задачи и её текст (сутки)
+JOB_TTL = 24 * 60 * 60
+# Задача, не обновлявшая прогресс дольше этого времени, брошена упавшим воркером (секунды)
+JOB_LEASE = 10 * 60
+# Как часто воркер ищет брошенные задачи (секунды)
+ORPHAN_CHECK_INTERVAL = 60
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class IngestionQueue:
+    """
+    Очередь задач загрузки текста.
+
+    Задачи и их состояние хранятся в Redis, так что задачу может забрать
+    любой воркер, а прогресс виден из любого процесса. Без Redis
+    используется локальная очередь в памяти процесса.
+
+    Текст задачи удаляется только вместе с её завершением (done или failed).
+    Выполняемая задача обновляет отметку в ACTIVE_KEY после каждого блока;
+    задачу, отметка которой старше JOB_LEASE (воркер упал или перезапущен),
+    воркер помечает failed при старте и затем раз в ORPHAN_CHECK_INTERVAL.
+    Заново с начала она не запускается: уже закоммиченные блоки увеличили
+    частоты слов, поэтому повтор — новая задача с тем же текстом.
+    """
+
+    def __init__(self):
+        self._local_queue: asyncio.Queue = asyncio.Queue()
+        self._local_jobs: Dict[str, dict] = {}
+        self._local_texts: Dict[str, str] = {}
+        self._worker_task: Optional[asyncio.Task] = None
+        self._is_running = False
+        self._next_orphan_check = 0.0
+
+    async def _save(self, job_id: str, fields: dict):
+        fields = {key: str(value) for key, value in fields.items()}
+        if redis_client.redis:
+            await redis_client.hset(JOB_KEY.format(job_id=job_id), fields, expire=JOB_TTL)
+        else:
+            self._local_jobs.setdefault(job_id, {}).update(fields)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Получить состояние задачи (или None, если задачи нет)"""
+        if redis_client.redis:
+            job = await redis_client.hgetall(JOB_KEY.format(job_id=job_id))
+        else:
+            job = self._local_jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def enqueue(self, raw_text: str, language: str) -> str:
+        """
+        Поставить текст в очередь на загрузку
+
+        Returns:
+            Идентификатор задачи
+        """
+        job_id = uuid.uuid4().hex
+        await self._save(job_id, {
+            "id": job_id,
+            "status": JobStatus.QUEUED,
+            "language": language,
+            "total_chars": len(raw_text),
+            "processed_chars": 0,
+            "words_processed": 0,
+            "words_created": 0,
+            "sentences_created": 0,
+            "created_at": time.time(),
+        })
+        if redis_client.redis:
+            await redis_client.set(JOB_TEXT_KEY.format(job_id=job_id), raw_text, expire=JOB_TTL)
+            await redis_client.rpush(QUEUE_KEY, job_id)
+        else:
+            self._local_texts[job_id] = raw_text
+            self._local_queue.put_nowait(job_id)
+        logger.info(f"Enqueued ingestion job {job_id} ({len(raw_text)} chars, language {language})")
+        return job_id
+
+    async def _pop(self, timeout: int = 1) -> Optional[str]:
+        if redis_client.redis:
+            return await redis_client.blpop(QUEUE_KEY, timeout=timeout)
+        try:
+            return await asyncio.wait_for(self._local_queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _get_text(self, job_id: str) -> Optional[str]:
+        if redis_client.redis:
+            return await redis_client.get(JOB_TEXT_KEY.format(job_id=job_id))
+        return self._local_texts.get(job_id)
+
+    async def _heartbeat(self, job_id: str):
+        if redis_client.redis:
+            await redis_client.zadd(ACTIVE_KEY, {job_id: time.time()})
+
+    async def _finish(self, job_id: str, fields: dict):
+        """Записать итог задачи (done или failed) и удалить её текст"""
+        await self._save(job_id, {**fields, "finished_at": time.time()})
+        if redis_client.redis:
+            await redis_client.delete(JOB_TEXT_KEY.format(job_id=job_id))
+            await redis_client.zrem(ACTIVE_KEY, job_id)
+        else:
+            self._local_texts.pop(job_id, None)
+
+    async def fail_orphaned_jobs(self) -> int:
+        """
+        Пометить failed задачи, брошенные упавшим или перезапущенным воркером
+
+        Returns:
+            Количество помеченных задач
+        """
+        if not redis_client.redis:
+            return 0
+        stale_before = time.time() - JOB_LEASE
+        failed = 0
+        for job_id, heartbeat in await redis_client.zrevrange(ACTIVE_KEY, 0, -1, withscores=True):
+            if heartbeat >= stale_before:
+                continue
+            logger.warning(f"Ingestion job {job_id} was abandoned by its worker, marking failed")
+            await self._finish(job_id, {"status": JobStatus.FAILED, "error": "Interrupted by worker restart"})
+            failed += 1
+        return failed
+
+    async def process_job(self, db: AsyncSession, job_id: str) -> Optional[dict]:
+        """
+        Выполнить задачу: разобрать текст блоками и сохранить каждый блок
+        отдельным коммитом, обновляя прогресс после каждого блока
+
+        Returns:
+            Итоговое состояние задачи
+        """
+        job = await self.get(job_id)
+        raw_text = await self._get_text(job_id)
+        if job is None or raw_text is None or job["status"] != JobStatus.QUEUED:
+            logger.warning(f"Ingestion job {job_id} not found or already processed")
+            return None
+
+        language = job["language"]
+        processed_chars = words_processed = words_created = sentences_created = 0
+        await self._heartbeat(job_id)
+        await self._save(job_id, {"status": JobStatus.RUNNING, "started_at": time.time()})
+
+        try:
+            for block in split_into_blocks(raw_text, STREAM_BLOCK_SIZE):
+                parsed = await text_processing_pool.parse(block, language)
+                if parsed.cleaned:
+                    block_words, block_sentences = await save_content(
+                        db, language, parsed.words, parsed.sentences, parsed.sentence_word_counts,
+                        parsed.word_frequencies
+                    )
+                    words_processed += len(parsed.cleaned.split())
+                    words_created += block_words
+                    sentences_created += block_sentences
+                processed_chars += len(block)
+                await self._save(job_id, {
+                    "processed_chars": processed_chars,
+                    "words_processed": words_processed,
+                    "words_created": words_created,
+                    "sentences_created": sentences_created,
+                })
+                await self._heartbeat(job_id)
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {e}", exc_info=True)
+            await db.rollback()
+            await self._finish(job_id, {"status": JobStatus.FAILED, "error": str(e)})
+        else:
+            # Пробелы между блоками не входят в блоки, поэтому фиксируем 100% явно
+            await self._finish(job_id, {"status": JobStatus.DONE, "processed_chars": len(raw_text)})
+            logger.info(
+                f"Ingestion job {job_id} done: {words_created} words, {sentences_created} sentences"
+            )
+        return await self.get(job_id)
+
+    async def start_worker(self):
+        """Запустить фоновый обработчик очереди"""
+        if self._is_running:
+            return
+        self._is_running = True
+        self._worker_task = asyncio.create_task(self._work())
+        logger.info("Started content ingestion worker")
+
+    def stop_worker(self):
+        """Остановить фоновый обработчик очереди"""
+        self._is_running = False
+        if self._worker_task:
+            self._worker_task.cancel()
+            logger.info("Stopped content ingestion worker")
+
+    async def _work(self):
+        try:
+            while self._is_running:
+                try:
+                    if time.time() >= self._next_orphan_check:
+                        self._next_orphan_check = time.time() + ORPHAN_CHECK_INTERVAL
+                        await self.fail_orphaned_jobs()
+                    job_id = await self._pop()
+                    if job_id is None:
+                        continue
+                    async with AsyncSessionLocal() as db:
+                        await self.process_job(db, job_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in ingestion worker: {e}")
+                    await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            logger.info("Ingestion worker cancelled")
+        finally:
+            self._is_running = False
+
+
+def describe_job(job: dict) -> dict:
+    """Преобразовать сохранённое состояние задачи в ответ API с прогрессом и скоростью"""
+    total_chars = int(job.get("total_chars", 0))
+    processed_chars = int(job.get("processed_chars", 0))
+    words_processed = int(job.get("words_processed", 0))
+    started_at = float(job["started_at"]) if job.get("started_at") else None
+    finished_at = float(job["finished_at"]) if job.get("finished_at") else None
+
+    words_per_second = 0.0
+    if started_at is not None:
+        elapsed = (finished_at or time.time()) - started_at
+        if elapsed > 0:
+            words_per_second = round(words_processed / elapsed, 2)
+
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "language": job["language"],
+        "total_chars": total_chars,
+        "processed_chars": processed_chars,
+        "progress": round(processed_chars / total_chars, 4) if total_chars else 1.0,
+        "words_processed": words_processed,
+        "words_per_second": words_per_second,
+        "words_created": int(job.get("words_created", 0)),
+        "sentences_created": int(job.get("sentences_created", 0)),
+        "error": job.get("error"),
+    }
+
+
+# Глобальный экземпляр очереди загрузки
+ingestion_queue = IngestionQueue()
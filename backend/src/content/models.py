@@ -14,12 +14,15 @@ class Word(Base):
     id = Column(Integer, primary_key=True, index=True)
     language = Column(String(10), nullable=False, index=True)  # 'ru', 'en', etc.
     text = Column(String(100), nullable=False)  # Очищенное слово
+    frequency = Column(Integer, nullable=False, default=1, server_default="1")  # Частота слова в загруженных текстах
     is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Составной индекс для быстрого выбора случайных активных слов по языку
+    # Составной индекс для быстрого выбора случайных активных слов по языку;
+    # уникальный индекс нужен для INSERT ... ON CONFLICT DO NOTHING при загрузке
     __table_args__ = (
         Index('ix_words_language_active', 'language', 'is_active'),
+        Index('uq_words_language_text', 'language', 'text', unique=True),
     )
 
 
@@ -34,7 +37,9 @@ class Sentence(Base):
     is_active = Column(Boolean, default=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Составной индекс для быстрого выбора случайных активных предложений по языку
+    # Составной индекс для быстрого выбора случайных активных предложений по языку;
+    # уникальный индекс нужен для INSERT ... ON CONFLICT DO NOTHING при загрузке
     __table_args__ = (
         Index('ix_sentences_language_active', 'language', 'is_active'),
+        Index('uq_sentences_language_text', 'language', 'text', unique=True),
     )
@@ -0,0 +1,421 @@
+"""
+In-memory пулы контента для выдачи случайных слов и предложений без обращения к БД
+"""
+import asyncio
+import itertools
+import logging
+import random
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Word, Sentence
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз пробуем взять неиспользованное предложение из корзины,
+# прежде чем перейти к соседней корзине
+_BUCKET_ATTEMPTS = 3
+
+# Во сколько раз больше попыток, чем нужно слов, делаем при взвешенной
+# выборке без повторов, прежде чем добрать остаток равномерно
+_WEIGHTED_ATTEMPTS_FACTOR = 4
+
+# Общий счётчик версий: версия языка меняется при любом изменении его пула
+# и никогда не повторяется, даже после clear()
+_versions = itertools.count(1)
+
+
+class PooledWord(NamedTuple):
+    """Лёгкое представление активного слова из пула"""
+    id: int
+    text: str
+    language: str
+    is_active: bool = True
+
+
+class PooledSentence(NamedTuple):
+    """Лёгкое представление активного предложения из пула"""
+    id: int
+    text: str
+    language: str
+    word_count: int
+    is_active: bool = True
+
+
+class _LanguageWords:
+    """Массивы id, текстов и частот активных слов одного языка"""
+
+    __slots__ = ("ids", "texts", "weights", "total_weight", "positions", "_alias")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.texts: List[str] = []
+        self.weights = array("q")
+        self.total_weight = 0
+        # text -> индекс, чтобы обновлять частоты уже загруженных слов
+        self.positions: Dict[str, int] = {}
+        self._alias: Optional[Tuple[array, array]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, word_id: int, text: str, frequency: int = 1):
+        self.positions[text] = len(self.ids)
+        self.ids.append(word_id)
+        self.texts.append(text)
+        weight = max(1, frequency or 1)
+        self.weights.append(weight)
+        self.total_weight += weight
+        self._alias = None
+
+    def fingerprint(self) -> str:
+        return f"{len(self.ids)}-{self.ids[-1]}-{self.total_weight}"
+
+    def increment(self, text: str, delta: int):
+        index = self.positions.get(text)
+        if index is not None:
+            self.weights[index] += delta
+            self.total_weight += delta
+            self._alias = None
+
+    def alias_table(self) -> Tuple[array, array]:
+        """
+        Таблица псевдонимов Уокера (метод Воуза) для выбора по частоте за O(1)
+
+        Строится за O(n) при первом запросе после изменения пула.
+        """
+        if self._alias is None:
+            self._alias = _build_alias_table(self.weights)
+        return self._alias
+
+    def weighted_sample(self, count: int, rng) -> List[int]:
+        """
+        Выбрать count разных индексов с вероятностью, пропорциональной частоте
+
+        Повторы отбрасываются; если их слишком много (count близок к размеру
+        пула), оставшиеся индексы добираются равномерно.
+        """
+        size = len(self.ids)
+        if count >= size:
+            return rng.sample(range(size), size)
+        probabilities, aliases = self.alias_table()
+        chosen: List[int] = []
+        used: set = set()
+        attempts = count * _WEIGHTED_ATTEMPTS_FACTOR
+        while len(chosen) < count and attempts > 0:
+            attempts -= 1
+            index = rng.randrange(size)
+            if rng.random() >= probabilities[index]:
+                index = aliases[index]
+            if index not in used:
+                used.add(index)
+                chosen.append(index)
+        if len(chosen) < count:
+            rest = [index for index in range(size) if index not in used]
+            chosen.extend(rng.sample(rest, count - len(chosen)))
+        return chosen
+
+
+def _build_alias_table(weights: array) -> Tuple[array, array]:
+    """Построить таблицы вероятностей и псевдонимов по весам"""
+    size = len(weights)
+    total = sum(weights)
+    scaled = [weight * size / total for weight in weights]
+    probabilities = array("d", [1.0]) * size
+    aliases = array("q", range(size))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        probabilities[less] = scaled[less]
+        aliases[less] = more
+        scaled[more] += scaled[less] - 1.0
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Оставшиеся корзины (в том числе из-за погрешности округления) заполнены целиком
+    return probabilities, aliases
+
+
+class _LanguageSentences:
+    """Массивы активных предложений одного языка с корзинами по word_count"""
+
+    __slots__ = ("ids", "texts", "word_counts", "buckets", "bucket_keys")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.texts: List[str] = []
+        self.word_counts = array("i")
+        # word_count -> индексы предложений с таким количеством слов
+        self.buckets: Dict[int, array] = {}
+        self.bucket_keys: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, sentence_id: int, text: str, word_count: int):
+        index = len(self.ids)
+        self.ids.append(sentence_id)
+        self.texts.append(text)
+        self.word_counts.append(word_count)
+        bucket = self.buckets.get(word_count)
+        if bucket is None:
+            bucket = self.buckets[word_count] = array("i")
+            self.bucket_keys.insert(bisect_right(self.bucket_keys, word_count), word_count)
+        bucket.append(index)
+
+    def fingerprint(self) -> str:
+        return f"{len(self.ids)}-{self.ids[-1]}"
+
+    def pick_from_bucket(self, word_count: int, used: set, rng) -> Optional[int]:
+        """Случайный неиспользованный индекс из корзины (или None)"""
+        bucket = self.buckets[word_count]
+        for _ in range(_BUCKET_ATTEMPTS):
+            index = bucket[rng.randrange(len(bucket))]
+            if index not in used:
+                return index
+        for index in bucket:
+            if index not in used:
+                return index
+        return None
+
+    def leaves_fillable(self, remaining: int, word_count: int) -> bool:
+        """Можно ли после предложения длиной word_count ещё добрать остаток"""
+        left = remaining - word_count
+        return left == 0 or (left > 0 and left >= self.bucket_keys[0])
+
+    def fit(self, remaining: int, used: set, rng) -> Optional[int]:
+        """
+        Подобрать предложение, лучше всего закрывающее остаток слов
+
+        Сначала ищем самое длинное предложение, после которого остаток
+        ещё можно добрать, затем любое не превышающее остаток, затем —
+        самое короткое из превышающих.
+        """
+        position = bisect_right(self.bucket_keys, remaining)
+        smaller = self.bucket_keys[position - 1::-1] if position else []
+        candidates = [k for k in smaller if self.leaves_fillable(remaining, k)]
+        candidates += [k for k in smaller if not self.leaves_fillable(remaining, k)]
+        candidates += self.bucket_keys[position:]
+        for word_count in candidates:
+            index = self.pick_from_bucket(word_count, used, rng)
+            if index is not None:
+                return index
+        return None
+
+
+class WordPool:
+    """
+    Процессный пул активных слов по языкам.
+
+    Загружается один раз при старте приложения (или лениво при первом
+    запросе языка) и пополняется при загрузке нового текста, поэтому
+    выдача случайных слов не обращается к Postgres.
+    """
+
+    model = Word
+
+    def __init__(self):
+        self._languages: Dict[str, object] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+    def _columns(self):
+        return (Word.id, Word.text, Word.frequency)
+
+    def _new_store(self):
+        return _LanguageWords()
+
+    def is_loaded(self, language: str) -> bool:
+        """Загружен ли пул для указанного языка"""
+        return language in self._languages
+
+    def size(self, language: str) -> int:
+        """Количество активных записей в пуле языка"""
+        store = self._languages.get(language)
+        return len(store) if store is not None else 0
+
+    def version(self, language: str) -> int:
+        """Версия пула языка (0 — пул не загружен)"""
+        return self._versions.get(language, 0)
+
+    def fingerprint(self, language: str) -> str:
+        """
+        Отпечаток содержимого пула языка, одинаковый во всех процессах
+
+        В отличие от version() зависит только от данных, поэтому годится
+        для ETag воспроизводимых по seed выборок.
+        """
+        store = self._languages.get(language)
+        if not store:
+            return "0"
+        return store.fingerprint()
+
+    async def load(self, db: AsyncSession, languages: Optional[Iterable[str]] = None):
+        """
+        (Пере)загрузить активный контент из БД
+
+        Args:
+            db: Async сессия БД
+            languages: Языки для загрузки; None — все языки из таблицы
+        """
+        model = self.model
+        query = select(model.language, *self._columns()).where(model.is_active == True)
+        if languages is not None:
+            languages = list(languages)
+            query = query.where(model.language.in_(languages))
+        result = await db.execute(query.order_by(model.id))
+
+        loaded = {lang: self._new_store() for lang in languages or []}
+        for language, *row in result.all():
+            store = loaded.get(language)
+            if store is None:
+                store = loaded[language] = self._new_store()
+            store.append(*row)
+
+        async with self._lock:
+            if languages is None:
+                self._languages = loaded
+                self._versions = {}
+            else:
+                self._languages.update(loaded)
+            for language in loaded:
+                self._versions[language] = next(_versions)
+
+        for language, store in loaded.items():
+            logger.info(f"Loaded {len(store)} rows of {model.__tablename__} into pool for language {language}")
+
+    async def ensure_loaded(self, db: AsyncSession, language: str):
+        """Лениво загрузить пул языка, если он ещё не загружен"""
+        if not self.is_loaded(language):
+            await self.load(db, [language])
+
+    def add(self, language: str, rows: Iterable[tuple]):
+        """
+        Добавить в пул только что созданные записи
+
+        Если язык ещё не загружен, записи не добавляются: пул будет
+        полностью загружен из БД при первом обращении.
+        """
+        store = self._languages.get(language)
+        if store is None:
+            return
+        size = len(store)
+        for row in rows:
+            store.append(*row)
+        if len(store) != size:
+            self._versions[language] = next(_versions)
+
+    def increment_weights(self, language: str, increments: Dict[str, int]):
+        """Увеличить частоты уже загруженных слов"""
+        store = self._languages.get(language)
+        if store is None:
+            return
+        for text, delta in increments.items():
+            store.increment(text, delta)
+        if increments:
+            # Готовые наборы собраны с прежними частотами
+            self._versions[language] = next(_versions)
+
+    def sample(self, language: str, count: int, rng: Optional[random.Random] = None) -> List[PooledWord]:
+        """
+        Выбрать случайные слова без повторов с вероятностью, пропорциональной частоте
+
+        Частые слова попадают в тест чаще редких, а выборка стоит
+        O(count) благодаря таблице псевдонимов.
+
+        Args:
+            language: Язык слов
+            count: Количество слов
+            rng: Генератор случайных чисел (для воспроизводимой выборки по seed)
+
+        Returns:
+            Список случайных слов (не больше, чем есть в пуле)
+        """
+        store = self._languages.get(language)
+        if not store:
+            return []
+        indices = store.weighted_sample(count, rng or random)
+        return [PooledWord(store.ids[i], store.texts[i], language) for i in indices]
+
+    def clear(self):
+        """Сбросить все загруженные пулы"""
+        self._languages = {}
+        self._versions = {}
+
+
+class SentencePool(WordPool):
+    """
+    Процессный пул активных предложений по языкам с корзинами по word_count.
+
+    Позволяет за один запрос набрать предложения, суммарно дающие нужное
+    количество слов, без ORDER BY RANDOM() и перебора на клиенте.
+    """
+
+    model = Sentence
+
+    def _columns(self):
+        return (Sentence.id, Sentence.text, Sentence.word_count)
+
+    def _new_store(self):
+        return _LanguageSentences()
+
+    def _to_result(self, store: _LanguageSentences, language: str, indices: Iterable[int]) -> List[PooledSentence]:
+        return [
+            PooledSentence(store.ids[i], store.texts[i], language, store.word_counts[i])
+            for i in indices
+        ]
+
+    def sample(self, language: str, count: int, rng: Optional[random.Random] = None) -> List[PooledSentence]:
+        """Выбрать случайные предложения без повторов за O(count)"""
+        store = self._languages.get(language)
+        if not store:
+            return []
+        indices = (rng or random).sample(range(len(store)), min(count, len(store)))
+        return self._to_result(store, language, indices)
+
+    def sample_words(
+        self, language: str, total_words: int, rng: Optional[random.Random] = None
+    ) -> List[PooledSentence]:
+        """
+        Выбрать случайные предложения, суммарно дающие ~total_words слов
+
+        Предложения выбираются равномерно, пока после них остаток можно
+        добрать; иначе берётся предложение из подходящей корзины, так что
+        перебор превышает цель не больше чем на одно короткое предложение.
+
+        Args:
+            language: Язык предложений
+            total_words: Желаемое суммарное количество слов
+            rng: Генератор случайных чисел (для воспроизводимой выборки по seed)
+
+        Returns:
+            Список предложений без повторов
+        """
+        store = self._languages.get(language)
+        if not store:
+            return []
+
+        rng = rng or random
+        chosen: List[int] = []
+        used: set = set()
+        remaining = total_words
+        while remaining > 0 and len(used) < len(store):
+            index = rng.randrange(len(store))
+            if index in used or not store.leaves_fillable(remaining, store.word_counts[index]):
+                index = store.fit(remaining, used, rng)
+                if index is None:
+                    break
+            used.add(index)
+            chosen.append(index)
+            remaining -= store.word_counts[index]
+
+        return self._to_result(store, language, chosen)
+
+
+# Глобальные экземпляры пулов контента
+word_pool = WordPool()
+sentence_pool = SentencePool()
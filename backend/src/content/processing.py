@@ -0,0 +1,63 @@
+"""
+Разбор загружаемых текстов вне event loop в пуле процессов
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional
+
+from ..config import settings
+from .utils import TokenizedText, parse_text
+
+logger = logging.getLogger(__name__)
+
+# Тексты короче этого порога разбираются прямо в event loop:
+# передача в другой процесс обойдётся дороже самого разбора
+INLINE_PARSE_LIMIT = 16 * 1024
+
+
+class TextProcessingPool:
+    """
+    Пул процессов для CPU-ёмкой очистки и разбиения текста.
+
+    Пока идёт разбор большой загрузки, event loop воркера продолжает
+    обслуживать остальные запросы, а блоки одного текста разбираются
+    параллельно. При max_workers=0 разбор выполняется в текущем процессе.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют event loop и соединения родителя
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started text processing pool with {self.max_workers} workers")
+        return self._executor
+
+    async def parse(self, raw_text: str, language: str) -> TokenizedText:
+        """Разобрать текст (в пуле процессов, если текст достаточно большой)"""
+        if self.max_workers <= 0 or len(raw_text) < INLINE_PARSE_LIMIT:
+            return parse_text(raw_text, language)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), parse_text, raw_text, language)
+
+    async def parse_many(self, blocks: Iterable[str], language: str) -> List[TokenizedText]:
+        """Разобрать несколько блоков параллельно, сохраняя их порядок"""
+        return list(await asyncio.gather(*(self.parse(block, language) for block in blocks)))
+
+    def shutdown(self):
+        """Остановить процессы пула"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Stopped text processing pool")
+
+
+# Глобальный экземпляр пула разбора текстов
+text_processing_pool = TextProcessingPool(settings["content"]["process_workers"])
@@ -2,7 +2,7 @@
 API роутер для управления контентом (слова и предложения)
 """
 from typing import Literal
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
@@ -11,10 +11,14 @@ from ..auth.utils import get_current_admin
 from .schemas import (
     TextUploadRequest,
     TextUploadResponse,
+    IngestionJobResponse,
     WordResponse,
     SentenceResponse
 )
 from . import service
+from .jobs import ingestion_queue, describe_job
+from .bundles import BundleMode, bundle_store
+from .pool import word_pool, sentence_pool
 
 router = APIRouter(tags=["content"])
 
@@ -33,6 +37,9 @@ async def upload_content(
     - Нормализован (множественные пробелы -> один пробел)
     - Разбит на слова И предложения одновременно
     - Сохранён в БД (дубликаты игнорируются)
+    
+    Обработка идёт в рамках запроса; большие тексты загружайте через
+    POST /jobs (так делает админка), чтобы не упираться в таймаут прокси.
     """
     words_created, sentences_created = await service.upload_text_content(
         db=db,
@@ -48,10 +55,77 @@ async def upload_content(
     )
 
 
+@router.post("/upload/stream", response_model=TextUploadResponse)
+async def upload_content_stream(
+    request: Request,
+    language: Literal["ru", "en"] = Query(..., description="Язык текста"),
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    """
+    Потоковая загрузка большого текста (только для админов)
+    
+    Тело запроса — сырой текст в UTF-8 (можно chunked). Текст обрабатывается
+    блоками по границам предложений с коммитом после каждого блока, так что
+    память воркера не зависит от размера корпуса.
+    """
+    words_created, sentences_created = await service.ingest_text_stream(
+        db=db,
+        chunks=request.stream(),
+        language=language
+    )
+    
+    return TextUploadResponse(
+        message=f"Successfully processed: {words_created} words, {sentences_created} sentences",
+        words_created=words_created,
+        sentences_created=sentences_created,
+        language=language
+    )
+
+
+@router.post("/jobs", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_ingestion_job(
+    payload: TextUploadRequest,
+    admin: User = Depends(get_current_admin)
+):
+    """
+    Поставить текст в фоновую очередь загрузки (только для админов)
+    
+    Возвращает задачу сразу; прогресс доступен через GET /jobs/{job_id}.
+    """
+    job_id = await ingestion_queue.enqueue(payload.raw_text, payload.language)
+    return describe_job(await ingestion_queue.get(job_id))
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: str,
+    admin: User = Depends(get_current_admin)
+):
+    """Получить прогресс, скорость и итоги фоновой загрузки (только для админов)"""
+    job = await ingestion_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    return describe_job(job)
+
+
+def _seeded_cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={service.SEEDED_CACHE_MAX_AGE}",
+    }
+
+
 @router.get("/words", response_model=list[WordResponse])
 async def get_random_words(
+    request: Request,
+    response: Response,
     language: Literal["ru", "en"] = Query("en", description="Язык слов"),
     count: int = Query(25, ge=1, le=1000, description="Количество слов"),
+    seed: int | None = Query(None, ge=0, description="Seed для воспроизводимой выборки"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -59,15 +133,33 @@ async def get_random_words(
     
     - **language**: Язык слов ('ru' или 'en')
     - **count**: Количество слов (от 1 до 1000, по умолчанию 25)
+    - **seed**: Если указан, для того же набора слов в БД возвращается та же
+      последовательность; ответ кэшируется по ETag
+    
+    Если для комбинации есть заранее подготовленный набор, он отдаётся как есть.
     """
+    if seed is not None:
+        etag = await service.get_seeded_etag(db, word_pool, language, BundleMode.WORDS, count, seed)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_seeded_cache_headers(etag))
+        response.headers.update(_seeded_cache_headers(etag))
+        return await service.get_random_words(db, language, count, seed=seed)
+    
+    bundle = bundle_store.pop(language, BundleMode.WORDS, count)
+    if bundle is not None:
+        return Response(content=bundle, media_type="application/json")
     words = await service.get_random_words(db, language, count)
     return words
 
 
 @router.get("/sentences", response_model=list[SentenceResponse])
 async def get_random_sentences(
+    request: Request,
+    response: Response,
     language: Literal["ru", "en"] = Query("en", description="Язык предложений"),
     count: int = Query(10, ge=1, le=100, description="Количество предложений"),
+    words: int | None = Query(None, ge=1, le=1000, description="Суммарное количество слов в предложениях"),
+    seed: int | None = Query(None, ge=0, description="Seed для воспроизводимой выборки"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -75,6 +167,28 @@ async def get_random_sentences(
     
     - **language**: Язык предложений ('ru' или 'en')
     - **count**: Количество предложений (от 1 до 100, по умолчанию 10)
+    - **words**: Если указан, вернуть предложения, суммарно содержащие ~words слов (count игнорируется)
+    - **seed**: Если указан, для того же набора предложений в БД возвращается та же
+      последовательность; ответ кэшируется по ETag
+    
+    Если для комбинации есть заранее подготовленный набор, он отдаётся как есть.
     """
-    sentences = await service.get_random_sentences(db, language, count)
+    if words is not None:
+        mode, size = BundleMode.SENTENCE_WORDS, words
+    else:
+        mode, size = BundleMode.SENTENCES, count
+    
+    if seed is not None:
+        etag = await service.get_seeded_etag(db, sentence_pool, language, mode, size, seed)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_seeded_cache_headers(etag))
+        response.headers.update(_seeded_cache_headers(etag))
+    else:
+        bundle = bundle_store.pop(language, mode, size)
+        if bundle is not None:
+            return Response(content=bundle, media_type="application/json")
+    
+    if words is not None:
+        return await service.get_sentences_for_word_count(db, language, words, seed=seed)
+    sentences = await service.get_random_sentences(db, language, count, seed=seed)
     return sentences
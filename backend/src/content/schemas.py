@@ -18,6 +18,21 @@ class TextUploadResponse(BaseModel):
     language: str
 
 
+class IngestionJobResponse(BaseModel):
+    """Схема состояния фоновой задачи загрузки текста"""
+    id: str
+    status: str = Field(..., description="queued, running, done или failed")
+    language: str
+    total_chars: int
+    processed_chars: int
+    progress: float = Field(..., description="Доля обработанного текста от 0 до 1")
+    words_processed: int
+    words_per_second: float
+    words_created: int
+    sentences_created: int
+    error: str | None = None
+
+
 class WordResponse(BaseModel):
     """Схема ответа для слова"""
     id: int
@@ -1,17 +1,163 @@
 """
 Сервисный слой для работы с контентом
 """
+import asyncio
+import codecs
+import hashlib
 import logging
-from typing import List
+import random
+from collections import defaultdict, deque
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 
 from .models import Word, Sentence
-from .utils import clean_text, extract_words, extract_sentences, count_words_in_text
+from .pool import WordPool, word_pool, sentence_pool, PooledWord, PooledSentence
+from .processing import text_processing_pool
+from .utils import TokenizedText, count_words_in_text, split_complete_text, split_into_blocks
 
 logger = logging.getLogger(__name__)
 
 
+# Размер пачки для bulk-вставки (держим число параметров запроса далеко от лимита драйвера)
+INSERT_CHUNK_SIZE = 1000
+
+# Максимальная длина слова/предложения: слова ограничены колонкой String(100),
+# предложения — размером строки btree-индекса (language, text) в PostgreSQL
+# (~2704 байт), поэтому для них ограничен и размер в UTF-8; более длинные
+# старые предложения удаляет миграция 3f1c2a9d7e41
+MAX_WORD_LENGTH = 100
+MAX_SENTENCE_LENGTH = 1000
+MAX_SENTENCE_BYTES = 2000
+
+# Размер текстового блока (в символах): большие тексты разбираются блоками
+# параллельно, а при потоковой загрузке каждый блок коммитится отдельно,
+# так что память не растёт с размером корпуса
+STREAM_BLOCK_SIZE = 256 * 1024
+
+# Сколько клиенты и прокси могут кэшировать выборку по seed (секунды)
+SEEDED_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+
+def _insert_ignore_duplicates(db: AsyncSession, model):
+    """INSERT ... ON CONFLICT (language, text) DO NOTHING для диалекта текущей БД"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model).on_conflict_do_nothing(index_elements=["language", "text"])
+
+
+async def _bulk_insert(db: AsyncSession, model, rows: List[dict], returning) -> list:
+    """
+    Вставляет строки пачками, пропуская уже существующие
+
+    Returns:
+        Список фактически созданных строк (значения колонок returning)
+    """
+    created = []
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + INSERT_CHUNK_SIZE]
+        stmt = _insert_ignore_duplicates(db, model).values(chunk).returning(*returning)
+        result = await db.execute(stmt)
+        created.extend(result.all())
+    return created
+
+
+async def _increment_word_frequencies(db: AsyncSession, language: str, increments: Dict[str, int]):
+    """
+    Увеличивает частоты уже существующих слов
+
+    Слова группируются по величине прироста (в основном это 1), так что
+    на группу приходится один UPDATE ... WHERE text IN (...) на пачку.
+    """
+    by_delta: Dict[int, List[str]] = defaultdict(list)
+    for word_text, delta in increments.items():
+        by_delta[delta].append(word_text)
+    for delta, texts in by_delta.items():
+        for start in range(0, len(texts), INSERT_CHUNK_SIZE):
+            await db.execute(
+                update(Word)
+                .where(Word.language == language, Word.text.in_(texts[start:start + INSERT_CHUNK_SIZE]))
+                .values(frequency=Word.frequency + delta)
+            )
+
+
+async def save_content(
+    db: AsyncSession,
+    language: str,
+    words: List[str],
+    sentences: List[str],
+    sentence_word_counts: Optional[List[int]] = None,
+    word_frequencies: Optional[List[int]] = None
+) -> tuple[int, int]:
+    """
+    Сохраняет уже извлечённые слова и предложения bulk-вставкой
+
+    Дубликаты отбрасываются в Python и уникальным индексом (language, text)
+    в БД, поэтому на пачку приходится один запрос вместо SELECT на каждую запись.
+    Частоты уже существующих слов увеличиваются.
+
+    Args:
+        db: Async сессия БД
+        language: Язык ('ru' или 'en')
+        words: Слова
+        sentences: Предложения
+        sentence_word_counts: Количество слов в каждом предложении
+            (если не передано, считается заново)
+        word_frequencies: Количество вхождений каждого слова из words
+            (если не передано, каждое слово считается один раз)
+
+    Returns:
+        Кортеж (количество созданных слов, количество созданных предложений)
+    """
+    frequencies: Dict[str, int] = {}
+    for word_text, frequency in zip(words, word_frequencies or [1] * len(words)):
+        frequencies[word_text] = frequencies.get(word_text, 0) + frequency
+
+    word_rows = []
+    for word_text, frequency in frequencies.items():
+        # Пропускаем слишком длинные токены, чтобы избежать ошибок вставки в БД
+        if len(word_text) > MAX_WORD_LENGTH:
+            logger.warning("Skipping word because it exceeds %d chars: %s", MAX_WORD_LENGTH, word_text)
+            continue
+        word_rows.append({"language": language, "text": word_text, "frequency": frequency, "is_active": True})
+
+    if sentence_word_counts is None:
+        sentence_word_counts = [count_words_in_text(sentence) for sentence in sentences]
+    sentence_rows = []
+    for sentence_text, word_count in dict(zip(sentences, sentence_word_counts)).items():
+        if len(sentence_text) > MAX_SENTENCE_LENGTH or len(sentence_text.encode("utf-8")) > MAX_SENTENCE_BYTES:
+            logger.warning(
+                "Skipping sentence because it exceeds %d chars or %d bytes", MAX_SENTENCE_LENGTH, MAX_SENTENCE_BYTES
+            )
+            continue
+        sentence_rows.append({
+            "language": language,
+            "text": sentence_text,
+            "word_count": word_count,
+            "is_active": True,
+        })
+
+    new_words = await _bulk_insert(db, Word, word_rows, (Word.id, Word.text, Word.frequency))
+    created_texts = {row.text for row in new_words}
+    existing = {
+        row["text"]: row["frequency"] for row in word_rows if row["text"] not in created_texts
+    }
+    await _increment_word_frequencies(db, language, existing)
+    new_sentences = await _bulk_insert(
+        db, Sentence, sentence_rows, (Sentence.id, Sentence.text, Sentence.word_count)
+    )
+    await db.commit()
+
+    # Пополняем in-memory пулы только что созданным контентом
+    word_pool.add(language, sorted(new_words))
+    word_pool.increment_weights(language, existing)
+    sentence_pool.add(language, sorted(new_sentences))
+
+    return (len(new_words), len(new_sentences))
+
+
 async def upload_text_content(
     db: AsyncSession,
     raw_text: str,
@@ -28,120 +174,213 @@ async def upload_text_content(
     Returns:
         Кортеж (количество созданных слов, количество созданных предложений)
     """
-    # Очищаем текст
-    cleaned = clean_text(raw_text, language)
+    # Разбор идёт в пуле процессов, чтобы большая загрузка не блокировала event loop
+    parsed_blocks = await text_processing_pool.parse_many(
+        split_into_blocks(raw_text, STREAM_BLOCK_SIZE), language
+    )
+    parsed_blocks = [parsed for parsed in parsed_blocks if parsed.cleaned]
     
-    if not cleaned:
+    if not parsed_blocks:
         return (0, 0)
     
+    words_created, sentences_created = await save_content(
+        db,
+        language,
+        [word for parsed in parsed_blocks for word in parsed.words],
+        [sentence for parsed in parsed_blocks for sentence in parsed.sentences],
+        [count for parsed in parsed_blocks for count in parsed.sentence_word_counts],
+        [frequency for parsed in parsed_blocks for frequency in parsed.word_frequencies],
+    )
+    logger.info(f"Created {words_created} words and {sentences_created} sentences for language {language}")
+    
+    return (words_created, sentences_created)
+
+
+async def iter_text_blocks(
+    chunks: AsyncIterator[bytes],
+    block_size: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Превращает поток байтов UTF-8 в текстовые блоки ограниченного размера
+    
+    Блоки режутся по границам предложений, поэтому каждый можно
+    обрабатывать независимо.
+    
+    Args:
+        chunks: Асинхронный поток байтов (например, тело запроса)
+        block_size: Размер блока в символах (по умолчанию STREAM_BLOCK_SIZE)
+    
+    Yields:
+        Текстовые блоки
+    """
+    block_size = block_size or STREAM_BLOCK_SIZE
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        while True:
+            block, buffer = split_complete_text(buffer, block_size)
+            if not block:
+                break
+            yield block
+    buffer += decoder.decode(b"", final=True)
+    for block in split_into_blocks(buffer, block_size):
+        if block.strip():
+            yield block
+
+
+async def ingest_text_stream(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    language: str
+) -> tuple[int, int]:
+    """
+    Потоково обрабатывает и сохраняет большой текст
+    
+    Блоки разбираются в пуле процессов (несколько блоков одновременно),
+    а результаты сохраняются по порядку, каждый блок — отдельным коммитом.
+    В памяти одновременно находится не больше блоков, чем процессов в пуле.
+    
+    Args:
+        db: Async сессия БД
+        chunks: Асинхронный поток байтов текста в UTF-8
+        language: Язык ('ru' или 'en')
+    
+    Returns:
+        Кортеж (количество созданных слов, количество созданных предложений)
+    """
     words_created = 0
     sentences_created = 0
+    blocks = 0
+    max_in_flight = max(1, text_processing_pool.max_workers)
+    pending: deque[asyncio.Future] = deque()
     
-    # Извлекаем и сохраняем слова
-    words = extract_words(cleaned, language)
-    
-    for word_text in words:
-        # Пропускаем слишком длинные токены, чтобы избежать ошибок вставки в БД
-        if len(word_text) > 100:
-            logger.warning("Skipping word because it exceeds 100 chars: %s", word_text)
-            continue
-        # Проверяем, нет ли уже такого слова
-        result = await db.execute(
-            select(Word).where(
-                Word.language == language,
-                Word.text == word_text
-            )
-        )
-        existing = result.scalar_one_or_none()
-        
-        if not existing:
-            word = Word(
-                language=language,
-                text=word_text,
-                is_active=True
-            )
-            db.add(word)
-            words_created += 1
-    
-    # Извлекаем и сохраняем предложения
-    sentences = extract_sentences(cleaned, language)
-    
-    for sentence_text in sentences:
-        # Проверяем, нет ли уже такого предложения
-        result = await db.execute(
-            select(Sentence).where(
-                Sentence.language == language,
-                Sentence.text == sentence_text
-            )
+    async def save_next():
+        nonlocal words_created, sentences_created, blocks
+        parsed: TokenizedText = await pending.popleft()
+        if not parsed.cleaned:
+            return
+        block_words, block_sentences = await save_content(
+            db, language, parsed.words, parsed.sentences, parsed.sentence_word_counts,
+            parsed.word_frequencies
         )
-        existing = result.scalar_one_or_none()
-        
-        if not existing:
-            word_count = count_words_in_text(sentence_text)
-            sentence = Sentence(
-                language=language,
-                text=sentence_text,
-                word_count=word_count,
-                is_active=True
-            )
-            db.add(sentence)
-            sentences_created += 1
+        words_created += block_words
+        sentences_created += block_sentences
+        blocks += 1
     
-    await db.commit()
-    logger.info(f"Created {words_created} words and {sentences_created} sentences for language {language}")
+    try:
+        async for block in iter_text_blocks(chunks):
+            pending.append(asyncio.ensure_future(text_processing_pool.parse(block, language)))
+            if len(pending) >= max_in_flight:
+                await save_next()
+        while pending:
+            await save_next()
+    finally:
+        for future in pending:
+            future.cancel()
     
+    logger.info(
+        f"Stream ingestion created {words_created} words and {sentences_created} sentences "
+        f"for language {language} in {blocks} blocks"
+    )
     return (words_created, sentences_created)
 
 
+def _seeded_rng(seed: Optional[int]) -> Optional[random.Random]:
+    """Отдельный генератор для seed, чтобы выборка не зависела от глобального random"""
+    return random.Random(seed) if seed is not None else None
+
+
 async def get_random_words(
     db: AsyncSession,
     language: str,
-    count: int = 25
-) -> List[Word]:
+    count: int = 25,
+    seed: Optional[int] = None
+) -> List[PooledWord]:
     """
-    Получает случайные слова из БД
+    Получает случайные слова из in-memory пула
+    
+    Пул загружается при старте приложения; БД используется только
+    если пул языка ещё не был загружен.
     
     Args:
         db: Async сессия БД
         language: Язык слов
         count: Количество слов
+        seed: Если указан, выборка воспроизводима (при неизменном пуле)
     
     Returns:
         Список случайных слов
     """
-    # SQLite использует RANDOM(), PostgreSQL - RANDOM()
-    # SQLAlchemy автоматически переводит func.random()
-    result = await db.execute(
-        select(Word)
-        .where(Word.language == language, Word.is_active == True)
-        .order_by(func.random())
-        .limit(count)
-    )
-    words = result.scalars().all()
-    return list(words)
+    await word_pool.ensure_loaded(db, language)
+    return word_pool.sample(language, count, _seeded_rng(seed))
 
 
 async def get_random_sentences(
     db: AsyncSession,
     language: str,
-    count: int = 10
-) -> List[Sentence]:
+    count: int = 10,
+    seed: Optional[int] = None
+) -> List[PooledSentence]:
     """
-    Получает случайные предложения из БД
+    Получает случайные предложения из in-memory пула
     
     Args:
         db: Async сессия БД
         language: Язык предложений
         count: Количество предложений
+        seed: Если указан, выборка воспроизводима (при неизменном пуле)
     
     Returns:
         Список случайных предложений
     """
-    result = await db.execute(
-        select(Sentence)
-        .where(Sentence.language == language, Sentence.is_active == True)
-        .order_by(func.random())
-        .limit(count)
-    )
-    sentences = result.scalars().all()
-    return list(sentences)
+    await sentence_pool.ensure_loaded(db, language)
+    return sentence_pool.sample(language, count, _seeded_rng(seed))
+
+
+async def get_sentences_for_word_count(
+    db: AsyncSession,
+    language: str,
+    words: int,
+    seed: Optional[int] = None
+) -> List[PooledSentence]:
+    """
+    Получает случайные предложения, суммарно содержащие ~words слов
+    
+    Args:
+        db: Async сессия БД
+        language: Язык предложений
+        words: Желаемое суммарное количество слов
+        seed: Если указан, выборка воспроизводима (при неизменном пуле)
+    
+    Returns:
+        Список случайных предложений
+    """
+    await sentence_pool.ensure_loaded(db, language)
+    return sentence_pool.sample_words(language, words, _seeded_rng(seed))
+
+
+async def get_seeded_etag(
+    db: AsyncSession,
+    pool: WordPool,
+    language: str,
+    *params
+) -> str:
+    """
+    ETag воспроизводимой выборки
+    
+    Выборка по seed однозначно определяется параметрами запроса и
+    содержимым пула, поэтому ETag можно посчитать, не выполняя выборку.
+    
+    Args:
+        db: Async сессия БД
+        pool: Пул, из которого делается выборка
+        language: Язык контента
+        *params: Параметры выборки (режим, количество, seed)
+    
+    Returns:
+        ETag в кавычках
+    """
+    await pool.ensure_loaded(db, language)
+    key = ":".join(str(part) for part in (pool.model.__tablename__, language, pool.fingerprint(language), *params))
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest() + '"'
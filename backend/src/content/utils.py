@@ -2,7 +2,201 @@
 Утилиты для обработки и очистки текста
 """
 import re
-from typing import List
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+
+# Знаки препинания, которые отбрасываются при разбиении на слова
+_PUNCT = re.compile(r'[.,!?]')
+# Пробел перед знаком препинания (после нормализации пробелов он максимум один)
+_SPACE_BEFORE_PUNCT = re.compile(r' ([.,!?])')
+# Разбиение на предложения по точке, восклицательному и вопросительному знакам,
+# после которых идёт пробел (или несколько) и заглавная буква, или конец строки.
+# Это предотвращает разбиение на сокращениях типа "т.е." или "и т.д."
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])(?=\s+[A-ZА-ЯЁ]|\s*$)')
+_NEWLINES = re.compile(r'\n+')
+
+_LETTERS = {
+    'ru': re.compile(r'[а-яА-ЯёЁ]'),
+    'en': re.compile(r'[a-zA-Z]'),
+}
+# Для русского языка оставляем: кириллицу, дефис, апостроф, пробелы, точку, запятую,
+# восклицательный и вопросительный знаки; для английского — то же, но с латиницей
+_DISALLOWED = {
+    'ru': re.compile(r'[^а-яА-ЯёЁ\s\-\'.,!?]'),
+    'en': re.compile(r'[^a-zA-Z\s\-\'.,!?]'),
+}
+
+# Доля слов на нужном языке, при которой предложение считается написанным на нём
+SENTENCE_LANGUAGE_THRESHOLD = 0.8
+# Минимальное количество слов в предложении
+MIN_SENTENCE_WORDS = 3
+
+
+def _language_key(language: Optional[str]) -> str:
+    """Все языки, кроме русского, обрабатываются как латиничные"""
+    return 'ru' if language == 'ru' else 'en'
+
+
+class TokenizedText(NamedTuple):
+    """Результат однопроходной обработки текста"""
+    cleaned: str
+    words: List[str]
+    sentences: List[str]
+    sentence_word_counts: List[int]
+    # Сколько раз каждое слово из words встретилось в тексте
+    word_frequencies: List[int]
+
+
+class TextTokenizer:
+    """
+    Токенизатор текста с заранее скомпилированными шаблонами для одного языка
+    
+    Очищает текст и за один проход по его предложениям и их токенам получает
+    уникальные слова с частотами, предложения и количество слов в каждом
+    предложении. Экземпляры переиспользуются через get_tokenizer().
+    """
+    
+    def __init__(self, language: Optional[str]):
+        self.language = language
+        key = _language_key(language)
+        self._letter = _LETTERS[key]
+        self._disallowed = _DISALLOWED[key]
+    
+    def clean(self, text: str) -> str:
+        """Удалить недопустимые символы и нормализовать пробелы"""
+        text = ' '.join(self._disallowed.sub('', text).split())
+        return _SPACE_BEFORE_PUNCT.sub(r'\1', text)
+    
+    def has_letters(self, word: str) -> bool:
+        """Содержит ли слово хотя бы одну букву алфавита языка"""
+        return self._letter.search(word) is not None
+    
+    def word_frequencies(self, text: str, filter_language: bool = True) -> Dict[str, int]:
+        """
+        Уникальные слова текста в нижнем регистре (длиной больше одного символа)
+        с количеством их вхождений, в порядке первого появления
+        """
+        frequencies: Dict[str, int] = {}
+        check_language = filter_language and self.language is not None
+        for word in _PUNCT.sub('', text).split():
+            word = word.lower()
+            count = frequencies.get(word)
+            if count is not None:
+                frequencies[word] = count + 1
+                continue
+            if len(word) <= 1:
+                continue
+            if check_language and not self.has_letters(word):
+                continue
+            frequencies[word] = 1
+        return frequencies
+    
+    def words(self, text: str, filter_language: bool = True) -> List[str]:
+        """Уникальные слова текста в нижнем регистре (длиной больше одного символа)"""
+        return list(self.word_frequencies(text, filter_language))
+    
+    def sentence_stats(self, sentence: str) -> tuple[int, bool]:
+        """
+        Посчитать слова предложения и проверить его язык за один проход
+        
+        Returns:
+            Кортеж (количество слов, написано ли предложение на языке токенизатора)
+        """
+        tokens = _PUNCT.sub('', sentence).split()
+        # Для проверки языка не учитываем токены только из дефисов и апострофов
+        meaningful = 0
+        in_language = 0
+        for token in tokens:
+            if token.strip("-'"):
+                meaningful += 1
+                if self.has_letters(token):
+                    in_language += 1
+        matches = meaningful > 0 and in_language >= meaningful * SENTENCE_LANGUAGE_THRESHOLD
+        return len(tokens), matches
+    
+    def sentences(self, text: str, filter_language: bool = True) -> tuple[List[str], List[int]]:
+        """
+        Разбить текст на предложения
+        
+        Оставляет только предложения минимум из трёх слов, которые
+        заканчиваются знаком препинания (и написаны на нужном языке).
+        
+        Returns:
+            Кортеж (предложения, количество слов в каждом предложении)
+        """
+        check_language = filter_language and self.language is not None
+        sentences = []
+        word_counts = []
+        for sentence in _SENTENCE_SPLIT.split(_NEWLINES.sub(' ', text)):
+            sentence = sentence.strip()
+            if not sentence or sentence[-1] not in '.!?':
+                continue
+            word_count, in_language = self.sentence_stats(sentence)
+            if word_count < MIN_SENTENCE_WORDS:
+                continue
+            if check_language and not in_language:
+                continue
+            sentences.append(sentence)
+            word_counts.append(word_count)
+        return sentences, word_counts
+    
+    def tokenize(self, raw_text: str) -> TokenizedText:
+        """
+        Очистить сырой текст и извлечь слова и предложения
+        
+        После очистки текст проходится один раз: разбиение на предложения
+        режет только между токенами, поэтому токены всех фрагментов (в том
+        числе отброшенных как предложения) — это все слова текста, и частоты
+        слов считаются в том же цикле, что и статистика предложений.
+        Результат совпадает с word_frequencies() и sentences().
+        """
+        cleaned = self.clean(raw_text)
+        if not cleaned:
+            return TokenizedText(cleaned, [], [], [], [])
+        check_language = self.language is not None
+        letter = self._letter
+        frequencies: Dict[str, int] = {}
+        sentences = []
+        word_counts = []
+        for fragment in _SENTENCE_SPLIT.split(cleaned):
+            tokens = _PUNCT.sub('', fragment).split()
+            meaningful = 0
+            in_language = 0
+            for token in tokens:
+                has_letters = letter.search(token) is not None
+                # Для проверки языка не учитываем токены только из дефисов и апострофов
+                if token.strip("-'"):
+                    meaningful += 1
+                    in_language += has_letters
+                word = token.lower()
+                count = frequencies.get(word)
+                if count is not None:
+                    frequencies[word] = count + 1
+                elif len(word) > 1 and (has_letters or not check_language):
+                    frequencies[word] = 1
+            sentence = fragment.strip()
+            if not sentence or sentence[-1] not in '.!?' or len(tokens) < MIN_SENTENCE_WORDS:
+                continue
+            if check_language and not (
+                meaningful > 0 and in_language >= meaningful * SENTENCE_LANGUAGE_THRESHOLD
+            ):
+                continue
+            sentences.append(sentence)
+            word_counts.append(len(tokens))
+        return TokenizedText(
+            cleaned, list(frequencies), sentences, word_counts, list(frequencies.values())
+        )
+
+
+_TOKENIZERS: Dict[Optional[str], TextTokenizer] = {}
+
+
+def get_tokenizer(language: Optional[str]) -> TextTokenizer:
+    """Получить (закэшированный) токенизатор для языка"""
+    tokenizer = _TOKENIZERS.get(language)
+    if tokenizer is None:
+        tokenizer = _TOKENIZERS[language] = TextTokenizer(language)
+    return tokenizer
 
 
 def is_russian_word(word: str) -> bool:
@@ -15,7 +209,7 @@ def is_russian_word(word: str) -> bool:
     Returns:
         True если слово содержит хотя бы одну кириллическую букву
     """
-    return bool(re.search(r'[а-яА-ЯёЁ]', word))
+    return _LETTERS['ru'].search(word) is not None
 
 
 def is_english_word(word: str) -> bool:
@@ -28,7 +222,7 @@ def is_english_word(word: str) -> bool:
     Returns:
         True если слово содержит хотя бы одну латинскую букву
     """
-    return bool(re.search(r'[a-zA-Z]', word))
+    return _LETTERS['en'].search(word) is not None
 
 
 def filter_words_by_language(words: List[str], language: str) -> List[str]:
@@ -42,10 +236,8 @@ def filter_words_by_language(words: List[str], language: str) -> List[str]:
     Returns:
         Отфильтрованный список слов
     """
-    if language == 'ru':
-        return [w for w in words if is_russian_word(w)]
-    else:  # en
-        return [w for w in words if is_english_word(w)]
+    tokenizer = get_tokenizer(_language_key(language))
+    return [w for w in words if tokenizer.has_letters(w)]
 
 
 def filter_sentence_by_language(sentence: str, language: str) -> bool:
@@ -59,22 +251,7 @@ def filter_sentence_by_language(sentence: str, language: str) -> bool:
     Returns:
         True если предложение содержит преимущественно слова на нужном языке
     """
-    # Убираем знаки препинания и разбиваем на слова
-    words = re.sub(r'[.,!?\-\']', '', sentence).split()
-    
-    if not words:
-        return False
-    
-    if language == 'ru':
-        # Считаем слова с кириллицей
-        cyrillic_words = sum(1 for w in words if is_russian_word(w))
-        # Предложение считается русским, если >= 80% слов содержат кириллицу
-        return cyrillic_words >= len(words) * 0.8
-    else:  # en
-        # Считаем слова с латиницей
-        latin_words = sum(1 for w in words if is_english_word(w))
-        # Предложение считается английским, если >= 80% слов содержат латиницу
-        return latin_words >= len(words) * 0.8
+    return get_tokenizer(_language_key(language)).sentence_stats(sentence)[1]
 
 
 def clean_text(text: str, language: str) -> str:
@@ -88,28 +265,7 @@ def clean_text(text: str, language: str) -> str:
     Returns:
         Очищенный текст
     """
-    # Заменяем множественные пробелы на один
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Убираем пробелы в начале и конце
-    text = text.strip()
-    
-    # Для русского языка оставляем: буквы, дефис, апостроф
-    # Для английского: буквы, дефис, апостроф
-    if language == 'ru':
-        # Оставляем только кириллицу, дефис, апостроф, пробелы, точку, запятую, восклицательный и вопросительный знаки
-        text = re.sub(r'[^а-яА-ЯёЁ\s\-\'.,!?]', '', text)
-    else:  # en или другие латиничные
-        # Оставляем только латиницу, дефис, апостроф, пробелы, точку, запятую, восклицательный и вопросительный знаки
-        text = re.sub(r'[^a-zA-Z\s\-\'.,!?]', '', text)
-    
-    # Убираем множественные пробелы через split/join (безопаснее чем regex)
-    text = ' '.join(text.split())
-    
-    # Убираем пробелы перед знаками препинания (ограничиваем квантификатор)
-    text = re.sub(r' {1,10}([.,!?])', r'\1', text)
-    
-    return text.strip()
+    return get_tokenizer(_language_key(language)).clean(text)
 
 
 def extract_words(text: str, language: str = None) -> List[str]:
@@ -123,28 +279,7 @@ def extract_words(text: str, language: str = None) -> List[str]:
     Returns:
         Список уникальных слов
     """
-    # Убираем знаки препинания для разбиения на слова
-    text_no_punct = re.sub(r'[.,!?]', '', text)
-    
-    # Разбиваем по пробелам
-    words = text_no_punct.split()
-    
-    # Фильтруем пустые строки и приводим к нижнему регистру
-    words = [w.lower().strip() for w in words if w.strip()]
-    
-    # Фильтруем по языку если указан
-    if language:
-        words = filter_words_by_language(words, language)
-    
-    # Убираем дубликаты, сохраняя порядок
-    seen = set()
-    unique_words = []
-    for word in words:
-        if word not in seen and len(word) > 1:  # Игнорируем односимвольные слова
-            seen.add(word)
-            unique_words.append(word)
-    
-    return unique_words
+    return get_tokenizer(language).words(text)
 
 
 def extract_sentences(text: str, language: str = None) -> List[str]:
@@ -158,32 +293,7 @@ def extract_sentences(text: str, language: str = None) -> List[str]:
     Returns:
         Список предложений
     """
-    # Заменяем переносы строк на пробелы
-    text = re.sub(r'\n+', ' ', text)
-    
-    # Разбиваем по точке, восклицательному и вопросительному знакам,
-    # после которых идёт пробел (или несколько) и заглавная буква, или конец строки
-    # Это предотвратит разбиение на сокращениях типа "т.е." или "и т.д."
-    sentences = re.split(r'(?<=[.!?])(?=\s+[A-ZА-ЯЁ]|\s*$)', text)
-    
-    # Фильтруем пустые строки, убираем лишние пробелы
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    # Оставляем только предложения с минимум 3 словами
-    # и которые заканчиваются знаком препинания
-    result = []
-    for sent in sentences:
-        # Проверяем количество слов
-        word_count = len([w for w in re.sub(r'[.,!?]', '', sent).split() if w.strip()])
-        # Проверяем что заканчивается знаком препинания
-        ends_with_punct = bool(re.search(r'[.!?]\s*$', sent))
-        
-        if word_count >= 3 and ends_with_punct:
-            # Фильтруем по языку если указан
-            if language is None or filter_sentence_by_language(sent, language):
-                result.append(sent)
-    
-    return result
+    return get_tokenizer(language).sentences(text)[0]
 
 
 def count_words_in_text(text: str) -> int:
@@ -196,7 +306,74 @@ def count_words_in_text(text: str) -> int:
     Returns:
         Количество слов
     """
-    # Убираем знаки препинания
-    text_no_punct = re.sub(r'[.,!?]', '', text)
-    words = text_no_punct.split()
-    return len([w for w in words if w.strip()])
+    return len(_PUNCT.sub('', text).split())
+
+
+def parse_text(raw_text: str, language: str) -> TokenizedText:
+    """
+    Очищает сырой текст и извлекает из него слова и предложения за один проход
+    
+    Args:
+        raw_text: Сырой текст
+        language: Язык текста ('ru' или 'en')
+    
+    Returns:
+        TokenizedText с очищенным текстом, уникальными словами и их частотами,
+        предложениями и количеством слов в каждом из них
+    """
+    return get_tokenizer(language).tokenize(raw_text)
+
+
+# Граница предложения: знак конца предложения, пробелы и заглавная буква
+# (то же правило, что и в extract_sentences)
+_SENTENCE_BOUNDARY = re.compile(r'[.!?]\s+(?=[A-ZА-ЯЁ])')
+
+
+def split_complete_text(buffer: str, block_size: int) -> tuple[str, str]:
+    """
+    Отделяет от начала буфера блок не больше block_size, готовый к обработке
+    
+    Пока буфер меньше block_size, ничего не отдаём. Затем режем по последней
+    границе предложения в пределах блока, чтобы не разорвать предложение
+    между блоками; если границы нет — по последнему пробелу (или жёстко).
+    
+    Args:
+        buffer: Накопленный текст
+        block_size: Размер блока в символах
+    
+    Returns:
+        Кортеж (готовый к обработке блок, остаток буфера)
+    """
+    if len(buffer) < block_size:
+        return '', buffer
+    
+    last_boundary = None
+    for last_boundary in _SENTENCE_BOUNDARY.finditer(buffer, 0, block_size):
+        pass
+    if last_boundary is not None:
+        return buffer[:last_boundary.start() + 1], buffer[last_boundary.end():]
+    
+    cut = max(buffer.rfind(' ', 0, block_size), buffer.rfind('\n', 0, block_size))
+    if cut <= 0:
+        cut = block_size
+    return buffer[:cut], buffer[cut:]
+
+
+def split_into_blocks(text: str, block_size: int) -> Iterator[str]:
+    """
+    Разбивает текст на блоки не больше block_size по границам предложений
+    
+    Args:
+        text: Сырой текст
+        block_size: Размер блока в символах
+    
+    Yields:
+        Блоки текста
+    """
+    rest = text
+    while rest:
+        block, rest = split_complete_text(rest, block_size)
+        if not block:
+            yield rest
+            return
+        yield block
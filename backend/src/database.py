@@ -35,6 +35,15 @@ AsyncSessionLocal = async_sessionmaker(
 Base = declarative_base()
 
 
+def dialect_insert(db: AsyncSession, model):
+    """INSERT для диалекта текущей БД (с поддержкой ON CONFLICT в PostgreSQL и SQLite)"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
+
 # Асинхронная функция-зависимость для получения сессии базы данных
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
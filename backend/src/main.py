@@ -14,7 +14,7 @@ from .theme.router import router as theme_router
 from .websocket.router import router as websocket_router
 from .admin.router import router as admin_router
 from .content.router import router as content_router
-from .database import Base, engine
+from .database import Base, engine, AsyncSessionLocal
 from .redis_client import redis_client
 
 
@@ -28,20 +28,53 @@ async def lifespan(app: FastAPI):
         # await conn.run_sync(Base.metadata.drop_all)  # Осторожно!
         await conn.run_sync(Base.metadata.create_all)
     
+    # Загружаем пулы контента в память, чтобы выдача слов и предложений не обращалась к БД
+    from .content.pool import word_pool, sentence_pool
+    async with AsyncSessionLocal() as session:
+        await word_pool.load(session)
+        await sentence_pool.load(session)
+    
     # Подключение к Redis
     try:
         await redis_client.connect()
     except Exception as e:
         print(f"⚠️ Redis connection failed: {e}. Running without cache.")
     
+    # Перестраиваем лидерборд в Redis по балансам из БД
+    from .stats.leaderboard import coin_leaderboard
+    try:
+        async with AsyncSessionLocal() as session:
+            await coin_leaderboard.rebuild(session)
+    except Exception as e:
+        print(f"⚠️ Leaderboard rebuild failed: {e}. Using SQL leaderboard.")
+    
     # Запускаем слушатель Redis для WebSocket
     from .websocket_manager import leaderboard_manager
     await leaderboard_manager.start_redis_listener()
     
+    # Запускаем обработчик фоновой загрузки контента
+    from .content.jobs import ingestion_queue
+    await ingestion_queue.start_worker()
+    
+    # Запускаем пополнение готовых наборов контента для старта теста
+    from .content.bundles import bundle_store
+    await bundle_store.start_worker()
+    
+    # Запускаем обработчик outbox (кэши, лидерборды и рассылки после сохранения сессий)
+    from .stats.outbox import outbox
+    await outbox.start_worker()
+    
     yield
     
     # Shutdown: Закрытие соединений
     leaderboard_manager.stop_redis_listener()
+    from .stats.broadcaster import leaderboard_broadcaster
+    leaderboard_broadcaster.stop()
+    ingestion_queue.stop_worker()
+    bundle_store.stop_worker()
+    outbox.stop_worker()
+    from .content.processing import text_processing_pool
+    text_processing_pool.shutdown()
     await redis_client.disconnect()
     await engine.dispose()
 
@@ -49,6 +49,36 @@ class RedisClient:
         if self.redis:
             await self.redis.set(key, value, ex=expire)
     
+    async def incr(self, key: str) -> Optional[int]:
+        """Атомарно увеличить счётчик на 1 и вернуть новое значение"""
+        if self.redis:
+            return await self.redis.incr(key)
+        return None
+    
+    async def incrby(self, key: str, amount: int) -> Optional[int]:
+        """Атомарно увеличить счётчик на amount и вернуть новое значение"""
+        if self.redis:
+            return await self.redis.incrby(key, amount)
+        return None
+    
+    async def set_nx(self, key: str, value: str, px: int) -> bool:
+        """Записать значение, только если ключа нет (SET NX PX); True — если записали"""
+        if self.redis:
+            return bool(await self.redis.set(key, value, nx=True, px=px))
+        return False
+    
+    async def getset(self, key: str, value: str) -> Optional[str]:
+        """Атомарно записать значение и вернуть предыдущее"""
+        if self.redis:
+            return await self.redis.getset(key, value)
+        return None
+    
+    async def pttl(self, key: str) -> int:
+        """Оставшееся время жизни ключа в миллисекундах (отрицательное, если TTL нет)"""
+        if self.redis:
+            return await self.redis.pttl(key)
+        return -2
+    
     async def delete(self, key: str):
         """Удалить значение из кэша"""
         if self.redis:
@@ -61,16 +91,101 @@ class RedisClient:
             if keys:
                 await self.redis.delete(*keys)
     
+    async def hset(self, key: str, mapping: dict, expire: Optional[int] = None):
+        """Записать поля хэша (с опциональным TTL)"""
+        if self.redis:
+            await self.redis.hset(key, mapping=mapping)
+            if expire:
+                await self.redis.expire(key, expire)
+    
+    async def hgetall(self, key: str) -> dict:
+        """Получить все поля хэша"""
+        if self.redis:
+            return await self.redis.hgetall(key)
+        return {}
+    
+    async def rpush(self, key: str, value: str):
+        """Добавить значение в конец списка"""
+        if self.redis:
+            await self.redis.rpush(key, value)
+    
+    async def blpop(self, key: str, timeout: int = 1) -> Optional[str]:
+        """Забрать значение из начала списка, ожидая до timeout секунд"""
+        if self.redis:
+            item = await self.redis.blpop(key, timeout=timeout)
+            if item:
+                return item[1]
+        return None
+    
+    async def zadd(self, key: str, mapping: dict):
+        """Записать элементы sorted set с их score"""
+        if self.redis:
+            await self.redis.zadd(key, mapping)
+    
+    def pipeline(self):
+        """Пачка команд за один round-trip (без MULTI); None, если Redis не подключен"""
+        if self.redis:
+            return self.redis.pipeline(transaction=False)
+        return None
+    
+    async def zincrby(self, key: str, amount: float, member: str) -> Optional[float]:
+        """Увеличить score элемента sorted set"""
+        if self.redis:
+            return await self.redis.zincrby(key, amount, member)
+        return None
+    
+    async def zrevrange(self, key: str, start: int, end: int, withscores: bool = False) -> list:
+        """Элементы sorted set по убыванию score в диапазоне позиций [start, end]"""
+        if self.redis:
+            return await self.redis.zrevrange(key, start, end, withscores=withscores)
+        return []
+    
+    async def zrevrank(self, key: str, member: str) -> Optional[int]:
+        """Позиция элемента в sorted set по убыванию score (с нуля)"""
+        if self.redis:
+            return await self.redis.zrevrank(key, member)
+        return None
+    
+    async def zcount(self, key: str, min_score, max_score) -> int:
+        """Количество элементов sorted set со score в диапазоне"""
+        if self.redis:
+            return await self.redis.zcount(key, min_score, max_score)
+        return 0
+    
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        """Score элемента sorted set"""
+        if self.redis:
+            return await self.redis.zscore(key, member)
+        return None
+    
+    async def zrem(self, key: str, member: str):
+        """Удалить элемент из sorted set"""
+        if self.redis:
+            await self.redis.zrem(key, member)
+    
+    async def eval(self, script: str, keys: list, args: list):
+        """Атомарно выполнить Lua-скрипт; None, если Redis не подключен"""
+        if self.redis:
+            return await self.redis.eval(script, len(keys), *keys, *args)
+        return None
+    
+    async def rename(self, key: str, new_key: str):
+        """Атомарно переименовать ключ (перезаписывая new_key)"""
+        if self.redis:
+            await self.redis.rename(key, new_key)
+    
     async def publish(self, channel: str, message: str):
         """Опубликовать сообщение в Redis Pub/Sub канал"""
         if self.redis:
             await self.redis.publish(channel, message)
     
-    async def subscribe(self, channel: str):
-        """Подписаться на Redis Pub/Sub канал"""
+    async def subscribe(self, channel: str, patterns: tuple = ()):
+        """Подписаться на Redis Pub/Sub канал (и, если заданы, на шаблоны каналов)"""
         if self.redis:
             pubsub = self.redis.pubsub()
             await pubsub.subscribe(channel)
+            if patterns:
+                await pubsub.psubscribe(*patterns)
             return pubsub
         return None
 
@@ -0,0 +1,108 @@
+"""
+Объединение частых обновлений лидерборда в одну рассылку за интервал
+"""
+import asyncio
+import logging
+import uuid
+from typing import Optional
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Количество запрошенных, но ещё не разосланных обновлений (общее для воркеров)
+PENDING_KEY = "leaderboard:broadcast:pending"
+# Блокировка интервала: пока ключ жив, рассылку не делает ни один воркер
+LOCK_KEY = "leaderboard:broadcast:lock"
+# Сколько обновлений всего было объединено с другими (метрика для всех воркеров)
+MERGED_KEY = "leaderboard:broadcast:merged"
+
+
+class LeaderboardBroadcaster:
+    """
+    Коалесцирующая рассылка обновлений лидерборда.
+
+    Изменение баланса только помечает лидерборд «грязным». Рассылка
+    выполняется не чаще раза в interval_ms на все воркеры: воркер,
+    захвативший блокировку SET NX PX на интервал, забирает счётчик
+    запросов и публикует одно обновление за все. Остальные воркеры
+    повторяют попытку, когда блокировка истечёт. Без Redis рассылать
+    некуда, поэтому запросы игнорируются.
+    """
+
+    def __init__(self, interval_ms: int):
+        self.interval_ms = interval_ms
+        self._task: Optional[asyncio.Task] = None
+        self._dirty = False
+        # Метрики процесса
+        self.requested = 0
+        self.published = 0
+        self.merged = 0
+
+    async def request_update(self):
+        """Пометить лидерборд изменившимся и запланировать рассылку"""
+        if redis_client.redis is None:
+            return
+        self.requested += 1
+        await redis_client.incr(PENDING_KEY)
+        # Флаг и проверка задачи — в одном синхронном участке после INCR: если цикл
+        # рассылки уже забрал счётчик без этого запроса, он увидит флаг и не завершится
+        self._dirty = True
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            delay = self.interval_ms
+            while True:
+                await asyncio.sleep(delay / 1000)
+                token = uuid.uuid4().hex
+                if not await redis_client.set_nx(LOCK_KEY, token, px=self.interval_ms):
+                    # В этом интервале рассылку делает другой воркер; он заберёт и наши
+                    # запросы, а если не успел — заберём их после истечения блокировки
+                    delay = max(await redis_client.pttl(LOCK_KEY), 1)
+                    continue
+                delay = self.interval_ms
+
+                self._dirty = False
+                pending = int(await redis_client.getset(PENDING_KEY, 0) or 0)
+                if pending:
+                    await self._flush(pending)
+                elif not self._dirty:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in leaderboard broadcaster: {e}", exc_info=True)
+        finally:
+            self._task = None
+
+    async def _flush(self, pending: int):
+        """Разослать одно обновление за pending запросов"""
+        await self._publish()
+        self.published += 1
+        if pending > 1:
+            self.merged += pending - 1
+            await redis_client.incrby(MERGED_KEY, pending - 1)
+        logger.info(
+            f"Published leaderboard update for {pending} changes "
+            f"(merged in this process: {self.merged}, published: {self.published})"
+        )
+
+    async def _publish(self):
+        # Сессия запроса к этому моменту уже закрыта, поэтому открываем свою
+        from .service import broadcast_leaderboard_update
+        async with AsyncSessionLocal() as db:
+            await broadcast_leaderboard_update(db)
+
+    def stop(self):
+        """Отменить запланированную рассылку"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+# Глобальный экземпляр рассылки обновлений лидерборда
+leaderboard_broadcaster = LeaderboardBroadcaster(settings["leaderboard"]["broadcast_interval_ms"])
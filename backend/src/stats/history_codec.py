@@ -0,0 +1,177 @@
+"""
+Компактное бинарное представление истории набора (typing_sessions.history)
+
+История хранится по столбцам, а не как JSON-массив словарей:
+
+    версия          1 байт
+    число слов      varint
+    длины слов      varint на слово
+    символы         varint (код символа + 1) на символ; 0 — «длинный» символ:
+                    за ним varint длины и UTF-8 байты (пустая строка, несколько кодовых точек)
+    correct         битовая маска, ceil(n / 8) байт, младший бит — первый символ
+    time            zigzag varint разности с предыдущим временем (первое — с нулём)
+
+Время нажатий растёт монотонно, поэтому разности укладываются в 1–2 байта,
+а символ кириллицы или латиницы — в 1–2 байта вместо ~40 байт JSON на нажатие.
+"""
+from typing import Any, Iterable, List, NamedTuple
+
+HISTORY_FORMAT_VERSION = 1
+
+
+class HistoryColumns(NamedTuple):
+    """Раскодированная история по столбцам"""
+    word_lengths: List[int]
+    chars: List[str]
+    correct: List[bool]
+    times: List[int]
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated typing history")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _field(char_item: Any, name: str, default: Any) -> Any:
+    if isinstance(char_item, dict):
+        return char_item.get(name, default)
+    return getattr(char_item, name, default)
+
+
+def history_columns(history: Iterable[Iterable[Any]]) -> HistoryColumns:
+    """
+    Разложить историю по столбцам
+
+    Элементы могут быть словарями (JSON) или объектами Pydantic; отсутствующий
+    `correct` считается правильным набором, отсутствующее `time` — нулём.
+    """
+    columns = HistoryColumns([], [], [], [])
+    for word in history:
+        length = 0
+        for c in word:
+            length += 1
+            columns.chars.append(_field(c, "char", "") or "")
+            columns.correct.append(bool(_field(c, "correct", True)))
+            columns.times.append(int(round(_field(c, "time", 0) or 0)))
+        columns.word_lengths.append(length)
+    return columns
+
+
+def encode_history_columns(columns: HistoryColumns) -> bytes:
+    """Закодировать историю, уже разложенную по столбцам"""
+    out = bytearray([HISTORY_FORMAT_VERSION])
+    _write_varint(out, len(columns.word_lengths))
+    for length in columns.word_lengths:
+        _write_varint(out, length)
+
+    for char in columns.chars:
+        if len(char) == 1:
+            _write_varint(out, ord(char) + 1)
+        else:
+            raw = char.encode("utf-8")
+            out.append(0)
+            _write_varint(out, len(raw))
+            out += raw
+
+    bitset = bytearray((len(columns.correct) + 7) // 8)
+    for index, correct in enumerate(columns.correct):
+        if correct:
+            bitset[index >> 3] |= 1 << (index & 7)
+    out += bitset
+
+    previous = 0
+    for time in columns.times:
+        delta = time - previous
+        previous = time
+        _write_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+    return bytes(out)
+
+
+def encode_history(history: Iterable[Iterable[Any]]) -> bytes:
+    """Закодировать историю набора (словари JSON или объекты Pydantic, см. history_columns)"""
+    return encode_history_columns(history_columns(history))
+
+
+def decode_history_columns(data: bytes) -> HistoryColumns:
+    """
+    Раскодировать историю по столбцам (без создания словаря на каждое нажатие)
+
+    Raises:
+        ValueError: данные повреждены или записаны неизвестной версией формата
+    """
+    data = bytes(data)
+    if not data or data[0] != HISTORY_FORMAT_VERSION:
+        raise ValueError("Unknown typing history format")
+    words_count, pos = _read_varint(data, 1)
+    word_lengths = []
+    for _ in range(words_count):
+        length, pos = _read_varint(data, pos)
+        word_lengths.append(length)
+    total = sum(word_lengths)
+
+    chars = []
+    for _ in range(total):
+        code, pos = _read_varint(data, pos)
+        if code:
+            chars.append(chr(code - 1))
+        else:
+            length, pos = _read_varint(data, pos)
+            if pos + length > len(data):
+                raise ValueError("Truncated typing history")
+            chars.append(data[pos:pos + length].decode("utf-8"))
+            pos += length
+
+    bitset_end = pos + (total + 7) // 8
+    if bitset_end > len(data):
+        raise ValueError("Truncated typing history")
+    bitset = data[pos:bitset_end]
+    correct = [bool(bitset[i >> 3] & (1 << (i & 7))) for i in range(total)]
+    pos = bitset_end
+
+    times = []
+    time = 0
+    for _ in range(total):
+        value, pos = _read_varint(data, pos)
+        time += (value >> 1) ^ -(value & 1)
+        times.append(time)
+    if pos != len(data):
+        raise ValueError("Trailing bytes in typing history")
+    return HistoryColumns(word_lengths, chars, correct, times)
+
+
+def decode_history(data: bytes) -> List[List[dict]]:
+    """
+    Раскодировать историю в исходный вид: список слов из словарей {char, correct, time}
+
+    Raises:
+        ValueError: данные повреждены или записаны неизвестной версией формата
+    """
+    columns = decode_history_columns(data)
+    history = []
+    index = 0
+    for length in columns.word_lengths:
+        end = index + length
+        history.append([
+            {"char": char, "correct": correct, "time": time}
+            for char, correct, time in zip(
+                columns.chars[index:end], columns.correct[index:end], columns.times[index:end]
+            )
+        ])
+        index = end
+    return history
@@ -0,0 +1,276 @@
+"""
+Лидерборд по монетам на Redis sorted set
+"""
+import logging
+import uuid
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth import models as auth_models
+from ..redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_KEY = "leaderboard:coins"
+# Временный ключ для перестроения: готовый набор атомарно заменяет основной
+REBUILD_KEY = "leaderboard:coins:rebuild:{token}"
+
+# Последний разосланный снимок лидерборда и счётчик его версий (для delta-протокола WebSocket)
+SNAPSHOT_KEY = "leaderboard:snapshot"
+VERSION_KEY = "leaderboard:version"
+SNAPSHOT_TTL = 24 * 60 * 60
+
+# Compare-and-swap публикации снимка: если снимок в Redis всё ещё тот, от которого
+# считались изменения, — увеличить версию, записать новый снимок и опубликовать
+# обновление одной атомарной операцией (версии уходят в канал строго по порядку).
+# KEYS: снимок, счётчик версий.
+# ARGV: ожидаемый снимок ('' — снимка нет), base_version в JSON, данные,
+#       изменения и удалённые id в JSON, TTL снимка, канал.
+# Возвращает новую версию или nil, если снимок успел обновить другой воркер.
+PUBLISH_SNAPSHOT_SCRIPT = """
+if (redis.call('GET', KEYS[1]) or '') ~= ARGV[1] then
+    return false
+end
+local version = redis.call('INCR', KEYS[2])
+redis.call('SET', KEYS[1], '{"version": ' .. version .. ', "data": ' .. ARGV[3] .. '}', 'EX', ARGV[6])
+redis.call('PUBLISH', ARGV[7], '{"version": ' .. version .. ', "base_version": ' .. ARGV[2]
+    .. ', "data": ' .. ARGV[3] .. ', "changes": ' .. ARGV[4] .. ', "removed": ' .. ARGV[5] .. '}')
+return version
+"""
+
+# Сколько пользователей записывать в Redis одной командой при перестроении
+REBUILD_CHUNK_SIZE = 1000
+
+# Элемент sorted set — (MEMBER_BASE - id) с ведущими нулями. При равном score
+# Redis упорядочивает элементы лексикографически, и в ZREVRANGE при равных
+# монетах пользователи идут по возрастанию id — как в SQL-лидерборде
+MEMBER_BASE = 10 ** 12
+MEMBER_WIDTH = 12
+
+
+def _member(user_id: int) -> str:
+    return f"{MEMBER_BASE - user_id:0{MEMBER_WIDTH}d}"
+
+
+def _user_id(member: str) -> int:
+    return MEMBER_BASE - int(member)
+
+
+def _coins():
+    return func.coalesce(auth_models.User.shilka_coins, 0)
+
+
+class CoinLeaderboard:
+    """
+    Лидерборд по монетам.
+
+    Score пользователя в sorted set равен его балансу и меняется через
+    ZINCRBY при каждом начислении, поэтому топ-N и место пользователя
+    считаются за O(log n + N), а не сортировкой всей таблицы users.
+    Набор перестраивается из Postgres при старте приложения; пока он не
+    построен (или Redis недоступен), используется SQL с LIMIT.
+    """
+
+    def __init__(self):
+        self._ready = False
+
+    @property
+    def is_ready(self) -> bool:
+        """Можно ли читать лидерборд из Redis"""
+        return self._ready and redis_client.redis is not None
+
+    async def rebuild(self, db: AsyncSession):
+        """Перестроить sorted set по балансам из БД"""
+        if redis_client.redis is None:
+            self._ready = False
+            return
+
+        temp_key = REBUILD_KEY.format(token=uuid.uuid4().hex)
+        result = await db.stream(
+            select(auth_models.User.id, _coins()).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+        )
+        total = 0
+        async for chunk in result.partitions(REBUILD_CHUNK_SIZE):
+            await redis_client.zadd(temp_key, {_member(user_id): coins for user_id, coins in chunk})
+            total += len(chunk)
+
+        if total:
+            await redis_client.rename(temp_key, LEADERBOARD_KEY)
+        else:
+            await redis_client.delete(LEADERBOARD_KEY)
+        self._ready = True
+        logger.info(f"Rebuilt coin leaderboard with {total} users")
+
+    async def increment(self, user_id: int, amount: int):
+        """Изменить баланс пользователя в лидерборде на amount (ZINCRBY)"""
+        if not self.is_ready or not amount:
+            return
+        try:
+            await redis_client.zincrby(LEADERBOARD_KEY, amount, _member(user_id))
+        except Exception as e:
+            logger.error(f"Failed to increment leaderboard score for user {user_id}: {e}")
+
+    async def set_coins(self, user_id: int, coins: int):
+        """Записать баланс пользователя (для новых пользователей и ручной правки)"""
+        if not self.is_ready:
+            return
+        try:
+            await redis_client.zadd(LEADERBOARD_KEY, {_member(user_id): coins or 0})
+        except Exception as e:
+            logger.error(f"Failed to set leaderboard score for user {user_id}: {e}")
+
+    async def remove(self, user_id: int):
+        """Убрать пользователя из лидерборда"""
+        if not self.is_ready:
+            return
+        try:
+            await redis_client.zrem(LEADERBOARD_KEY, _member(user_id))
+        except Exception as e:
+            logger.error(f"Failed to remove user {user_id} from leaderboard: {e}")
+
+    async def top(self, db: AsyncSession, limit: int) -> List[auth_models.User]:
+        """Лучшие пользователи по монетам (при равенстве — по возрастанию id)"""
+        return await self.page(db, limit)
+
+    async def page(self, db: AsyncSession, limit: int, offset: int = 0) -> List[auth_models.User]:
+        """
+        Страница лидерборда по позиции
+
+        Args:
+            db: Async сессия БД
+            limit: Размер страницы
+            offset: Сколько первых мест пропустить
+
+        Returns:
+            Пользователи в порядке лидерборда
+        """
+        if self.is_ready:
+            try:
+                members = await redis_client.zrevrange(LEADERBOARD_KEY, offset, offset + limit - 1)
+                return await self._load_users(db, [_user_id(member) for member in members])
+            except Exception as e:
+                logger.error(f"Failed to read leaderboard from Redis, falling back to SQL: {e}")
+
+        result = await db.execute(
+            select(auth_models.User)
+            .order_by(_coins().desc(), auth_models.User.id.asc())
+            .offset(offset)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def page_after(self, db: AsyncSession, coins: int, user_id: int, limit: int) -> List[auth_models.User]:
+        """
+        Страница лидерборда после курсора (coins, user_id) — последней записи предыдущей страницы
+
+        В отличие от offset курсор не сдвигается, когда пользователи выше
+        по таблице набирают монеты между запросами страниц.
+        """
+        if self.is_ready:
+            try:
+                start = await self._position_after(coins, user_id)
+                cursor = (coins, _member(user_id))
+                user_ids: List[int] = []
+                while len(user_ids) < limit:
+                    members = await redis_client.zrevrange(
+                        LEADERBOARD_KEY, start, start + limit - 1, withscores=True
+                    )
+                    if not members:
+                        break
+                    start += len(members)
+                    # Если баланс пользователя из курсора изменился, в выборку попадают
+                    # записи, которые уже были на предыдущей странице
+                    user_ids.extend(
+                        _user_id(member) for member, score in members
+                        if (int(score), member) < cursor
+                    )
+                return await self._load_users(db, user_ids[:limit])
+            except Exception as e:
+                logger.error(f"Failed to read leaderboard from Redis, falling back to SQL: {e}")
+
+        result = await db.execute(
+            select(auth_models.User)
+            .where(
+                or_(
+                    _coins() < coins,
+                    and_(_coins() == coins, auth_models.User.id > user_id),
+                )
+            )
+            .order_by(_coins().desc(), auth_models.User.id.asc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def _position_after(self, coins: int, user_id: int) -> int:
+        """Позиция в sorted set, с которой начинается страница после курсора"""
+        member = _member(user_id)
+        score = await redis_client.zscore(LEADERBOARD_KEY, member)
+        if score is not None and int(score) == coins:
+            return await redis_client.zrevrank(LEADERBOARD_KEY, member) + 1
+        # Баланс пользователя из курсора изменился: начинаем с первого
+        # пользователя с тем же количеством монет, лишнее отфильтруется
+        return await redis_client.zcount(LEADERBOARD_KEY, f"({coins}", "+inf")
+
+    async def rank(self, db: AsyncSession, user_id: int) -> Optional[int]:
+        """
+        Место пользователя в лидерборде (с единицы)
+
+        Returns:
+            Место или None, если пользователя нет
+        """
+        if self.is_ready:
+            try:
+                position = await redis_client.zrevrank(LEADERBOARD_KEY, _member(user_id))
+                if position is not None:
+                    return position + 1
+            except Exception as e:
+                logger.error(f"Failed to read leaderboard rank from Redis, falling back to SQL: {e}")
+
+        result = await db.execute(select(_coins()).where(auth_models.User.id == user_id))
+        coins = result.scalar_one_or_none()
+        if coins is None:
+            return None
+        ahead = await db.execute(
+            select(func.count()).select_from(auth_models.User).where(
+                or_(
+                    _coins() > coins,
+                    and_(_coins() == coins, auth_models.User.id < user_id),
+                )
+            )
+        )
+        return ahead.scalar_one() + 1
+
+    async def around(
+        self, db: AsyncSession, user_id: int, radius: int
+    ) -> tuple[Optional[int], List[auth_models.User]]:
+        """
+        Место пользователя и соседи по лидерборду
+
+        Args:
+            db: Async сессия БД
+            user_id: Пользователь
+            radius: Сколько соседей взять выше и ниже
+
+        Returns:
+            Кортеж (место или None, пользователи от rank - radius до rank + radius)
+        """
+        rank = await self.rank(db, user_id)
+        if rank is None:
+            return None, []
+        offset = max(0, rank - 1 - radius)
+        return rank, await self.page(db, rank + radius - offset, offset)
+
+    async def _load_users(self, db: AsyncSession, user_ids: List[int]) -> List[auth_models.User]:
+        """Загрузить пользователей по id, сохранив порядок лидерборда"""
+        if not user_ids:
+            return []
+        result = await db.execute(select(auth_models.User).where(auth_models.User.id.in_(user_ids)))
+        users = {user.id: user for user in result.scalars().all()}
+        # Пользователи, удалённые мимо лидерборда, просто пропускаются
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
+
+# Глобальный экземпляр лидерборда
+coin_leaderboard = CoinLeaderboard()
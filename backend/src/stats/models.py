@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, Text
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from src.database import Base
 
@@ -13,7 +13,7 @@ class TypingSession(Base):
     accuracy = Column(Float, nullable=False)
     duration = Column(Integer, nullable=True)  # секунды
     words = Column(Text, nullable=False)  # JSON строка списка слов
-    history = Column(Text, nullable=False)  # JSON строка истории
+    history = Column(LargeBinary, nullable=False)  # история в бинарном формате (stats/history_codec.py)
     typing_mode = Column(Text, nullable=True)  # режим набора (words, sentences, etc.)
     language = Column(Text, nullable=True)  # язык (ru, en, etc.)
     test_type = Column(Text, nullable=True)  # тип теста (time, words)
@@ -35,3 +35,55 @@ class CoinTransaction(Base):
     # Связи (опционально)
     user = relationship("User")
     typing_session = relationship("TypingSession")
+
+
+class UserWpmStat(Base):
+    """Лучшая и средняя скорость пользователя в категории (язык, режим, тип теста)"""
+    __tablename__ = "user_wpm_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "language", "typing_mode", "test_type", name="uq_user_wpm_stats_category"),
+        # Лидерборды категории читаются по индексу, без агрегации typing_sessions
+        Index("ix_user_wpm_stats_best", "language", "typing_mode", "test_type", "best_wpm"),
+        Index("ix_user_wpm_stats_avg", "language", "typing_mode", "test_type", "avg_wpm"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    language = Column(Text, nullable=False)
+    typing_mode = Column(Text, nullable=False)
+    test_type = Column(Text, nullable=False)
+    sessions_count = Column(Integer, nullable=False)
+    wpm_sum = Column(Float, nullable=False)
+    avg_wpm = Column(Float, nullable=False)
+    best_wpm = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    user = relationship("User")
+
+
+class CharErrorStat(Base):
+    """Сколько раз пользователь набрал символ и сколько раз ошибся (по всем сессиям)"""
+    __tablename__ = "char_error_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "char", name="uq_char_error_stats_user_char"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    char = Column(Text, nullable=False)
+    total = Column(Integer, nullable=False)
+    errors = Column(Integer, nullable=False)
+
+    user = relationship("User")
+
+
+class OutboxEvent(Base):
+    """Событие, записанное в транзакции запроса и обрабатываемое фоновым воркером (stats/outbox.py)"""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(Text, nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,154 @@
+"""
+Транзакционный outbox: побочные эффекты сохранения сессии выполняются фоновым воркером
+"""
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from . import models as stats_models
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxEventType:
+    # Сохранена сессия набора: {"session_id", "user_id", "coins"}
+    TYPING_SESSION_CREATED = "typing_session_created"
+
+
+def add_event(db: AsyncSession, event_type: str, payload: dict) -> stats_models.OutboxEvent:
+    """Записать событие в outbox (в транзакции вызывающего, фиксируется вместе с ней)"""
+    event = stats_models.OutboxEvent(event_type=event_type, payload=json.dumps(payload), attempts=0)
+    db.add(event)
+    return event
+
+
+class Outbox:
+    """
+    Фоновая обработка событий outbox.
+
+    Запрос пишет событие в той же транзакции, что и свои данные, и отвечает
+    сразу после commit: инвалидация кэшей, обновление лидербордов в Redis и
+    рассылки выполняются здесь. Событие удаляется после обработки, поэтому
+    ни одно зафиксированное событие не теряется при падении процесса —
+    его подберёт следующий проход этого или другого воркера. Каждое событие
+    забирается SELECT ... FOR UPDATE SKIP LOCKED и фиксируется отдельно,
+    так что воркеры разных процессов не обрабатывают одно событие дважды.
+    Событие, упавшее max_attempts раз, остаётся в таблице с last_error.
+    """
+
+    def __init__(self, poll_interval_ms: int, batch_size: int, max_attempts: int):
+        self.poll_interval_ms = poll_interval_ms
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._worker_task: Optional[asyncio.Task] = None
+        self._is_running = False
+        # Метрики процесса
+        self.processed = 0
+        self.failed = 0
+
+    def notify(self):
+        """Разбудить воркер после commit, не дожидаясь интервала опроса"""
+        self._wakeup.set()
+
+    async def drain(self, db: AsyncSession, limit: Optional[int] = None) -> int:
+        """
+        Обработать до limit ожидающих событий
+
+        Returns:
+            Количество успешно обработанных событий
+        """
+        processed = 0
+        # Курсор по id: упавшее событие повторяется только в следующем проходе
+        last_id = 0
+        for _ in range(limit or self.batch_size):
+            result = await db.execute(
+                select(stats_models.OutboxEvent)
+                .where(stats_models.OutboxEvent.id > last_id, stats_models.OutboxEvent.attempts < self.max_attempts)
+                .order_by(stats_models.OutboxEvent.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            event = result.scalar_one_or_none()
+            if event is None:
+                break
+            event_id = last_id = event.id
+            try:
+                await self._handle(db, event)
+            except Exception as e:
+                logger.error(f"Outbox event {event_id} ({event.event_type}) failed: {e}", exc_info=True)
+                # Откат снимает блокировку и сбрасывает загруженные объекты — перечитываем событие
+                await db.rollback()
+                event = await db.get(stats_models.OutboxEvent, event_id)
+                if event is None:
+                    continue
+                event.attempts += 1
+                event.last_error = str(e)
+                self.failed += 1
+            else:
+                await db.delete(event)
+                processed += 1
+            await db.commit()
+        self.processed += processed
+        return processed
+
+    async def _handle(self, db: AsyncSession, event: stats_models.OutboxEvent):
+        # Обработчики живут в service, который сам импортирует этот модуль
+        from .service import process_typing_session_created
+        payload = json.loads(event.payload)
+        if event.event_type == OutboxEventType.TYPING_SESSION_CREATED:
+            await process_typing_session_created(db, payload)
+        else:
+            raise ValueError(f"Unknown outbox event type: {event.event_type}")
+
+    async def start_worker(self):
+        """Запустить фоновый обработчик outbox"""
+        if self._is_running:
+            return
+        self._is_running = True
+        self._worker_task = asyncio.create_task(self._work())
+        logger.info("Started outbox worker")
+
+    def stop_worker(self):
+        """Остановить фоновый обработчик outbox"""
+        self._is_running = False
+        if self._worker_task:
+            self._worker_task.cancel()
+            logger.info("Stopped outbox worker")
+
+    async def _work(self):
+        try:
+            while self._is_running:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                try:
+                    async with AsyncSessionLocal() as db:
+                        # Полный проход — обрабатываем следующую пачку сразу
+                        while await self.drain(db) == self.batch_size:
+                            pass
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in outbox worker: {e}")
+                    await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            logger.info("Outbox worker cancelled")
+        finally:
+            self._is_running = False
+
+
+# Глобальный экземпляр outbox
+outbox = Outbox(
+    settings["outbox"]["poll_interval_ms"],
+    settings["outbox"]["batch_size"],
+    settings["outbox"]["max_attempts"],
+)
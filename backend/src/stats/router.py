@@ -1,15 +1,17 @@
 import json
 import logging
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 import os
 from fastapi_cache.decorator import cache
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from src.auth import utils as auth_utils, models as auth_models, schemas as auth_schemas
+from src.auth import utils as auth_utils, models as auth_models
 
 from src.stats import models, schemas
 from src.stats import service as stats_service
 
+from ..config import settings
 from ..database import get_db
 from ..redis_client import redis_client
 
@@ -17,10 +19,69 @@ from ..redis_client import redis_client
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/leaderboard", response_model=list[auth_schemas.UserPublic])
-async def get_leaderboard(db: AsyncSession = Depends(get_db)):
-    """Получить таблицу лидеров по монетам (кэшируется на 60 сек)"""
-    return await stats_service.get_leaderboard(db)
+@router.get("/leaderboard", response_model=list[schemas.LeaderboardEntry])
+async def get_leaderboard(
+    response: Response,
+    limit: int = Query(settings["leaderboard"]["size"], ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, pattern=r"^-?\d+:\d+$", description="Курсор 'монеты:id' из X-Next-Cursor"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Получить страницу таблицы лидеров по монетам
+
+    Страницы выбираются по offset или по курсору: если страница заполнена,
+    курсор следующей возвращается в заголовке X-Next-Cursor.
+    """
+    after = tuple(int(part) for part in cursor.split(":")) if cursor else None
+    entries = await stats_service.get_leaderboard_entries(db, limit, offset, after)
+    if len(entries) == limit:
+        response.headers["X-Next-Cursor"] = stats_service.leaderboard_cursor(entries[-1])
+    return entries
+
+
+@router.get("/leaderboard/me", response_model=schemas.LeaderboardPosition)
+async def get_leaderboard_position(
+    radius: int = Query(5, ge=0, le=50),
+    current_user: auth_models.User = Depends(auth_utils.get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Получить место текущего пользователя и radius соседей выше и ниже"""
+    return await stats_service.get_leaderboard_position(current_user, db, radius)
+
+
+@router.get("/leaderboard/wpm", response_model=list[schemas.WpmLeaderboardEntry])
+async def get_wpm_leaderboard(
+    language: str = Query(..., max_length=32),
+    mode: str = Query(..., max_length=32),
+    test_type: str = Query(..., alias="testType", max_length=32),
+    metric: Literal["best", "average"] = Query("best"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Получить лидерборд по лучшей или средней скорости для языка, режима и типа теста
+
+    Читается из агрегатов, обновляемых при сохранении сессий, а не из typing_sessions.
+    """
+    return await stats_service.get_wpm_leaderboard(db, metric, language, mode, test_type, limit, offset)
+
+
+@router.get("/leaderboard/window/{period}", response_model=list[schemas.WindowLeaderboardEntry])
+async def get_windowed_leaderboard(
+    period: Literal["day", "week", "month"],
+    metric: Literal["coins", "wpm"] = Query("coins"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Получить лидерборд за текущий день, неделю или месяц (UTC)
+
+    metric=coins — сумма монет, заработанных за период, metric=wpm — лучшая скорость за период.
+    """
+    return await stats_service.get_windowed_leaderboard(db, period, metric, limit, offset)
 
 
 @router.post("/typing-session", response_model=schemas.TypingSessionResponse)
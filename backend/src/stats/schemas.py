@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from pydantic import ConfigDict
 
 
+
 class AddCoinsRequest(BaseModel):
     amount: int
 
@@ -39,3 +40,33 @@ class CharErrorStat(BaseModel):
     error_rate: float
     total_typed: int
     errors: int
+
+
+class LeaderboardEntry(BaseModel):
+    """Запись лидерборда по монетам (общая для REST и WebSocket)"""
+    id: int
+    username: str
+    shilka_coins: int
+    rank: int
+
+
+class LeaderboardPosition(BaseModel):
+    rank: int | None
+    shilka_coins: int
+    neighbors: list[LeaderboardEntry]
+
+
+class WpmLeaderboardEntry(BaseModel):
+    rank: int
+    id: int
+    username: str
+    best_wpm: float
+    avg_wpm: float
+    sessions_count: int
+
+
+class WindowLeaderboardEntry(BaseModel):
+    rank: int
+    id: int
+    username: str
+    score: float
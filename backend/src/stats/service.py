@@ -2,148 +2,394 @@ import json
 import logging
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import case, select, func, update
 from fastapi_cache.decorator import cache
 
 from ..auth import models as auth_models
 from . import models as stats_models
 from . import schemas as stats_schemas
-from .utils import compute_wpm, compute_accuracy, compute_reward, compute_reward_from_history
+from .utils import diff_leaderboard, summarize_history
+from .history_codec import encode_history_columns
 from ..redis_client import redis_client
+from ..config import settings
+from ..database import dialect_insert
+from .leaderboard import PUBLISH_SNAPSHOT_SCRIPT, SNAPSHOT_KEY, SNAPSHOT_TTL, VERSION_KEY, coin_leaderboard
+from .broadcaster import leaderboard_broadcaster
+from .wpm_leaderboard import WpmMetric, wpm_leaderboard, wpm_topic
+from .windowed import windowed_leaderboard
+from .outbox import OutboxEventType, add_event, outbox
+from ..websocket_manager import publish_topic, rank_topic, rank_update_message, wpm_leaderboard_message
 
 logger = logging.getLogger(__name__)
 
+# Сколько раз пересчитать изменения, если снимок лидерборда успел обновить другой воркер
+PUBLISH_ATTEMPTS = 3
+
+
+def leaderboard_entries(users, start_rank: int = 1) -> list[dict]:
+    """
+    Компактные записи лидерборда (LeaderboardEntry) для REST и WebSocket
+
+    Только то, что нужно для отображения места: настройки пользователя
+    в каждой рассылке лишь увеличивали бы её размер.
+    """
+    return [
+        {
+            "id": user.id,
+            "username": user.username,
+            "shilka_coins": user.shilka_coins or 0,
+            "rank": rank,
+        }
+        for rank, user in enumerate(users, start=start_rank)
+    ]
+
+
+async def get_leaderboard_snapshot(db: AsyncSession) -> dict:
+    """Последний разосланный снимок лидерборда с его версией (для delta-клиентов WebSocket)"""
+    cached = await redis_client.get(SNAPSHOT_KEY)
+    if cached:
+        return json.loads(cached)
+    version = await redis_client.get(VERSION_KEY)
+    return {
+        "version": int(version) if version else 0,
+        "data": leaderboard_entries(await get_leaderboard(db)),
+    }
+
+
+async def get_rank_update(db: AsyncSession, user_id: int) -> dict | None:
+    """Сообщение топика rank:<id> с текущим местом пользователя (None, если пользователя нет)"""
+    user = await db.get(auth_models.User, user_id)
+    if user is None:
+        return None
+    rank = await coin_leaderboard.rank(db, user_id)
+    return rank_update_message(user_id, rank, user.shilka_coins or 0)
+
+
+async def publish_rank_update(db: AsyncSession, user_id: int):
+    """Отправить подписчикам топика rank:<id> новое место пользователя"""
+    if redis_client.redis is None:
+        return
+    try:
+        message = await get_rank_update(db, user_id)
+        if message is not None:
+            await publish_topic(rank_topic(user_id), message)
+    except Exception as e:
+        logger.error(f"Error publishing rank update for user {user_id}: {e}")
+
+
+async def get_wpm_leaderboard(
+    db: AsyncSession,
+    metric: str,
+    language: str,
+    typing_mode: str,
+    test_type: str,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[dict]:
+    """Страница лидерборда по скорости для категории (язык, режим, тип теста)"""
+    limit = limit or settings["leaderboard"]["size"]
+    return await wpm_leaderboard.page(db, metric, language, typing_mode, test_type, limit, offset)
+
+
+async def get_windowed_leaderboard(
+    db: AsyncSession,
+    period: str,
+    metric: str,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[dict]:
+    """Страница лидерборда за текущий день, неделю или месяц"""
+    limit = limit or settings["leaderboard"]["size"]
+    return await windowed_leaderboard.page(db, metric, period, limit, offset)
+
+
+async def publish_wpm_leaderboards(db: AsyncSession, typing_session: stats_models.TypingSession):
+    """
+    Отправить топ категории подписчикам её топиков wpm:*, если автор сессии в нём
+
+    Сессия, не попавшая в топ, его не меняет, поэтому и рассылать нечего.
+    """
+    category = wpm_leaderboard.category(typing_session)
+    if redis_client.redis is None or category is None:
+        return
+    try:
+        for metric in (WpmMetric.BEST, WpmMetric.AVERAGE):
+            entries = await get_wpm_leaderboard(db, metric, *category)
+            if any(entry["id"] == typing_session.user_id for entry in entries):
+                topic = wpm_topic(metric, *category)
+                await publish_topic(topic, wpm_leaderboard_message(topic, entries))
+    except Exception as e:
+        logger.error(f"Error publishing WPM leaderboards for session {typing_session.id}: {e}")
+
+
+async def get_topic_snapshot(db: AsyncSession, topic: str) -> dict | None:
+    """Текущее состояние топика WebSocket, которое клиент получает сразу после подписки"""
+    kind, _, rest = topic.partition(":")
+    if kind == "rank":
+        return await get_rank_update(db, int(rest))
+    if kind == "wpm":
+        metric, language, typing_mode, test_type = rest.split(":")
+        entries = await get_wpm_leaderboard(db, metric, language, typing_mode, test_type)
+        return wpm_leaderboard_message(topic, entries)
+    return None
+
 
 async def broadcast_leaderboard_update(db: AsyncSession):
-    """Отправить обновление лидерборда всем WebSocket клиентам через Redis Pub/Sub"""
+    """
+    Отправить обновление лидерборда всем WebSocket клиентам через Redis Pub/Sub
+
+    Сообщение содержит новую версию (счётчик в Redis), полный снимок для
+    клиентов старого протокола и изменения относительно предыдущего
+    разосланного снимка (base_version) для delta-клиентов. Версия, снимок
+    и публикация меняются Lua-скриптом (PUBLISH_SNAPSHOT_SCRIPT), только если
+    снимок в Redis тот же, от которого считались изменения: иначе (рассылку
+    параллельно сделал другой воркер) изменения пересчитываются от его снимка,
+    и две версии подряд никогда не строятся от одной базы.
+    """
     try:
         logger.info("Preparing leaderboard update for Redis broadcast")
         
         # Получаем актуальный лидерборд
-        leaderboard_data = await get_leaderboard(db)
+        leaderboard_json = leaderboard_entries(await get_leaderboard(db))
+        data = json.dumps(leaderboard_json)
         
-        # Преобразуем в JSON-совместимый формат
-        leaderboard_json = [
-            {
-                "id": user.id,
-                "username": user.username,
-                "shilka_coins": user.shilka_coins or 0,
-                "default_time": user.default_time,
-                "default_words": user.default_words,
-                "default_language": user.default_language,
-                "default_mode": user.default_mode,
-                "default_test_type": user.default_test_type,
-            }
-            for user in leaderboard_data
-        ]
+        for _ in range(PUBLISH_ATTEMPTS):
+            # Сравниваем с предыдущим разосланным снимком
+            previous_raw = await redis_client.get(SNAPSHOT_KEY)
+            previous = json.loads(previous_raw) if previous_raw else None
+            changes, removed = diff_leaderboard(previous["data"] if previous else [], leaderboard_json)
+            version = await redis_client.eval(
+                PUBLISH_SNAPSHOT_SCRIPT,
+                [SNAPSHOT_KEY, VERSION_KEY],
+                [
+                    previous_raw or "",
+                    json.dumps(previous["version"] if previous else None),
+                    data,
+                    json.dumps(changes),
+                    json.dumps(removed),
+                    SNAPSHOT_TTL,
+                    "leaderboard_update",
+                ],
+            )
+            if version is not None:
+                break
+            logger.info("Leaderboard snapshot changed concurrently, recomputing changes")
+        else:
+            logger.warning("Leaderboard update skipped: snapshot kept changing concurrently")
+            return
         
-        logger.info(f"Publishing leaderboard update to Redis with {len(leaderboard_json)} users")
+        logger.info(
+            f"Published leaderboard update v{version} to Redis with {len(leaderboard_json)} users, "
+            f"{len(changes)} changed, {len(removed)} removed"
+        )
         
-        # Публикуем в Redis
-        await redis_client.publish("leaderboard_update", json.dumps(leaderboard_json))
+        # Пользователям из топа, чьё место изменилось, — в их топики rank:<id>
+        for row in changes:
+            await publish_topic(
+                rank_topic(row["id"]), rank_update_message(row["id"], row["rank"], row["shilka_coins"])
+            )
         
         logger.info("Leaderboard update published to Redis successfully")
         
     except Exception as e:
         logger.error(f"Error in broadcast_leaderboard_update: {e}", exc_info=True)
 
+def _coin_balance_update(user_id: int, delta: int):
+    """UPDATE users SET shilka_coins = max(0, shilka_coins + delta) для одного пользователя"""
+    balance = func.coalesce(auth_models.User.shilka_coins, 0) + delta
+    return (
+        update(auth_models.User)
+        .where(auth_models.User.id == user_id)
+        .values(shilka_coins=case((balance < 0, 0), else_=balance))
+    )
+
+
+async def apply_coin_delta(db: AsyncSession, user_id: int, delta: int) -> auth_models.User | None:
+    """
+    Атомарно изменить баланс пользователя на delta, не ниже нуля (в транзакции вызывающего)
+
+    Баланс считается на стороне БД одним UPDATE ... RETURNING: без чтения и
+    записи значения из Python параллельные начисления не теряют друг друга.
+    Загруженный в сессию объект пользователя получает новый баланс из RETURNING.
+
+    Returns:
+        Пользователь с новым балансом или None, если пользователя нет
+    """
+    result = await db.execute(
+        _coin_balance_update(user_id, delta)
+        .returning(auth_models.User)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+
+def applied_coin_delta(delta: int, previous_balance: int, balance: int) -> int:
+    """
+    Какая часть delta применилась к балансу
+
+    RETURNING отдаёт только новый баланс, поэтому при упоре в ноль применённая
+    часть оценивается по балансу, прочитанному до UPDATE. Если параллельный
+    запрос успел изменить баланс, сумма может быть неточной — сам баланс точен.
+    """
+    if delta < 0 and not balance:
+        return max(delta, -previous_balance)
+    return delta
+
+
 async def add_coins(current_user: auth_models.User, amount: int, db: AsyncSession):
-    current_user.shilka_coins = (current_user.shilka_coins or 0) + amount
-    db.add(current_user)
+    previous_balance = int(current_user.shilka_coins or 0)
+    await apply_coin_delta(db, current_user.id, amount)
     await db.commit()
-    await db.refresh(current_user)
+    await coin_leaderboard.increment(
+        current_user.id, applied_coin_delta(amount, previous_balance, current_user.shilka_coins)
+    )
     await redis_client.invalidate_pattern("fastapi-cache:get_leaderboard*")
+    await publish_rank_update(db, current_user.id)
     
-    # Отправляем обновление лидерборда через WebSocket
-    await broadcast_leaderboard_update(db)
+    # Отправляем обновление лидерборда через WebSocket (объединяется с соседними)
+    await leaderboard_broadcaster.request_update()
     
     return current_user
 
 
-async def get_leaderboard(db: AsyncSession):
-    result = await db.execute(
-        select(auth_models.User)
-        .order_by(
-            func.coalesce(auth_models.User.shilka_coins, 0).desc(),
-            auth_models.User.id.asc(),
-        )
-    )
-    users = result.scalars().all()
-    return users
+async def get_leaderboard(
+    db: AsyncSession,
+    limit: int | None = None,
+    offset: int = 0,
+    after: tuple[int, int] | None = None,
+):
+    """
+    Страница лидерборда по монетам (из Redis sorted set или SQL с LIMIT)
+
+    Args:
+        db: Async сессия БД
+        limit: Размер страницы (по умолчанию размер лидерборда из настроек)
+        offset: Сколько первых мест пропустить
+        after: Курсор (монеты, id) последней записи предыдущей страницы;
+            если передан, offset игнорируется
+    """
+    limit = limit or settings["leaderboard"]["size"]
+    if after is not None:
+        return await coin_leaderboard.page_after(db, after[0], after[1], limit)
+    return await coin_leaderboard.page(db, limit, offset)
+
+
+async def get_leaderboard_entries(
+    db: AsyncSession,
+    limit: int | None = None,
+    offset: int = 0,
+    after: tuple[int, int] | None = None,
+) -> list[dict]:
+    """Страница лидерборда (как get_leaderboard) в виде компактных записей с местами"""
+    users = await get_leaderboard(db, limit, offset, after)
+    start_rank = offset + 1
+    if after is not None and users:
+        # Для страницы по курсору место первой записи берём из лидерборда
+        start_rank = await coin_leaderboard.rank(db, users[0].id) or 1
+    return leaderboard_entries(users, start_rank)
+
+
+def leaderboard_cursor(entry: dict) -> str:
+    """Курсор для страницы лидерборда, следующей за записью"""
+    return f"{entry['shilka_coins']}:{entry['id']}"
+
+
+async def get_leaderboard_position(current_user: auth_models.User, db: AsyncSession, radius: int):
+    """Место пользователя в лидерборде и его соседи сверху и снизу"""
+    rank, neighbors = await coin_leaderboard.around(db, current_user.id, radius)
+    return {
+        "rank": rank,
+        "shilka_coins": current_user.shilka_coins or 0,
+        "neighbors": leaderboard_entries(neighbors, max(1, (rank or 1) - radius)),
+    }
 
 
 async def create_typing_session(current_user: auth_models.User, payload: stats_schemas.WordHistoryPayload, db: AsyncSession):
-    wpm = compute_wpm(payload.words, payload.history, payload.duration)
-    accuracy = compute_accuracy(payload.history)
+    """
+    Сохранить сессию набора, начислить монеты и записать событие outbox
 
-    words_json = json.dumps(payload.words)
-    history_json = json.dumps([
-        [{"char": c.char, "correct": c.correct, "time": c.time} for c in word]
-        for word in payload.history
-    ])
+    История обходится один раз, все записи идут в одной транзакции с одним
+    commit. Это не один SQL-запрос: баланс (UPDATE ... RETURNING), агрегаты
+    скорости и ошибок (два upsert) и INSERT сессии, транзакции монет и события
+    outbox выполняются отдельными запросами. Собрать их в один data-modifying
+    CTE можно только в PostgreSQL, а сервис работает и на SQLite (тесты);
+    к тому же id сессии нужен транзакции и событию, поэтому сессия вставляется
+    до них.
+    """
+    # Один проход по истории: метрики, награда, ошибки по символам и столбцы для бинарной истории
+    summary = summarize_history(payload.history, payload.duration)
 
     typing_session = stats_models.TypingSession(
         user_id=current_user.id,
-        wpm=wpm,
-        accuracy=accuracy,
+        wpm=summary.wpm,
+        accuracy=summary.accuracy,
         duration=payload.duration,
-        words=words_json,
-        history=history_json,
+        words=json.dumps(payload.words),
+        # История хранится в компактном бинарном виде (см. history_codec)
+        history=encode_history_columns(summary.columns),
         typing_mode=payload.mode,
         language=payload.language,
         test_type=payload.test_type,
     )
 
-    db.add(typing_session)
+    # Начисление монет происходит на сервере: +1 за правильный символ, -1 за неправильный.
+    # Баланс меняется атомарно в БД и не уходит ниже нуля.
+    previous_balance = int(current_user.shilka_coins or 0)
+    await apply_coin_delta(db, current_user.id, summary.reward)
+    applied = applied_coin_delta(summary.reward, previous_balance, current_user.shilka_coins)
+
+    # Транзакция связана с сессией через relationship, поэтому сессия и транзакция
+    # записываются одним flush без промежуточного commit
+    txn = stats_models.CoinTransaction(user_id=current_user.id, typing_session=typing_session, amount=applied)
+    db.add_all([typing_session, txn])
+    # Агрегаты лидербордов по скорости и статистика ошибок обновляются в той же транзакции
+    await wpm_leaderboard.record_session(db, typing_session)
+    await record_char_errors(db, current_user.id, summary.char_errors)
+    # Кэши, лидерборды в Redis и рассылки обновляет воркер outbox после ответа
+    await db.flush()
+    add_event(db, OutboxEventType.TYPING_SESSION_CREATED, {
+        "session_id": typing_session.id,
+        "user_id": current_user.id,
+        "coins": applied,
+    })
     await db.commit()
-    await db.refresh(typing_session)
+    logger.info(f"Awarding {applied} coins to user {current_user.id} for typing session {typing_session.id}")
+    outbox.notify()
 
-    # Начисление монет происходит на сервере (идемпотентно): создаём запись CoinTransaction, связанную с typing_session
-    # Если для этой сессии уже есть транзакция, повторно не начисляем.
-    existing = await db.execute(
-        select(stats_models.CoinTransaction).filter(stats_models.CoinTransaction.typing_session_id == typing_session.id)
-    )
-    txn = existing.scalars().first()
-    if not txn:
-        # Вычисляем дельту по истории: +1 за правильный символ, -1 за неправильный
-        try:
-            # Сохраняем историю в JSON в typing_session.history; парсим её и считаем награду по ней.
-            history = json.loads(typing_session.history)
-        except Exception:
-            # Резервный вариант: приблизительно вычисляем по wpm/accuracy (маловероятный путь)
-            coins = compute_reward(typing_session.wpm, typing_session.accuracy, typing_session.duration, typing_session.test_type)
-        else:
-            coins = compute_reward_from_history(history)
-
-        # Гарантируем, что баланс пользователя не уйдёт ниже нуля
-        current_balance = int(current_user.shilka_coins or 0)
-        applied = coins
-        if current_balance + applied < 0:
-            # Ограничиваем отрицательное изменение так, чтобы баланс стал ровно 0
-            applied = -current_balance
-
-        # Обновляем баланс пользователя
-        current_user.shilka_coins = current_balance + applied
-        db.add(current_user)
-
-        txn = stats_models.CoinTransaction(
-            user_id=current_user.id,
-            typing_session_id=typing_session.id,
-            amount=applied,
-        )
-        logger.info(f"Awarding {applied} coins to user {current_user.id} for typing session {typing_session.id}")
-        db.add(txn)
-        await db.commit()
-        await db.refresh(current_user)
+    return typing_session
 
-    await redis_client.invalidate_pattern(f"fastapi-cache:get_typing_sessions*")
-    await redis_client.invalidate_pattern(f"fastapi-cache:get_char_error_stats*")
-    await redis_client.invalidate_pattern("fastapi-cache:get_leaderboard*")
 
-    # Отправляем обновление лидерборда через WebSocket
-    await broadcast_leaderboard_update(db)
+async def process_typing_session_created(db: AsyncSession, payload: dict):
+    """
+    Побочные эффекты сохранённой сессии (событие outbox TYPING_SESSION_CREATED)
 
-    return typing_session
+    Событие может обрабатываться повторно (ошибка Redis, падение до удаления,
+    перезапуск после rebuild лидерборда), поэтому все записи идемпотентны:
+    в лидерборд монет пишется текущий баланс из БД (ZADD), а не дельта, и
+    он же верен после ручной правки баланса админом; окна учитывают сессию
+    один раз по отметке (WindowedLeaderboard.record_once).
+    """
+    await redis_client.invalidate_pattern("fastapi-cache:get_typing_sessions*")
+    await redis_client.invalidate_pattern("fastapi-cache:get_char_error_stats*")
+    await redis_client.invalidate_pattern("fastapi-cache:get_leaderboard*")
+    # Рассылка объединяется с соседними и выполняется позже, так что её можно запросить сразу
+    await leaderboard_broadcaster.request_update()
+
+    user_id, coins = payload["user_id"], payload["coins"]
+    row = (await db.execute(
+        select(auth_models.User.shilka_coins).where(auth_models.User.id == user_id)
+    )).first()
+    # Пользователя или сессию могли удалить до обработки события
+    if row is None:
+        return
+    await coin_leaderboard.set_coins(user_id, row.shilka_coins)
+    typing_session = await db.get(stats_models.TypingSession, payload["session_id"])
+    if typing_session is not None:
+        await windowed_leaderboard.record_once(
+            typing_session.id, user_id, coins, typing_session.wpm, typing_session.created_at
+        )
+        await publish_wpm_leaderboards(db, typing_session)
+    await publish_rank_update(db, user_id)
 
 
 async def get_typing_sessions(current_user: auth_models.User, db: AsyncSession, limit: int = 10):
@@ -158,47 +404,62 @@ async def get_typing_sessions(current_user: auth_models.User, db: AsyncSession,
     return sessions
 
 
+async def record_char_errors(db: AsyncSession, user_id: int, counts: dict[str, list[int]], sign: int = 1):
+    """
+    Прибавить счётчики символов сессии к статистике ошибок пользователя (в транзакции вызывающего)
+
+    Args:
+        counts: символ -> [всего, ошибок] (см. count_char_errors)
+        sign: -1, чтобы вычесть счётчики удаляемой сессии
+    """
+    if not counts:
+        return
+    stat = stats_models.CharErrorStat
+    if sign < 0:
+        for char, (total, errors) in counts.items():
+            await db.execute(
+                update(stat)
+                .where(stat.user_id == user_id, stat.char == char)
+                .values(total=stat.total - total, errors=stat.errors - errors)
+            )
+        return
+    stmt = dialect_insert(db, stat).values([
+        {"user_id": user_id, "char": char, "total": total, "errors": errors}
+        for char, (total, errors) in counts.items()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["user_id", "char"],
+        set_={
+            "total": stat.total + stmt.excluded.total,
+            "errors": stat.errors + stmt.excluded.errors,
+        },
+    ))
+
+
 async def get_char_error_stats(current_user: auth_models.User, db: AsyncSession):
+    """
+    Статистика ошибок по символам из агрегатов char_error_stats
+
+    Агрегаты обновляются при сохранении каждой сессии, поэтому здесь читается
+    по строке на символ, а не все истории пользователя.
+    """
     result = await db.execute(
-        select(stats_models.TypingSession)
-        .filter(stats_models.TypingSession.user_id == current_user.id)
+        select(stats_models.CharErrorStat)
+        .filter(stats_models.CharErrorStat.user_id == current_user.id)
     )
-    sessions = result.scalars().all()
-
-    char_stats = {}
-    for session in sessions:
-        if not session.history:
-            continue
-        try:
-            history = json.loads(session.history)
-            for word in history:
-                for char_data in word:
-                    char = char_data.get("char", "")
-                    correct = char_data.get("correct", True)
-                    if not char:
-                        continue
-                    if char not in char_stats:
-                        char_stats[char] = {"total": 0, "errors": 0}
-                    char_stats[char]["total"] += 1
-                    if not correct:
-                        char_stats[char]["errors"] += 1
-        except (json.JSONDecodeError, KeyError, TypeError):
-            continue
 
     result_list = []
-    for char, stats in char_stats.items():
-        total = stats["total"]
-        errors = stats["errors"]
-        if total == 0:
+    for stat in result.scalars().all():
+        if stat.total <= 0:
             continue
-        error_rate = (errors / total * 100)
+        error_rate = (stat.errors / stat.total * 100)
         if error_rate == 100.0:
             continue
         result_list.append({
-            "char": char,
+            "char": stat.char,
             "error_rate": round(error_rate, 2),
-            "total_typed": total,
-            "errors": errors,
+            "total_typed": stat.total,
+            "errors": stat.errors,
         })
 
     result_list.sort(key=lambda x: x["error_rate"], reverse=True)
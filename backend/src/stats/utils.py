@@ -1,4 +1,6 @@
-from typing import Any, Iterable
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from .history_codec import HistoryColumns, decode_history_columns
 
 
 def _is_correct(char_item: Any) -> bool:
@@ -104,3 +106,115 @@ def compute_reward_from_history(history: Iterable[Iterable[Any]]) -> int:
                 incorrect += 1
 
     return correct - incorrect
+
+
+class HistorySummary(NamedTuple):
+    """Всё, что нужно для сохранения сессии, посчитанное за один проход по истории"""
+    wpm: float
+    accuracy: float
+    reward: int
+    char_errors: Dict[str, List[int]]
+    columns: HistoryColumns
+
+
+def summarize_history(history: Iterable[Iterable[Any]], duration: int | None) -> HistorySummary:
+    """Посчитать WPM, точность, награду и ошибки по символам за один проход по истории.
+
+    Результаты совпадают с `compute_wpm`, `compute_accuracy`, `compute_reward_from_history`
+    и `count_char_errors`; заодно история раскладывается по столбцам для `encode_history_columns`.
+    """
+    columns = HistoryColumns([], [], [], [])
+    char_errors: Dict[str, List[int]] = {}
+    correct_words = 0
+    correct_chars = 0
+    for word in history:
+        length = 0
+        all_correct = True
+        for c in word:
+            length += 1
+            correct = _is_correct(c)
+            if isinstance(c, dict):
+                char, time = c.get("char", ""), c.get("time", 0)
+            else:
+                char, time = getattr(c, "char", ""), getattr(c, "time", 0)
+            char = char or ""
+            columns.chars.append(char)
+            columns.correct.append(correct)
+            columns.times.append(int(round(time or 0)))
+            if correct:
+                correct_chars += 1
+            else:
+                all_correct = False
+            if char:
+                stat = char_errors.setdefault(char, [0, 0])
+                stat[0] += 1
+                if not correct:
+                    stat[1] += 1
+        columns.word_lengths.append(length)
+        if length and all_correct:
+            correct_words += 1
+
+    total_chars = len(columns.chars)
+    wpm = round(correct_words / (duration / 60.0), 2) if duration else 0.0
+    accuracy = round((correct_chars / total_chars) * 100.0, 2) if total_chars else 100.0
+    reward = correct_chars - (total_chars - correct_chars)
+    return HistorySummary(wpm, accuracy, reward, char_errors, columns)
+
+
+def diff_leaderboard(previous: List[dict], current: List[dict]) -> Tuple[List[dict], List[int]]:
+    """Сравнить два снимка лидерборда (списки записей с полем `id`).
+
+    Возвращает записи `current`, которые появились или изменились (включая место `rank`),
+    и id пользователей, выбывших из снимка. Неизменившиеся записи не возвращаются.
+    """
+    previous_by_id = {entry["id"]: entry for entry in previous}
+    current_ids = set()
+    changed = []
+    for entry in current:
+        current_ids.add(entry["id"])
+        if previous_by_id.get(entry["id"]) != entry:
+            changed.append(entry)
+    removed = [user_id for user_id in previous_by_id if user_id not in current_ids]
+    return changed, removed
+
+
+def count_char_errors(history: Iterable[Iterable[Any]]) -> Dict[str, List[int]]:
+    """Посчитать по истории, сколько раз набран каждый символ и сколько раз с ошибкой.
+
+    Возвращает словарь `символ -> [всего, ошибок]`. Элементы `history` могут быть словарями
+    (JSON) или объектами Pydantic; пустые символы пропускаются, отсутствующий `correct`
+    считается правильным набором (как в старом подсчёте по сохранённым историям).
+    """
+    counts: Dict[str, List[int]] = {}
+    for word in history:
+        for c in word:
+            if isinstance(c, dict):
+                char, correct = c.get("char", ""), c.get("correct", True)
+            else:
+                char, correct = getattr(c, "char", ""), getattr(c, "correct", True)
+            if not char:
+                continue
+            stat = counts.setdefault(char, [0, 0])
+            stat[0] += 1
+            if not correct:
+                stat[1] += 1
+    return counts
+
+
+def count_char_errors_encoded(history_data: bytes | None) -> Dict[str, List[int]]:
+    """То же, что `count_char_errors`, для сохранённой бинарной истории; повреждённая история даёт пустой результат."""
+    if not history_data:
+        return {}
+    try:
+        columns = decode_history_columns(history_data)
+    except ValueError:
+        return {}
+    counts: Dict[str, List[int]] = {}
+    for char, correct in zip(columns.chars, columns.correct):
+        if not char:
+            continue
+        stat = counts.setdefault(char, [0, 0])
+        stat[0] += 1
+        if not correct:
+            stat[1] += 1
+    return counts
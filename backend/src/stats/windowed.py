@@ -0,0 +1,197 @@
+"""
+Лидерборды за день, неделю и месяц на Redis sorted set с автоматическим истечением
+"""
+import calendar
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth import models as auth_models
+from ..redis_client import redis_client
+from . import models as stats_models
+from .leaderboard import _member, _user_id
+
+logger = logging.getLogger(__name__)
+
+
+class Period:
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class WindowMetric:
+    # Сумма монет, заработанных в окне
+    COINS = "coins"
+    # Лучшая скорость в окне
+    WPM = "wpm"
+
+
+PERIODS = (Period.DAY, Period.WEEK, Period.MONTH)
+
+WINDOW_KEY = "leaderboard:{metric}:{period}:{bucket}"
+# Отметка, что сессия уже учтена в окнах (защита от повторной обработки события outbox)
+RECORDED_KEY = "leaderboard:windows:recorded:{session_id}"
+# Отметка живёт дольше самого долгого окна (месяц и следующий за ним)
+RECORDED_TTL_MS = 62 * 24 * 60 * 60 * 1000
+
+
+def window_bounds(period: str, moment: datetime) -> tuple[datetime, datetime]:
+    """Начало (включительно) и конец (не включительно) окна, содержащего момент (UTC)"""
+    day = datetime(moment.year, moment.month, moment.day)
+    if period == Period.DAY:
+        return day, day + timedelta(days=1)
+    if period == Period.WEEK:
+        # Неделя по ISO: с понедельника
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == Period.MONTH:
+        start = day.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+    raise ValueError(f"Unknown leaderboard period: {period}")
+
+
+def window_bucket(period: str, moment: datetime) -> str:
+    """Имя окна в ключе: 2026-10-18, 2026-W42 или 2026-10"""
+    if period == Period.DAY:
+        return moment.strftime("%Y-%m-%d")
+    if period == Period.WEEK:
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == Period.MONTH:
+        return moment.strftime("%Y-%m")
+    raise ValueError(f"Unknown leaderboard period: {period}")
+
+
+def window_key(metric: str, period: str, moment: datetime) -> str:
+    """Ключ sorted set окна, содержащего момент"""
+    return WINDOW_KEY.format(metric=metric, period=period, bucket=window_bucket(period, moment))
+
+
+def window_expire_at(period: str, moment: datetime) -> int:
+    """
+    Когда ключ окна истекает (unix-время)
+
+    Окно остаётся доступным до конца следующего за ним окна, чтобы
+    «вчера» и «прошлую неделю» можно было посмотреть, пока идут текущие.
+    """
+    _, end = window_bounds(period, moment)
+    _, next_end = window_bounds(period, end)
+    return calendar.timegm(next_end.timetuple())
+
+
+class WindowedLeaderboard:
+    """
+    Лидерборды за день, неделю и месяц по монетам и лучшей скорости.
+
+    Каждое окно — отдельный sorted set, который обновляется при каждой
+    транзакции монет: ZINCRBY для суммы монет и ZADD GT для лучшей
+    скорости, все окна одной пачкой команд. Ключ окна получает EXPIREAT,
+    так что старые окна удаляет сам Redis. Без Redis окна считаются
+    агрегацией по coin_transactions и typing_sessions за период.
+    """
+
+    async def record(self, user_id: int, coins: int, wpm: float, moment: Optional[datetime] = None):
+        """Учесть транзакцию монет и скорость её сессии во всех окнах"""
+        pipe = redis_client.pipeline()
+        if pipe is None:
+            return
+        moment = moment or datetime.utcnow()
+        member = _member(user_id)
+        for period in PERIODS:
+            expire_at = window_expire_at(period, moment)
+            if coins:
+                coins_key = window_key(WindowMetric.COINS, period, moment)
+                pipe.zincrby(coins_key, coins, member)
+                pipe.expireat(coins_key, expire_at)
+            wpm_key = window_key(WindowMetric.WPM, period, moment)
+            pipe.zadd(wpm_key, {member: wpm}, gt=True)
+            pipe.expireat(wpm_key, expire_at)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to update windowed leaderboards for user {user_id}: {e}")
+
+    async def record_once(self, session_id: int, user_id: int, coins: int, wpm: float, moment: datetime):
+        """
+        Учесть сессию в окнах не более одного раза
+
+        ZINCRBY не идемпотентен, поэтому перед записью ставится отметка SET NX
+        по id сессии: повторная обработка того же события окна не меняет.
+        Если запись окон упадёт после отметки, сессия в них не попадёт —
+        потерять одну сессию лучше, чем посчитать её дважды.
+        """
+        if not await redis_client.set_nx(RECORDED_KEY.format(session_id=session_id), "1", px=RECORDED_TTL_MS):
+            return
+        await self.record(user_id, coins, wpm, moment)
+
+    async def page(
+        self,
+        db: AsyncSession,
+        metric: str,
+        period: str,
+        limit: int,
+        offset: int = 0,
+        moment: Optional[datetime] = None,
+    ) -> List[dict]:
+        """
+        Страница лидерборда окна, содержащего момент (по умолчанию — текущего)
+
+        Returns:
+            Записи с местом, пользователем и его результатом в окне
+        """
+        moment = moment or datetime.utcnow()
+        if redis_client.redis is not None:
+            try:
+                members = await redis_client.zrevrange(
+                    window_key(metric, period, moment), offset, offset + limit - 1, withscores=True
+                )
+                scores = [(_user_id(member), score) for member, score in members]
+                return await self._entries(db, metric, scores, offset)
+            except Exception as e:
+                logger.error(f"Failed to read windowed leaderboard from Redis, falling back to SQL: {e}")
+
+        start, end = window_bounds(period, moment)
+        if metric == WindowMetric.COINS:
+            model, score = stats_models.CoinTransaction, func.sum(stats_models.CoinTransaction.amount)
+        else:
+            model, score = stats_models.TypingSession, func.max(stats_models.TypingSession.wpm)
+        result = await db.execute(
+            select(model.user_id, score)
+            .where(model.created_at >= start, model.created_at < end)
+            .group_by(model.user_id)
+            .order_by(score.desc(), model.user_id.asc())
+            .offset(offset)
+            .limit(limit)
+        )
+        return await self._entries(db, metric, result.all(), offset)
+
+    @staticmethod
+    async def _entries(db: AsyncSession, metric: str, scores: list, offset: int) -> List[dict]:
+        user_ids = [user_id for user_id, _ in scores]
+        if not user_ids:
+            return []
+        result = await db.execute(
+            select(auth_models.User.id, auth_models.User.username).where(auth_models.User.id.in_(user_ids))
+        )
+        usernames = dict(result.all())
+        entries = []
+        for user_id, score in scores:
+            # Пользователи, удалённые после начала окна, пропускаются
+            if user_id not in usernames:
+                continue
+            entries.append({
+                "rank": offset + len(entries) + 1,
+                "id": user_id,
+                "username": usernames[user_id],
+                "score": int(score) if metric == WindowMetric.COINS else round(score, 2),
+            })
+        return entries
+
+
+# Глобальный экземпляр лидербордов за период
+windowed_leaderboard = WindowedLeaderboard()
@@ -0,0 +1,160 @@
+"""
+Лидерборды по скорости набора для каждой категории (язык, режим, тип теста)
+"""
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth import models as auth_models
+from ..database import dialect_insert
+from . import models as stats_models
+
+logger = logging.getLogger(__name__)
+
+
+class WpmMetric:
+    BEST = "best"
+    AVERAGE = "average"
+
+
+def wpm_topic(metric: str, language: str, typing_mode: str, test_type: str) -> str:
+    """Топик WebSocket с лидербордом категории"""
+    return f"wpm:{metric}:{language}:{typing_mode}:{test_type}"
+
+
+class WpmLeaderboard:
+    """
+    Лидерборды по лучшей и средней скорости.
+
+    Агрегаты пользователя по категории хранятся в таблице user_wpm_stats и
+    обновляются одним UPSERT при сохранении каждой сессии, поэтому чтение
+    лидерборда — это выборка по индексу (категория, best_wpm/avg_wpm) с
+    LIMIT, а не GROUP BY по всем typing_sessions. Сессии без языка, режима
+    или типа теста ни в одну категорию не попадают.
+    """
+
+    @staticmethod
+    def category(session: stats_models.TypingSession) -> Optional[tuple[str, str, str]]:
+        """Категория сессии или None, если она неполная"""
+        if not (session.language and session.typing_mode and session.test_type):
+            return None
+        return session.language, session.typing_mode, session.test_type
+
+    async def record_session(self, db: AsyncSession, session: stats_models.TypingSession) -> bool:
+        """
+        Учесть сессию в агрегатах её категории (в транзакции вызывающего)
+
+        Returns:
+            False, если сессия не относится ни к одной категории
+        """
+        category = self.category(session)
+        if category is None:
+            return False
+        language, typing_mode, test_type = category
+        stat = stats_models.UserWpmStat
+        stmt = dialect_insert(db, stat).values(
+            user_id=session.user_id,
+            language=language,
+            typing_mode=typing_mode,
+            test_type=test_type,
+            sessions_count=1,
+            wpm_sum=session.wpm,
+            avg_wpm=session.wpm,
+            best_wpm=session.wpm,
+            updated_at=datetime.utcnow(),
+        )
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "language", "typing_mode", "test_type"],
+            set_={
+                "sessions_count": stat.sessions_count + 1,
+                "wpm_sum": stat.wpm_sum + stmt.excluded.wpm_sum,
+                "avg_wpm": (stat.wpm_sum + stmt.excluded.wpm_sum) / (stat.sessions_count + 1),
+                "best_wpm": case(
+                    (stmt.excluded.best_wpm > stat.best_wpm, stmt.excluded.best_wpm),
+                    else_=stat.best_wpm,
+                ),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+        return True
+
+    async def refresh(self, db: AsyncSession, user_id: int, language: str, typing_mode: str, test_type: str):
+        """
+        Пересчитать агрегаты пользователя в категории по его сессиям
+
+        Нужен после удаления сессии: лучший результат нельзя «вычесть».
+        Сессии выбираются по индексу user_id, так что это дёшево.
+        """
+        session = stats_models.TypingSession
+        result = await db.execute(
+            select(func.count(), func.sum(session.wpm), func.max(session.wpm)).where(
+                session.user_id == user_id,
+                session.language == language,
+                session.typing_mode == typing_mode,
+                session.test_type == test_type,
+            )
+        )
+        count, wpm_sum, best_wpm = result.one()
+        stat = stats_models.UserWpmStat
+        await db.execute(delete(stat).where(
+            stat.user_id == user_id,
+            stat.language == language,
+            stat.typing_mode == typing_mode,
+            stat.test_type == test_type,
+        ))
+        if count:
+            db.add(stat(
+                user_id=user_id,
+                language=language,
+                typing_mode=typing_mode,
+                test_type=test_type,
+                sessions_count=count,
+                wpm_sum=wpm_sum,
+                avg_wpm=wpm_sum / count,
+                best_wpm=best_wpm,
+            ))
+
+    async def page(
+        self,
+        db: AsyncSession,
+        metric: str,
+        language: str,
+        typing_mode: str,
+        test_type: str,
+        limit: int,
+        offset: int = 0,
+    ) -> List[dict]:
+        """
+        Страница лидерборда категории
+
+        Returns:
+            Записи с местом, пользователем и его лучшей и средней скоростью
+        """
+        stat = stats_models.UserWpmStat
+        order = stat.best_wpm if metric == WpmMetric.BEST else stat.avg_wpm
+        result = await db.execute(
+            select(stat, auth_models.User.username)
+            .join(auth_models.User, auth_models.User.id == stat.user_id)
+            .where(stat.language == language, stat.typing_mode == typing_mode, stat.test_type == test_type)
+            .order_by(order.desc(), stat.user_id.asc())
+            .offset(offset)
+            .limit(limit)
+        )
+        return [
+            {
+                "rank": rank,
+                "id": row.user_id,
+                "username": username,
+                "best_wpm": row.best_wpm,
+                "avg_wpm": round(row.avg_wpm, 2),
+                "sessions_count": row.sessions_count,
+            }
+            for rank, (row, username) in enumerate(result.all(), start=offset + 1)
+        ]
+
+
+# Глобальный экземпляр лидербордов по скорости
+wpm_leaderboard = WpmLeaderboard()
@@ -3,13 +3,13 @@ WebSocket роутер для real-time обновлений лидерборд
 """
 import logging
 import asyncio
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from typing import Literal
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_db
-from ..websocket_manager import leaderboard_manager
-from ..stats.service import get_leaderboard
-from ..auth.schemas import UserPublic
+from ..websocket_manager import leaderboard_manager, snapshot_message
+from ..stats.service import get_leaderboard, get_leaderboard_snapshot, get_topic_snapshot, leaderboard_entries
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +19,13 @@ router = APIRouter()
 @router.websocket("/leaderboard")
 async def websocket_leaderboard(
     websocket: WebSocket,
+    protocol: Literal["full", "delta"] = Query("full"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     WebSocket endpoint для real-time обновлений лидерборда
     
-    Протокол сообщений:
+    Протокол сообщений (protocol=full, по умолчанию):
     
     От сервера к клиенту:
     - {"type": "leaderboard_update", "data": [...]}
@@ -34,33 +35,47 @@ async def websocket_leaderboard(
     От клиента к серверу:
     - {"type": "ping"}
     - {"type": "pong"}
+    - {"type": "subscribe", "topic": "..."} / {"type": "unsubscribe", "topic": "..."}
+    
+    Топики (при подключении соединение подписано на leaderboard):
+    - leaderboard — обновления лидерборда в формате выбранного протокола
+    - rank:<id> — {"type": "rank_update", "topic": "rank:<id>", "user_id": id, "rank": N, "shilka_coins": N}
+      сразу после подписки и при каждом изменении места пользователя
+    - wpm:<best|average>:<язык>:<режим>:<тип теста> — {"type": "wpm_leaderboard_update", "topic": "...", "data": [...]}
+      топ категории по лучшей или средней скорости: сразу после подписки и когда его меняет новая сессия
+    На подписку сервер отвечает {"type": "subscribed", "topic": "..."}.
+    
+    Delta-протокол (protocol=delta) вместо leaderboard_update присылает:
+    - {"type": "leaderboard_snapshot", "version": N, "data": [...]} — при подключении и по запросу
+    - {"type": "rank_changed", "version": N, "base_version": M, "data": [...], "removed": [id, ...]}
+      — только изменившиеся строки (с полем rank) относительно версии M
+    
+    Если base_version не совпадает с версией клиента, клиент отправляет
+    {"type": "resync"} и получает свежий снимок.
+    
+    Записи лидерборда компактные: {"id", "username", "shilka_coins", "rank"}.
     """
-    await leaderboard_manager.connect(websocket)
+    delta = protocol == "delta"
+    await leaderboard_manager.connect(websocket, delta=delta)
     ping_task = None
 
+    async def send_snapshot():
+        snapshot = await get_leaderboard_snapshot(db)
+        await leaderboard_manager.send_personal_message(
+            snapshot_message(snapshot["version"], snapshot["data"]), websocket
+        )
+
     try:
         # Отправляем начальные данные лидерборда
         try:
-            leaderboard_data = await get_leaderboard(db)
-            # Преобразуем в схему UserPublic для сериализации
-            leaderboard_json = [
-                {
-                    "id": user.id,
-                    "username": user.username,
-                    "shilka_coins": user.shilka_coins or 0,
-                    "default_time": user.default_time,
-                    "default_words": user.default_words,
-                    "default_language": user.default_language,
-                    "default_mode": user.default_mode,
-                    "default_test_type": user.default_test_type,
-                }
-                for user in leaderboard_data
-            ]
-
-            await websocket.send_json({
-                "type": "leaderboard_update",
-                "data": leaderboard_json
-            })
+            if delta:
+                await send_snapshot()
+            else:
+                leaderboard_data = await get_leaderboard(db)
+                await leaderboard_manager.send_personal_message({
+                    "type": "leaderboard_update",
+                    "data": leaderboard_entries(leaderboard_data)
+                }, websocket)
             logger.info("Sent initial leaderboard data to new client")
 
         except Exception as e:
@@ -76,7 +91,7 @@ async def websocket_leaderboard(
                 while True:
                     await asyncio.sleep(30)  # Каждые 30 секунд
                     if websocket.client_state.value == 1:  # CONNECTED
-                        await websocket.send_json({"type": "ping"})
+                        await leaderboard_manager.send_personal_message({"type": "ping"}, websocket)
                         logger.debug("Sent ping to client")
             except Exception as e:
                 logger.debug(f"Ping task stopped: {e}")
@@ -91,13 +106,39 @@ async def websocket_leaderboard(
 
                 if message_type == "ping":
                     # Отвечаем на ping от клиента
-                    await websocket.send_json({"type": "pong"})
+                    await leaderboard_manager.send_personal_message({"type": "pong"}, websocket)
                     logger.debug("Responded to ping with pong")
 
                 elif message_type == "pong":
                     # Клиент ответил на наш ping
                     logger.debug("Received pong from client")
 
+                elif message_type == "subscribe":
+                    topic = str(data.get("topic", ""))
+                    if not leaderboard_manager.subscribe(websocket, topic):
+                        await leaderboard_manager.send_error(websocket, f"Cannot subscribe to topic: {topic}")
+                        continue
+                    await leaderboard_manager.send_personal_message(
+                        {"type": "subscribed", "topic": topic}, websocket
+                    )
+                    if topic != "leaderboard":
+                        # Текущее состояние топика — сразу, дальше только изменения
+                        topic_snapshot = await get_topic_snapshot(db, topic)
+                        if topic_snapshot is not None:
+                            await leaderboard_manager.send_personal_message(topic_snapshot, websocket)
+
+                elif message_type == "unsubscribe":
+                    topic = str(data.get("topic", ""))
+                    leaderboard_manager.unsubscribe(websocket, topic)
+                    await leaderboard_manager.send_personal_message(
+                        {"type": "unsubscribed", "topic": topic}, websocket
+                    )
+
+                elif message_type == "resync" and delta:
+                    # Клиент пропустил версию — отправляем полный снимок
+                    await send_snapshot()
+                    logger.debug("Sent leaderboard snapshot on resync")
+
                 else:
                     logger.warning(f"Unknown message type: {message_type}")
 
@@ -4,43 +4,226 @@ WebSocket Connection Manager для real-time обновлений
 import logging
 import asyncio
 import json
-from typing import Set
+import re
+from typing import Dict, Optional, Set
 from fastapi import WebSocket
 
+from .config import settings
+from .redis_client import redis_client
+
 logger = logging.getLogger(__name__)
 
+# Код закрытия для клиента, не успевающего читать сообщения (Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Топики, на которые может подписаться клиент
+LEADERBOARD_TOPIC = "leaderboard"
+TOPIC_RE = re.compile(r"^(leaderboard|rank:\d+|wpm:(best|average)(:[\w-]{1,32}){3})$")
+# Сколько топиков одновременно может слушать одно соединение
+MAX_TOPICS_PER_CONNECTION = 32
+
+# Сообщения топиков публикуются в Redis-каналы ws:<топик>; каждый воркер
+# слушает их по шаблону и раздаёт только своим подписчикам
+TOPIC_CHANNEL_PREFIX = "ws:"
+
+# Сколько сообщений Redis слушатель забирает за раз
+LISTENER_BATCH_SIZE = 1000
+# Задержка перед повторной подпиской после ошибки Redis (секунды, удваивается)
+LISTENER_RETRY_MIN_DELAY = 1.0
+LISTENER_RETRY_MAX_DELAY = 30.0
+
+
+def rank_topic(user_id: int) -> str:
+    """Топик места пользователя в лидерборде"""
+    return f"rank:{user_id}"
+
+
+def encode_message(message: dict) -> str:
+    """Сериализовать сообщение один раз для отправки любому количеству клиентов"""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
 
 class ConnectionManager:
-    """Управление WebSocket соединениями для лидерборда"""
+    """
+    Управление WebSocket соединениями и их подписками на топики
 
-    def __init__(self):
+    Соединение получает сообщения только тех топиков, на которые подписано:
+    при подключении — на лидерборд (leaderboard), дальше клиент сам
+    подписывается, например, на своё место (rank:<id>) или отписывается.
+    У каждого соединения своя ограниченная очередь и своя задача отправки.
+    Рассылка сериализует сообщение один раз и только кладёт готовую строку
+    в очереди, не дожидаясь клиентов, поэтому медленный клиент не задерживает
+    остальных. Клиент, у которого накопилось больше send_queue_size
+    неотправленных сообщений, отключается: после переподключения он получит
+    свежий снимок.
+    """
+
+    def __init__(self, send_queue_size: int = settings["websocket"]["send_queue_size"]):
         self.active_connections: Set[WebSocket] = set()
+        # Клиенты delta-протокола: получают только изменившиеся строки
+        self.delta_connections: Set[WebSocket] = set()
+        self.send_queue_size = send_queue_size
+        self._queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+        # Подписчики каждого топика и топики каждого соединения
+        self._subscribers: Dict[str, Set[WebSocket]] = {}
+        self._topics: Dict[WebSocket, Set[str]] = {}
         self._redis_listener_task = None
         self._is_listening = False
+        # Прочитанное из Redis, но ещё не разосланное
+        self._pending_update: Optional[dict] = None
+        self._pending_topics: Dict[str, str] = {}
+        self._pending_ready = asyncio.Event()
+        # Сколько обновлений лидерборда слито с более новыми, не дойдя до клиентов
+        self.merged_updates = 0
+
+    async def connect(self, websocket: WebSocket, delta: bool = False):
+        """
+        Принять новое WebSocket соединение
 
-    async def connect(self, websocket: WebSocket):
-        """Принять новое WebSocket соединение"""
+        Args:
+            delta: Клиент delta-протокола
+        """
         await websocket.accept()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.send_queue_size)
+        self._queues[websocket] = queue
+        self._senders[websocket] = asyncio.create_task(self._send_loop(websocket, queue))
         self.active_connections.add(websocket)
+        if delta:
+            self.delta_connections.add(websocket)
+        self.subscribe(websocket, LEADERBOARD_TOPIC)
         logger.info(f"New WebSocket connection. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
         """Удалить WebSocket соединение"""
+        if websocket not in self.active_connections:
+            return
         self.active_connections.discard(websocket)
+        self.delta_connections.discard(websocket)
+        for topic in self._topics.pop(websocket, set()):
+            self._discard_subscriber(topic, websocket)
+        self._queues.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender and sender is not asyncio.current_task():
+            sender.cancel()
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Отправить сообщение конкретному клиенту"""
+    def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """
+        Подписать соединение на топик
+
+        Returns:
+            False, если топик неизвестен или у соединения слишком много подписок
+        """
+        if websocket not in self.active_connections or not TOPIC_RE.match(topic):
+            return False
+        topics = self._topics.setdefault(websocket, set())
+        if topic not in topics and len(topics) >= MAX_TOPICS_PER_CONNECTION:
+            return False
+        topics.add(topic)
+        self._subscribers.setdefault(topic, set()).add(websocket)
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        """Отписать соединение от топика"""
+        self._topics.get(websocket, set()).discard(topic)
+        self._discard_subscriber(topic, websocket)
+
+    def _discard_subscriber(self, topic: str, websocket: WebSocket):
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def subscribers(self, topic: str) -> Set[WebSocket]:
+        """Соединения, подписанные на топик"""
+        return self._subscribers.get(topic, set())
+
+    def publish_local(self, topic: str, payload: str) -> int:
+        """
+        Раздать уже сериализованное сообщение топика подписчикам этого процесса
+
+        Returns:
+            Сколько соединений получили сообщение в очередь
+        """
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return 0
+        return self._fan_out(subscribers, payload)
+
+    def _fan_out(self, connections: Set[WebSocket], payload: str) -> int:
+        """Поставить уже сериализованное сообщение в очереди соединений"""
+        sent_count = 0
+        for connection in list(connections):
+            sent_count += self._enqueue(connection, payload)
+        return sent_count
+
+    async def _send_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Отправлять сообщения из очереди соединения по порядку"""
         try:
-            await websocket.send_json(message)
+            while True:
+                payload = await queue.get()
+                try:
+                    await websocket.send_text(payload)
+                finally:
+                    queue.task_done()
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
+            logger.error(f"Error sending to client {id(websocket)}: {e}")
+            self.disconnect(websocket)
+
+    def _enqueue(self, websocket: WebSocket, payload: str) -> bool:
+        """
+        Поставить готовое сообщение в очередь соединения
+
+        Returns:
+            False, если соединения нет или оно отключено как медленное
+        """
+        queue = self._queues.get(websocket)
+        if queue is None:
+            return False
+        try:
+            queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(
+                f"Client {id(websocket)} has {queue.qsize()} unsent messages, disconnecting slow consumer"
+            )
             self.disconnect(websocket)
+            asyncio.create_task(self._close(websocket, SLOW_CONSUMER_CLOSE_CODE))
+            return False
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception as e:
+            logger.debug(f"Error closing WebSocket {id(websocket)}: {e}")
+
+    async def drain(self):
+        """Дождаться отправки всех сообщений, уже поставленных в очереди"""
+        await asyncio.gather(*(queue.join() for queue in list(self._queues.values())))
+
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """Отправить сообщение конкретному клиенту (в порядке с рассылками)"""
+        self._enqueue(websocket, encode_message(message))
+
+    async def _send_to_all(self, connections: Set[WebSocket], message: dict) -> int:
+        """
+        Разослать сообщение набору соединений
+
+        Returns:
+            Сколько соединений получили сообщение в очередь
+        """
+        return self._fan_out(connections, encode_message(message))
 
     async def broadcast_leaderboard(self, leaderboard_data: list):
-        """Отправить обновление лидерборда всем подключенным клиентам"""
-        if not self.active_connections:
-            logger.warning("No active connections to broadcast to")
+        """Отправить полный лидерборд подписчикам старого протокола"""
+        connections = self.subscribers(LEADERBOARD_TOPIC) - self.delta_connections
+        if not connections:
+            logger.debug("No full-protocol connections to broadcast to")
             return
 
         message = {
@@ -48,34 +231,43 @@ class ConnectionManager:
             "data": leaderboard_data
         }
 
-        logger.info(f"Broadcasting leaderboard update to {len(self.active_connections)} clients with {len(leaderboard_data)} users")
+        logger.info(f"Broadcasting leaderboard update to {len(connections)} clients with {len(leaderboard_data)} users")
+        sent_count = await self._send_to_all(connections, message)
+        logger.info(f"Broadcast completed: {sent_count} queued, {len(connections) - sent_count} dropped")
 
-        disconnected = set()
-        sent_count = 0
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-                sent_count += 1
-                logger.debug(f"Successfully sent to connection {id(connection)}")
-            except Exception as e:
-                logger.error(f"Error broadcasting to client {id(connection)}: {e}")
-                disconnected.add(connection)
+    async def broadcast_update(self, update: dict):
+        """
+        Разослать версионированное обновление лидерборда
 
-        logger.info(f"Broadcast completed: {sent_count} successful, {len(disconnected)} failed")
+        Клиенты старого протокола получают полный список, delta-клиенты —
+        только изменившиеся строки (rank_changed). Если изменения посчитаны
+        не от предыдущей версии (base_version неизвестна), delta-клиентам
+        уходит полный снимок.
+        """
+        await self.broadcast_leaderboard(update["data"])
 
-        # Удаляем отключенные соединения
-        for connection in disconnected:
-            self.disconnect(connection)
+        delta_connections = self.subscribers(LEADERBOARD_TOPIC) & self.delta_connections
+        if not delta_connections:
+            return
+        if update.get("base_version") is None:
+            message = snapshot_message(update["version"], update["data"])
+        else:
+            message = {
+                "type": "rank_changed",
+                "version": update["version"],
+                "base_version": update["base_version"],
+                "data": update["changes"],
+                "removed": update["removed"],
+            }
+        sent_count = await self._send_to_all(delta_connections, message)
+        logger.info(f"Queued {message['type']} v{update['version']} for {sent_count} delta clients")
 
     async def send_error(self, websocket: WebSocket, error_message: str):
         """Отправить сообщение об ошибке клиенту"""
-        try:
-            await websocket.send_json({
-                "type": "error",
-                "message": error_message
-            })
-        except Exception as e:
-            logger.error(f"Error sending error message: {e}")
+        await self.send_personal_message({
+            "type": "error",
+            "message": error_message
+        }, websocket)
     
     async def start_redis_listener(self):
         """Запустить слушатель Redis Pub/Sub для межпроцессной коммуникации"""
@@ -94,45 +286,178 @@ class ConnectionManager:
             logger.info("Stopped Redis Pub/Sub listener")
     
     async def _listen_redis(self):
-        """Слушать Redis канал для обновлений лидерборда"""
-        from .redis_client import redis_client
-        
+        """
+        Слушать Redis каналы обновлений лидерборда и топиков
+
+        Слушатель только читает сообщения пачками и складывает их в
+        ожидающие (см. _accept_batch); рассылает их отдельная задача, так что
+        чтение из Redis не ждёт рассылки. При ошибке соединения слушатель
+        переподписывается с экспоненциальной задержкой.
+        """
+        dispatcher = asyncio.create_task(self._dispatch_pending())
+        delay = LISTENER_RETRY_MIN_DELAY
         try:
-            pubsub = await redis_client.subscribe("leaderboard_update")
-            if not pubsub:
-                logger.error("Failed to subscribe to Redis channel")
-                return
-            
-            logger.info("Listening for leaderboard updates on Redis channel...")
-            
             while self._is_listening:
+                pubsub = None
                 try:
-                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                    if message and message["type"] == "message":
-                        # Получили обновление лидерборда из Redis
-                        leaderboard_data = json.loads(message["data"])
-                        logger.info(f"Received leaderboard update from Redis with {len(leaderboard_data)} users")
-                        
-                        # Отправляем всем подключенным WebSocket клиентам
-                        await self.broadcast_leaderboard(leaderboard_data)
+                    pubsub = await redis_client.subscribe(
+                        "leaderboard_update", patterns=(f"{TOPIC_CHANNEL_PREFIX}*",)
+                    )
+                    if not pubsub:
+                        logger.error("Failed to subscribe to Redis channel")
+                        return
+                    
+                    logger.info("Listening for leaderboard updates on Redis channel...")
+                    delay = LISTENER_RETRY_MIN_DELAY
+                    
+                    while self._is_listening:
+                        batch = await self._read_batch(pubsub)
+                        if batch:
+                            self._accept_batch(batch)
                 
-                except asyncio.TimeoutError:
-                    continue
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to decode Redis message: {e}")
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
-                    logger.error(f"Error in Redis listener: {e}")
-                    await asyncio.sleep(1)
-            
-            await pubsub.unsubscribe("leaderboard_update")
-            await pubsub.close()
+                    logger.error(f"Error in Redis listener, resubscribing in {delay}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, LISTENER_RETRY_MAX_DELAY)
+                finally:
+                    if pubsub is not None:
+                        try:
+                            await pubsub.close()
+                        except Exception as e:
+                            logger.debug(f"Error closing Redis pubsub: {e}")
             
         except asyncio.CancelledError:
             logger.info("Redis listener cancelled")
-        except Exception as e:
-            logger.error(f"Fatal error in Redis listener: {e}")
         finally:
+            dispatcher.cancel()
             self._is_listening = False
+    
+    @staticmethod
+    async def _read_batch(pubsub) -> list:
+        """Дождаться сообщения и забрать вместе с ним все уже пришедшие (не больше LISTENER_BATCH_SIZE)"""
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        if message is None:
+            return []
+        batch = [message]
+        while len(batch) < LISTENER_BATCH_SIZE:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+            if message is None:
+                break
+            batch.append(message)
+        return batch
+    
+    def _accept_batch(self, batch: list):
+        """
+        Сложить пачку сообщений в ожидающие рассылки
+
+        Из сообщений топика остаётся последнее для каждого топика (это полные
+        состояния), обновления лидерборда сливаются в одно (merge_leaderboard_updates).
+        """
+        for message in batch:
+            if message["type"] == "pmessage":
+                # Сообщение топика уже сериализовано издателем — пересылаем как есть
+                topic = message["channel"][len(TOPIC_CHANNEL_PREFIX):]
+                self._pending_topics[topic] = message["data"]
+            elif message["type"] == "message":
+                try:
+                    update = json.loads(message["data"])
+                except json.JSONDecodeError as e:
+                    logger.error(f"Failed to decode Redis message: {e}")
+                    continue
+                if isinstance(update, list):
+                    # Сообщение от процесса со старым форматом (только полный список)
+                    update = {"version": None, "base_version": None, "data": update}
+                if self._pending_update is not None:
+                    self.merged_updates += 1
+                    update = merge_leaderboard_updates(self._pending_update, update)
+                self._pending_update = update
+        self._pending_ready.set()
+    
+    async def _dispatch_pending(self):
+        """Рассылать накопленное слушателем, пока он читает следующие сообщения"""
+        while True:
+            await self._pending_ready.wait()
+            self._pending_ready.clear()
+            update, self._pending_update = self._pending_update, None
+            topics, self._pending_topics = self._pending_topics, {}
+            try:
+                if update is not None:
+                    logger.info(
+                        f"Received leaderboard update v{update['version']} from Redis "
+                        f"with {len(update['data'])} users"
+                    )
+                    await self.broadcast_update(update)
+                for topic, payload in topics.items():
+                    self.publish_local(topic, payload)
+            except Exception as e:
+                logger.error(f"Error dispatching Redis messages: {e}")
+            # Отдаём управление, чтобы слушатель успел накопить следующую пачку
+            await asyncio.sleep(0)
+
+
+def merge_leaderboard_updates(older: dict, newer: dict) -> dict:
+    """
+    Слить два последовательных обновления лидерборда в одно
+
+    Полный список берётся из нового. Для delta-клиентов изменения считаются
+    от базовой версии старого обновления: строка, затронутая хотя бы одним
+    из них, отправляется в своём последнем виде (или как удалённая), а
+    остальные не менялись. Если версии не идут подряд, delta-клиенты
+    получат полный снимок (base_version = None).
+    """
+    consecutive = (
+        older.get("version") is not None
+        and older.get("base_version") is not None
+        and newer.get("base_version") == older["version"]
+    )
+    if not consecutive:
+        return {**newer, "base_version": None}
+    touched = {row["id"] for row in older["changes"] + newer["changes"]}
+    touched.update(older["removed"], newer["removed"])
+    current = {row["id"] for row in newer["data"]}
+    return {
+        "version": newer["version"],
+        "base_version": older["base_version"],
+        "data": newer["data"],
+        "changes": [row for row in newer["data"] if row["id"] in touched],
+        "removed": sorted(touched - current),
+    }
+
+
+def snapshot_message(version, leaderboard_data: list) -> dict:
+    """Полный снимок лидерборда с версией для delta-клиентов"""
+    return {
+        "type": "leaderboard_snapshot",
+        "version": version,
+        "data": leaderboard_data
+    }
+
+
+def rank_update_message(user_id: int, rank: Optional[int], shilka_coins: int) -> dict:
+    """Сообщение топика rank:<id> с текущим местом пользователя"""
+    return {
+        "type": "rank_update",
+        "topic": rank_topic(user_id),
+        "user_id": user_id,
+        "rank": rank,
+        "shilka_coins": shilka_coins,
+    }
+
+
+def wpm_leaderboard_message(topic: str, entries: list) -> dict:
+    """Сообщение топика wpm:<метрика>:<язык>:<режим>:<тип> с топом категории"""
+    return {
+        "type": "wpm_leaderboard_update",
+        "topic": topic,
+        "data": entries,
+    }
+
+
+async def publish_topic(topic: str, message: dict):
+    """Опубликовать сообщение топика для подписчиков во всех воркерах (через Redis)"""
+    await redis_client.publish(f"{TOPIC_CHANNEL_PREFIX}{topic}", encode_message(message))
 
 
 # Глобальный экземпляр менеджера соединений
@@ -11,6 +11,8 @@ from src.database import Base, get_db
 from src.main import app
 from src.auth.models import User
 from src.auth.utils import get_password_hash
+from src.content.pool import word_pool, sentence_pool
+from src.content.bundles import bundle_store
 
 # Создаём in-memory SQLite базу для тестов (async версия)
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -36,6 +38,11 @@ async def db_session():
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    
+    # In-memory пулы контента живут на уровне процесса — сбрасываем между тестами
+    word_pool.clear()
+    sentence_pool.clear()
+    bundle_store.clear()
 
 
 @pytest_asyncio.fixture(scope="function")
@@ -2,6 +2,7 @@ import pytest
 
 from src.auth.models import User
 from src.auth.utils import get_password_hash
+from src.stats.history_codec import encode_history
 from src.stats.models import TypingSession, CoinTransaction
 
 
@@ -69,7 +70,7 @@ async def test_admin_delete_user_and_cleanup_relations(client, db_session):
         accuracy=95.0,
         duration=30,
         words="[]",
-        history="[]",
+        history=encode_history([]),
         typing_mode="words",
         language="en",
         test_type="time",
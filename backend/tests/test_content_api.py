@@ -4,6 +4,7 @@
 import pytest
 from sqlalchemy import select
 
+from src.content import service as content_service
 from src.content.models import Word, Sentence
 
 
@@ -124,6 +125,42 @@ class TestUploadContentEndpoint:
         assert data2["sentences_created"] == 0
 
 
+
+class TestUploadStreamEndpoint:
+    """Тесты потоковой загрузки текста"""
+    
+    @pytest.mark.asyncio
+    async def test_stream_upload_processes_blocks(self, admin_client, db_session, monkeypatch):
+        """Текст обрабатывается блоками, результат совпадает с обычной загрузкой"""
+        monkeypatch.setattr(content_service, "STREAM_BLOCK_SIZE", 40)
+        subjects = ["Кот", "Пёс", "Ёж", "Лис", "Волк", "Заяц", "Медведь", "Бобр", "Лось", "Крот"]
+        text = " ".join(f"{subject} читает длинную книгу." for subject in subjects)
+        
+        async def body():
+            data = text.encode("utf-8")
+            # Режем байты произвольно, в том числе посередине многобайтовых символов
+            for start in range(0, len(data), 7):
+                yield data[start:start + 7]
+        
+        response = await admin_client.post("/content/upload/stream?language=ru", content=body())
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sentences_created"] == 10
+        assert data["words_created"] == 13
+        result = await db_session.execute(select(Sentence).where(Sentence.language == "ru"))
+        texts = {s.text for s in result.scalars().all()}
+        assert "Ёж читает длинную книгу." in texts
+    
+    @pytest.mark.asyncio
+    async def test_stream_upload_forbidden_for_regular_user(self, authenticated_client):
+        """Обычный пользователь не может загружать текст потоком"""
+        response = await authenticated_client.post(
+            "/content/upload/stream?language=ru", content="Привет мир тест.".encode("utf-8")
+        )
+        
+        assert response.status_code == 403
+
 class TestGetRandomWordsEndpoint:
     """Тесты эндпоинта получения случайных слов"""
     
@@ -340,6 +377,25 @@ class TestGetRandomSentencesEndpoint:
         assert len(data) == 5  # Только активные
         assert all(s["is_active"] for s in data)
     
+    @pytest.mark.asyncio
+    async def test_get_sentences_by_total_words(self, client, db_session):
+        """Параметр words возвращает предложения на нужное количество слов"""
+        for i in range(10):
+            db_session.add(Sentence(
+                language="en",
+                text=f"Short sentence {i}.",
+                word_count=3,
+                is_active=True
+            ))
+        await db_session.commit()
+
+        response = await client.get("/content/sentences?language=en&words=9")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 3
+        assert sum(s["word_count"] for s in data) == 9
+
     @pytest.mark.asyncio
     async def test_get_random_sentences_invalid_language(self, client):
         """Получение предложений с невалидным языком"""
@@ -355,6 +411,62 @@ class TestGetRandomSentencesEndpoint:
         assert response.status_code == 422
 
 
+
+class TestSeededContentEndpoints:
+    """Тесты воспроизводимой выборки по seed"""
+    
+    @pytest.mark.asyncio
+    async def test_same_seed_returns_same_words(self, client, db_session):
+        """Один и тот же seed даёт одну и ту же последовательность слов"""
+        db_session.add_all([
+            Word(language="en", text=f"word{i}", frequency=i + 1, is_active=True) for i in range(50)
+        ])
+        await db_session.commit()
+        
+        first = await client.get("/content/words?language=en&count=10&seed=42")
+        second = await client.get("/content/words?language=en&count=10&seed=42")
+        other = await client.get("/content/words?language=en&count=10&seed=43")
+        
+        assert first.status_code == 200
+        assert first.json() == second.json()
+        assert first.json() != other.json()
+        assert first.headers["etag"] == second.headers["etag"] != other.headers["etag"]
+        assert "max-age" in first.headers["cache-control"]
+    
+    @pytest.mark.asyncio
+    async def test_matching_etag_returns_not_modified(self, client, db_session):
+        """Клиент с актуальным ETag получает 304 без тела"""
+        db_session.add_all([
+            Sentence(language="en", text=f"Sentence number {i} here.", word_count=4, is_active=True)
+            for i in range(10)
+        ])
+        await db_session.commit()
+        
+        response = await client.get("/content/sentences?language=en&words=12&seed=7")
+        etag = response.headers["etag"]
+        cached = await client.get(
+            "/content/sentences?language=en&words=12&seed=7",
+            headers={"If-None-Match": etag}
+        )
+        
+        assert cached.status_code == 304
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+    
+    @pytest.mark.asyncio
+    async def test_etag_changes_when_content_changes(self, client, db_session):
+        """После загрузки нового контента ETag той же выборки меняется"""
+        db_session.add(Word(language="en", text="first", is_active=True))
+        await db_session.commit()
+        before = await client.get("/content/words?language=en&count=5&seed=1")
+        
+        await content_service.save_content(db_session, "en", ["second"], [])
+        after = await client.get("/content/words?language=en&count=5&seed=1")
+        
+        assert before.headers["etag"] != after.headers["etag"]
+        assert {w["text"] for w in after.json()} == {"first", "second"}
+
+
 class TestContentIntegration:
     """Интеграционные тесты модуля контента"""
     
@@ -0,0 +1,112 @@
+"""
+Тесты для заранее подготовленных наборов контента (content/bundles.py)
+"""
+import json
+
+import pytest
+
+from src.content.bundles import BundleMode, BundleStore, bundle_store
+from src.content.models import Word, Sentence
+from src.content.pool import word_pool, sentence_pool
+
+
+class TestBundleStore:
+    """Тесты колец готовых ответов"""
+
+    @pytest.mark.asyncio
+    async def test_replenish_fills_registered_ring(self, db_session):
+        """Пополнение заполняет кольцо зарегистрированной комбинации"""
+        db_session.add_all([Word(language="en", text=f"word{i}", is_active=True) for i in range(10)])
+        await db_session.commit()
+        await word_pool.load(db_session, ["en"])
+        store = BundleStore(ring_size=4, max_keys=10)
+        store.register("en", BundleMode.WORDS, 3)
+
+        assert await store.replenish() == 4
+
+        payload = json.loads(store.pop("en", BundleMode.WORDS, 3))
+        assert len(payload) == 3
+        assert set(payload[0]) == {"id", "text", "language", "is_active"}
+        assert store.available("en", BundleMode.WORDS, 3) == 3
+
+    @pytest.mark.asyncio
+    async def test_bundles_from_outdated_pool_are_discarded(self, db_session):
+        """После изменения пула старые наборы не выдаются"""
+        db_session.add(Word(language="en", text="first", is_active=True))
+        await db_session.commit()
+        await word_pool.load(db_session, ["en"])
+        store = BundleStore(ring_size=2, max_keys=10)
+        store.register("en", BundleMode.WORDS, 5)
+        await store.replenish()
+
+        word_pool.add("en", [(100, "second")])
+
+        assert store.pop("en", BundleMode.WORDS, 5) is None
+        await store.replenish()
+        texts = {w["text"] for w in json.loads(store.pop("en", BundleMode.WORDS, 5))}
+        assert texts == {"first", "second"}
+
+    @pytest.mark.asyncio
+    async def test_empty_pool_builds_nothing(self, db_session):
+        """Для пустого пула наборы не собираются"""
+        await word_pool.load(db_session, ["ru"])
+        store = BundleStore(ring_size=2, max_keys=10)
+        store.register("ru", BundleMode.WORDS, 5)
+
+        assert await store.replenish() == 0
+
+    @pytest.mark.asyncio
+    async def test_pop_does_not_register_unknown_combination(self, db_session):
+        """Запрос с произвольным количеством не создаёт кольцо"""
+        db_session.add(Word(language="en", text="word", is_active=True))
+        await db_session.commit()
+        await word_pool.load(db_session, ["en"])
+        store = BundleStore(ring_size=2, max_keys=10)
+
+        assert store.pop("en", BundleMode.WORDS, 777) is None
+        assert await store.replenish() == 0
+        assert store.available("en", BundleMode.WORDS, 777) == 0
+
+    @pytest.mark.asyncio
+    async def test_bundles_discarded_after_weights_change(self, db_session):
+        """Наборы, собранные до обновления частот, не выдаются"""
+        db_session.add(Word(language="en", text="first", is_active=True))
+        await db_session.commit()
+        await word_pool.load(db_session, ["en"])
+        store = BundleStore(ring_size=2, max_keys=10)
+        store.register("en", BundleMode.WORDS, 1)
+        await store.replenish()
+
+        word_pool.increment_weights("en", {"first": 5})
+
+        assert store.pop("en", BundleMode.WORDS, 1) is None
+
+    def test_register_respects_max_keys(self):
+        """Количество комбинаций ограничено"""
+        store = BundleStore(ring_size=2, max_keys=1)
+
+        assert store.register("en", BundleMode.WORDS, 5) is True
+        assert store.register("en", BundleMode.WORDS, 6) is False
+
+
+class TestBundleEndpoints:
+    """Эндпоинты выдачи контента отдают готовые наборы"""
+
+    @pytest.mark.asyncio
+    async def test_sentences_endpoint_serves_prebuilt_bundle(self, client, db_session):
+        """Готовый набор отдаётся без выборки и в том же формате"""
+        db_session.add_all([
+            Sentence(language="en", text=f"Sentence number {i} here.", word_count=4, is_active=True)
+            for i in range(6)
+        ])
+        await db_session.commit()
+        await sentence_pool.load(db_session, ["en"])
+        bundle_store.register("en", BundleMode.SENTENCE_WORDS, 8)
+        await bundle_store.replenish()
+        available = bundle_store.available("en", BundleMode.SENTENCE_WORDS, 8)
+
+        response = await client.get("/content/sentences?language=en&words=8")
+
+        assert response.status_code == 200
+        assert sum(s["word_count"] for s in response.json()) == 8
+        assert bundle_store.available("en", BundleMode.SENTENCE_WORDS, 8) == available - 1
@@ -0,0 +1,173 @@
+"""
+Тесты для фоновой очереди загрузки контента (content/jobs.py)
+"""
+import time
+
+import pytest
+from sqlalchemy import select
+
+from src.content import service as content_service
+from src.content.jobs import (
+    ACTIVE_KEY, JOB_LEASE, JOB_TEXT_KEY, IngestionQueue, JobStatus, describe_job, ingestion_queue
+)
+from src.content.models import Sentence
+from src.redis_client import redis_client
+
+
+class FakeJobRedis:
+    """Минимальная in-memory замена Redis для команд очереди загрузки"""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.sorted_sets = {}
+        self.lists = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def expire(self, key, seconds):
+        pass
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    async def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    async def zrevrange(self, key, start, end, withscores=False):
+        items = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: -item[1])
+        return items if withscores else [member for member, _ in items]
+
+    async def zrem(self, key, member):
+        self.sorted_sets.get(key, {}).pop(member, None)
+
+
+class TestIngestionQueue:
+    """Тесты очереди задач загрузки (локальный режим без Redis)"""
+
+    @pytest.mark.asyncio
+    async def test_enqueue_creates_queued_job(self):
+        """Новая задача создаётся в статусе queued"""
+        queue = IngestionQueue()
+
+        job_id = await queue.enqueue("Hello brave new world.", "en")
+        job = describe_job(await queue.get(job_id))
+
+        assert job["status"] == JobStatus.QUEUED
+        assert job["total_chars"] == len("Hello brave new world.")
+        assert job["progress"] == 0
+        assert await queue._pop() == job_id
+
+    @pytest.mark.asyncio
+    async def test_process_job_reports_progress_and_counts(self, db_session, monkeypatch):
+        """Обработка задачи блоками обновляет прогресс и итоговые счётчики"""
+        monkeypatch.setattr(content_service, "STREAM_BLOCK_SIZE", 30)
+        monkeypatch.setattr("src.content.jobs.STREAM_BLOCK_SIZE", 30)
+        queue = IngestionQueue()
+        text = "The quick brown fox jumps. A lazy dog sleeps here. Birds sing every morning."
+        job_id = await queue.enqueue(text, "en")
+
+        job = describe_job(await queue.process_job(db_session, job_id))
+
+        assert job["status"] == JobStatus.DONE
+        assert job["progress"] == 1.0
+        assert job["sentences_created"] == 3
+        assert job["words_processed"] == 14
+        # "A" короче двух символов и в словарь не попадает
+        assert job["words_created"] == 13
+        result = await db_session.execute(select(Sentence).where(Sentence.language == "en"))
+        assert len(result.scalars().all()) == 3
+
+    @pytest.mark.asyncio
+    async def test_text_kept_until_job_finishes(self, db_session, monkeypatch):
+        """Текст задачи удаляется только после завершения, а не при старте обработки"""
+        queue = IngestionQueue()
+        job_id = await queue.enqueue("Hello brave new world.", "en")
+        seen = []
+        parse = content_service.text_processing_pool.parse
+
+        async def spy_parse(block, language):
+            seen.append(await queue._get_text(job_id))
+            return await parse(block, language)
+
+        monkeypatch.setattr("src.content.jobs.text_processing_pool.parse", spy_parse)
+
+        await queue.process_job(db_session, job_id)
+
+        assert seen == ["Hello brave new world."]
+        assert await queue._get_text(job_id) is None
+        # Завершённая задача повторно не обрабатывается
+        assert await queue.process_job(db_session, job_id) is None
+
+    @pytest.mark.asyncio
+    async def test_orphaned_running_job_marked_failed(self, monkeypatch):
+        """Задача без обновления прогресса дольше JOB_LEASE помечается failed, живая — нет"""
+        fake = FakeJobRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+        queue = IngestionQueue()
+        orphan = await queue.enqueue("Lost text.", "en")
+        alive = await queue.enqueue("Running text.", "en")
+        fake.sorted_sets[ACTIVE_KEY] = {orphan: time.time() - JOB_LEASE - 1, alive: time.time()}
+        for job_id in (orphan, alive):
+            await queue._save(job_id, {"status": JobStatus.RUNNING})
+
+        assert await queue.fail_orphaned_jobs() == 1
+
+        job = await queue.get(orphan)
+        assert job["status"] == JobStatus.FAILED and job["error"]
+        assert JOB_TEXT_KEY.format(job_id=orphan) not in fake.values
+        assert (await queue.get(alive))["status"] == JobStatus.RUNNING
+        assert list(fake.sorted_sets[ACTIVE_KEY]) == [alive]
+
+    @pytest.mark.asyncio
+    async def test_process_unknown_job_returns_none(self, db_session):
+        """Несуществующая задача не обрабатывается"""
+        assert await IngestionQueue().process_job(db_session, "missing") is None
+
+
+class TestIngestionJobEndpoints:
+    """Тесты эндпоинтов фоновой загрузки"""
+
+    @pytest.mark.asyncio
+    async def test_create_and_get_job(self, admin_client):
+        """Админ ставит задачу и получает её состояние"""
+        response = await admin_client.post(
+            "/content/jobs", json={"raw_text": "Hello brave new world.", "language": "en"}
+        )
+
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        response = await admin_client.get(f"/content/jobs/{job_id}")
+        assert response.status_code == 200
+        assert response.json()["status"] == JobStatus.QUEUED
+        # Убираем задачу из глобальной очереди, чтобы не влиять на другие тесты
+        assert await ingestion_queue._pop() == job_id
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_job_returns_404(self, admin_client):
+        """Неизвестная задача возвращает 404"""
+        response = await admin_client.get("/content/jobs/unknown")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_create_job_forbidden_for_regular_user(self, authenticated_client):
+        """Обычный пользователь не может ставить задачи"""
+        response = await authenticated_client.post(
+            "/content/jobs", json={"raw_text": "Hello world.", "language": "en"}
+        )
+        assert response.status_code == 403
@@ -0,0 +1,156 @@
+"""
+Тесты для in-memory пулов контента (content/pool.py)
+"""
+import pytest
+
+from src.content.models import Word, Sentence
+from src.content.pool import WordPool, SentencePool, word_pool
+from src.content.service import upload_text_content, get_random_words
+
+
+class TestWordPool:
+    """Тесты пула слов"""
+
+    @pytest.mark.asyncio
+    async def test_load_groups_active_words_by_language(self, db_session):
+        """Загрузка раскладывает активные слова по языкам"""
+        db_session.add_all([
+            Word(language="ru", text="слово", is_active=True),
+            Word(language="ru", text="скрыто", is_active=False),
+            Word(language="en", text="word", is_active=True),
+        ])
+        await db_session.commit()
+
+        pool = WordPool()
+        await pool.load(db_session)
+
+        assert pool.size("ru") == 1
+        assert pool.size("en") == 1
+        assert [w.text for w in pool.sample("ru", 10)] == ["слово"]
+
+    @pytest.mark.asyncio
+    async def test_sample_without_duplicates(self, db_session):
+        """Выборка не содержит повторов"""
+        db_session.add_all([Word(language="en", text=f"word{i}", is_active=True) for i in range(20)])
+        await db_session.commit()
+
+        pool = WordPool()
+        await pool.load(db_session, ["en"])
+        words = pool.sample("en", 15)
+
+        assert len(words) == 15
+        assert len({w.id for w in words}) == 15
+
+    @pytest.mark.asyncio
+    async def test_sample_prefers_frequent_words(self, db_session):
+        """Частые слова выбираются пропорционально своей частоте"""
+        db_session.add_all([
+            Word(language="en", text="common", frequency=97, is_active=True),
+            Word(language="en", text="rare", frequency=1, is_active=True),
+            Word(language="en", text="junk", frequency=1, is_active=True),
+            Word(language="en", text="typo", frequency=1, is_active=True),
+        ])
+        await db_session.commit()
+
+        pool = WordPool()
+        await pool.load(db_session, ["en"])
+        picks = [pool.sample("en", 1)[0].text for _ in range(2000)]
+
+        assert picks.count("common") > 1800
+
+    @pytest.mark.asyncio
+    async def test_increment_weights_updates_loaded_pool(self, db_session):
+        """Рост частоты существующего слова сразу учитывается в выборке"""
+        db_session.add_all([
+            Word(language="en", text="first", is_active=True),
+            Word(language="en", text="second", is_active=True),
+        ])
+        await db_session.commit()
+
+        pool = WordPool()
+        await pool.load(db_session, ["en"])
+        pool.sample("en", 1)
+        pool.increment_weights("en", {"second": 999})
+        picks = [pool.sample("en", 1)[0].text for _ in range(500)]
+
+        assert picks.count("second") > 450
+
+    def test_sample_unknown_language_returns_empty(self):
+        """Незагруженный язык даёт пустую выборку"""
+        assert WordPool().sample("ru", 5) == []
+
+    @pytest.mark.asyncio
+    async def test_loaded_pool_does_not_see_direct_db_inserts(self, db_session):
+        """После загрузки слова выдаются из памяти, а не из БД"""
+        db_session.add(Word(language="en", text="first", is_active=True))
+        await db_session.commit()
+        await get_random_words(db_session, "en", 10)
+
+        db_session.add(Word(language="en", text="second", is_active=True))
+        await db_session.commit()
+
+        words = await get_random_words(db_session, "en", 10)
+        assert [w.text for w in words] == ["first"]
+
+    @pytest.mark.asyncio
+    async def test_upload_refreshes_loaded_pool(self, db_session):
+        """Загрузка текста пополняет уже загруженный пул"""
+        await word_pool.load(db_session, ["en"])
+        assert word_pool.size("en") == 0
+
+        words_created, _ = await upload_text_content(db_session, "Hello brave new world.", "en")
+
+        assert word_pool.size("en") == words_created
+        texts = {w.text for w in word_pool.sample("en", 10)}
+        assert texts == {"hello", "brave", "new", "world"}
+
+
+class TestSentencePool:
+    """Тесты пула предложений с корзинами по количеству слов"""
+
+    @staticmethod
+    async def _load(db_session, word_counts):
+        db_session.add_all([
+            Sentence(language="en", text=f"Sentence number {i}.", word_count=wc, is_active=True)
+            for i, wc in enumerate(word_counts)
+        ])
+        await db_session.commit()
+        pool = SentencePool()
+        await pool.load(db_session, ["en"])
+        return pool
+
+    @pytest.mark.asyncio
+    async def test_sample_words_hits_exact_total_when_possible(self, db_session):
+        """Суммарное количество слов совпадает с целью, если её можно набрать"""
+        pool = await self._load(db_session, [3, 4, 5, 7, 10, 12] * 20)
+
+        for target in (3, 10, 25, 60):
+            sentences = pool.sample_words("en", target)
+            assert sum(s.word_count for s in sentences) == target
+            assert len({s.id for s in sentences}) == len(sentences)
+
+    @pytest.mark.asyncio
+    async def test_sample_words_overshoots_by_at_most_one_sentence(self, db_session):
+        """Если цель меньше самого короткого предложения, берётся одно предложение"""
+        pool = await self._load(db_session, [5, 8])
+
+        sentences = pool.sample_words("en", 2)
+
+        assert [s.word_count for s in sentences] == [5]
+
+    @pytest.mark.asyncio
+    async def test_sample_words_stops_when_pool_exhausted(self, db_session):
+        """Если контента не хватает, возвращаются все предложения"""
+        pool = await self._load(db_session, [3, 4])
+
+        sentences = pool.sample_words("en", 100)
+
+        assert sorted(s.word_count for s in sentences) == [3, 4]
+
+    @pytest.mark.asyncio
+    async def test_add_places_sentence_into_bucket(self, db_session):
+        """Добавленное предложение попадает в свою корзину"""
+        pool = await self._load(db_session, [])
+        pool.add("en", [(42, "One two three four.", 4)])
+
+        assert [s.id for s in pool.sample_words("en", 4)] == [42]
@@ -0,0 +1,37 @@
+"""
+Тесты для разбора текстов в пуле процессов (content/processing.py)
+"""
+import pytest
+
+from src.content import processing
+from src.content.processing import TextProcessingPool
+from src.content.utils import parse_text
+
+
+class TestTextProcessingPool:
+    """Тесты пула разбора текстов"""
+
+    @pytest.mark.asyncio
+    async def test_inline_when_disabled(self):
+        """При max_workers=0 процессы не запускаются"""
+        pool = TextProcessingPool(max_workers=0)
+
+        parsed = await pool.parse("Hello brave new world.", "en")
+
+        assert parsed == parse_text("Hello brave new world.", "en")
+        assert pool._executor is None
+
+    @pytest.mark.asyncio
+    async def test_parse_many_in_processes_keeps_order(self, monkeypatch):
+        """Блоки разбираются в дочерних процессах и возвращаются по порядку"""
+        monkeypatch.setattr(processing, "INLINE_PARSE_LIMIT", 0)
+        pool = TextProcessingPool(max_workers=2)
+        blocks = ["Первое предложение здесь.", "Second sentence is here.", "Третье предложение тоже."]
+
+        try:
+            results = await pool.parse_many(blocks, "ru")
+        finally:
+            pool.shutdown()
+
+        assert [r.sentences for r in results] == [["Первое предложение здесь."], [], ["Третье предложение тоже."]]
+        assert pool._executor is None
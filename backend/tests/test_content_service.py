@@ -4,6 +4,7 @@
 import pytest
 from sqlalchemy import select
 
+from src.content import service as content_service
 from src.content.models import Word, Sentence
 from src.content.service import (
     upload_text_content,
@@ -149,6 +150,54 @@ class TestUploadTextContent:
         
         assert sentence.word_count == 5
 
+    
+    @pytest.mark.asyncio
+    async def test_upload_counts_only_inserted_rows(self, db_session):
+        """Счётчики учитывают дубликаты внутри текста и уже существующие записи"""
+        db_session.add(Word(language="en", text="alpha", is_active=True))
+        await db_session.commit()
+        text = "Alpha beta gamma delta. Alpha beta gamma delta. Beta gamma delta epsilon."
+        
+        words_count, sentences_count = await upload_text_content(db_session, text, "en")
+        
+        # alpha уже была в БД, повторы внутри текста не считаются
+        assert words_count == 4
+        assert sentences_count == 2
+        result = await db_session.execute(select(Word).where(Word.language == "en"))
+        assert len(result.scalars().all()) == 5
+    
+    @pytest.mark.asyncio
+    async def test_save_content_inserts_in_chunks(self, db_session, monkeypatch):
+        """Большие загрузки разбиваются на пачки вставки"""
+        monkeypatch.setattr(content_service, "INSERT_CHUNK_SIZE", 3)
+        words = [f"word{i}" for i in range(10)]
+        
+        words_count, _ = await content_service.save_content(db_session, "en", words, [])
+        
+        assert words_count == 10
+        result = await db_session.execute(select(Word).where(Word.language == "en"))
+        assert len(result.scalars().all()) == 10
+    
+    @pytest.mark.asyncio
+    async def test_save_content_skips_oversized_sentences(self, db_session):
+        """Предложения, не помещающиеся в строку индекса (по символам или байтам), пропускаются"""
+        sentences = ["a" * 1001, "😀" * 600, "Short one."]
+
+        _, sentences_count = await content_service.save_content(db_session, "en", [], sentences, [1, 600, 2])
+
+        assert sentences_count == 1
+        result = await db_session.execute(select(Sentence.text))
+        assert result.scalars().all() == ["Short one."]
+
+    @pytest.mark.asyncio
+    async def test_upload_accumulates_word_frequencies(self, db_session):
+        """Частота слова растёт с каждым вхождением, в том числе в повторных загрузках"""
+        await upload_text_content(db_session, "Cat sees cat. Dog sees cat.", "en")
+        await upload_text_content(db_session, "Cat runs fast.", "en")
+        
+        result = await db_session.execute(select(Word.text, Word.frequency).where(Word.language == "en"))
+        frequencies = dict(result.all())
+        assert frequencies == {"cat": 4, "sees": 2, "dog": 1, "runs": 1, "fast": 1}
 
 class TestGetRandomWords:
     """Тесты получения случайных слов"""
@@ -10,7 +10,11 @@ from src.content.utils import (
     is_russian_word,
     is_english_word,
     filter_words_by_language,
-    filter_sentence_by_language
+    filter_sentence_by_language,
+    split_complete_text,
+    split_into_blocks,
+    get_tokenizer,
+    parse_text
 )
 
 
@@ -322,3 +326,79 @@ class TestCountWordsInText:
         """Подсчёт слов с множественными пробелами"""
         text = "слово1    слово2     слово3"
         assert count_words_in_text(text) == 3
+
+
+
+class TestTextTokenizer:
+    """Тесты однопроходного токенизатора"""
+    
+    def test_tokenizer_is_cached_per_language(self):
+        """Токенизатор компилируется один раз на язык"""
+        assert get_tokenizer("ru") is get_tokenizer("ru")
+        assert get_tokenizer("ru") is not get_tokenizer("en")
+    
+    def test_parse_text_matches_separate_functions(self):
+        """Результат совпадает с последовательным вызовом отдельных функций"""
+        raw = "  Привет,   мир!  Это   тест123 hello.\nЕщё одно предложение здесь? Да.  "
+        parsed = parse_text(raw, "ru")
+        cleaned = clean_text(raw, "ru")
+        
+        assert parsed.cleaned == cleaned
+        assert parsed.words == extract_words(cleaned, "ru")
+        assert parsed.sentences == extract_sentences(cleaned, "ru")
+        assert parsed.sentence_word_counts == [count_words_in_text(s) for s in parsed.sentences]
+    
+    def test_parse_empty_text(self):
+        """Пустой текст даёт пустой результат"""
+        parsed = parse_text("  123 @@ ", "en")
+        assert parsed.cleaned == ""
+        assert parsed.words == []
+        assert parsed.sentences == []
+        assert parsed.word_frequencies == []
+    
+    def test_parse_text_counts_word_frequencies(self):
+        """Частоты считаются для каждого уникального слова без учёта регистра"""
+        parsed = parse_text("The cat and the dog. The end.", "en")
+        
+        assert dict(zip(parsed.words, parsed.word_frequencies)) == {
+            "the": 3, "cat": 1, "and": 1, "dog": 1, "end": 1
+        }
+
+    
+    def test_parse_text_counts_words_outside_kept_sentences(self):
+        """Слова из отброшенных фрагментов (коротких и без точки в конце) тоже учитываются"""
+        raw = "Кот спит. Кот ест рыбу. Хвост кота"
+        parsed = parse_text(raw, "ru")
+        
+        assert parsed.sentences == ["Кот ест рыбу."]
+        assert dict(zip(parsed.words, parsed.word_frequencies)) == {
+            "кот": 2, "спит": 1, "ест": 1, "рыбу": 1, "хвост": 1, "кота": 1
+        }
+
+class TestSplitCompleteText:
+    """Тесты нарезки потокового текста на блоки"""
+    
+    def test_small_buffer_is_kept(self):
+        """Буфер меньше блока не отдаётся"""
+        assert split_complete_text("Первое предложение. Второе", 100) == ("", "Первое предложение. Второе")
+    
+    def test_split_on_last_sentence_boundary(self):
+        """Блок режется по последней границе предложения в пределах блока"""
+        block, rest = split_complete_text("One two. Three four! Five six", 22)
+        assert block == "One two. Three four!"
+        assert rest == "Five six"
+    
+    def test_split_on_whitespace_without_boundary(self):
+        """Без границы предложения блок режется по пробелу"""
+        block, rest = split_complete_text("one two three four", 10)
+        assert block == "one two"
+        assert rest == " three four"
+    
+    def test_split_into_blocks_covers_whole_text(self):
+        """Блоки покрывают весь текст и не превышают размер"""
+        text = " ".join(f"Sentence {i} is here." for i in range(50))
+        blocks = list(split_into_blocks(text, 60))
+        
+        assert all(len(block) <= 60 for block in blocks)
+        assert all(block.endswith(".") for block in blocks)
+        assert " ".join(blocks) == text
@@ -0,0 +1,81 @@
+"""
+Тесты для бинарного формата истории набора (stats/history_codec.py)
+"""
+import json
+
+import pytest
+from sqlalchemy import select
+
+from src.stats.history_codec import decode_history, decode_history_columns, encode_history
+from src.stats.models import TypingSession
+
+
+def _history(words, start=1000, step=120):
+    time = start
+    history = []
+    for word in words:
+        chars = []
+        for index, char in enumerate(word):
+            time += step
+            chars.append({"char": char, "correct": index % 3 != 2, "time": time})
+        history.append(chars)
+    return history
+
+
+class TestHistoryCodec:
+    """Тесты кодирования и декодирования истории"""
+
+    def test_round_trip(self):
+        """История восстанавливается без потерь"""
+        history = _history(["привет", "мир", "hello", ""])
+
+        assert decode_history(encode_history(history)) == history
+
+    def test_unusual_chars_and_times(self):
+        """Пустые и составные символы, символы вне BMP и убывающее время сохраняются"""
+        history = [[
+            {"char": "", "correct": False, "time": 50},
+            {"char": "é", "correct": True, "time": 10},
+            {"char": "😀", "correct": True, "time": 10},
+            {"char": "a", "correct": False, "time": 2 ** 40},
+        ]]
+
+        assert decode_history(encode_history(history)) == history
+
+    def test_missing_fields_use_defaults(self):
+        """Без `correct` символ считается правильным, без `time` — время равно нулю"""
+        assert decode_history(encode_history([[{"char": "x"}]])) == [[{"char": "x", "correct": True, "time": 0}]]
+
+    def test_columns(self):
+        """Столбцы доступны без сборки словарей"""
+        columns = decode_history_columns(encode_history(_history(["abc", "d"])))
+
+        assert columns.word_lengths == [3, 1]
+        assert columns.chars == ["a", "b", "c", "d"]
+        assert columns.correct == [True, True, False, True]
+        assert columns.times == [1120, 1240, 1360, 1480]
+
+    def test_much_smaller_than_json(self):
+        """Бинарная история в разы меньше JSON"""
+        history = _history(["скорость", "печати", "typing", "speed"] * 25)
+
+        assert len(encode_history(history)) * 5 < len(json.dumps(history))
+
+    @pytest.mark.parametrize("data", [b"", b"\x02\x00", b"\x01\x01\x05a", b"\x01\x00\x00"])
+    def test_corrupted_data_rejected(self, data):
+        """Повреждённые данные и неизвестная версия — ValueError"""
+        with pytest.raises(ValueError):
+            decode_history(data)
+
+    @pytest.mark.asyncio
+    async def test_session_history_stored_binary(self, authenticated_client, db_session):
+        """Сессия сохраняется с бинарной историей, которая раскодируется в исходную"""
+        history = [[{"char": c, "correct": c != "и", "time": 100 * i} for i, c in enumerate("привет")]]
+        payload = {"words": ["привет"], "history": history, "duration": 30}
+
+        response = await authenticated_client.post("/stats/typing-session", json=payload)
+
+        assert response.status_code == 200
+        stored = (await db_session.execute(select(TypingSession.history))).scalar_one()
+        assert isinstance(stored, bytes)
+        assert decode_history(stored) == history
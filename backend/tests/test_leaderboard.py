@@ -0,0 +1,258 @@
+"""
+Тесты для лидерборда на Redis sorted set (stats/leaderboard.py)
+"""
+import pytest
+
+from src.auth.models import User
+from src.config import settings
+from src.redis_client import redis_client
+from src.stats.broadcaster import leaderboard_broadcaster
+from src.stats.leaderboard import CoinLeaderboard, LEADERBOARD_KEY, coin_leaderboard, _member, _user_id
+from src.stats import service as stats_service
+
+
+class FakeSortedSetRedis:
+    """Минимальная in-memory замена Redis для команд sorted set"""
+
+    def __init__(self):
+        self.sets = {}
+
+    async def zadd(self, key, mapping):
+        self.sets.setdefault(key, {}).update({m: float(s) for m, s in mapping.items()})
+
+    async def zincrby(self, key, amount, member):
+        zset = self.sets.setdefault(key, {})
+        zset[member] = zset.get(member, 0.0) + amount
+        return zset[member]
+
+    def _ordered(self, key):
+        zset = self.sets.get(key, {})
+        # ZREVRANGE: по убыванию score, при равенстве — по убыванию элемента
+        return sorted(zset.items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    async def zrevrange(self, key, start, end, withscores=False):
+        items = self._ordered(key)[start:end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    async def zrevrank(self, key, member):
+        members = [m for m, _ in self._ordered(key)]
+        return members.index(member) if member in members else None
+
+    async def zcount(self, key, min_score, max_score):
+        low = float(min_score.lstrip("(")) if min_score != "-inf" else float("-inf")
+        high = float(max_score) if max_score != "+inf" else float("inf")
+        strict = str(min_score).startswith("(")
+        return sum(
+            1 for score in self.sets.get(key, {}).values()
+            if (score > low if strict else score >= low) and score <= high
+        )
+
+    async def zscore(self, key, member):
+        return self.sets.get(key, {}).get(member)
+
+    async def zrem(self, key, member):
+        self.sets.get(key, {}).pop(member, None)
+
+    async def rename(self, key, new_key):
+        self.sets[new_key] = self.sets.pop(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.sets.pop(key, None)
+
+    async def keys(self, pattern):
+        return []
+
+    async def publish(self, channel, message):
+        pass
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Подменяет соединение Redis и сбрасывает состояние лидерборда после теста"""
+    fake = FakeSortedSetRedis()
+    monkeypatch.setattr(redis_client, "redis", fake)
+    monkeypatch.setattr(coin_leaderboard, "_ready", False)
+
+    # Рассылка обновлений проверяется в test_leaderboard_broadcaster.py
+    async def skip_broadcast():
+        pass
+
+    monkeypatch.setattr(leaderboard_broadcaster, "request_update", skip_broadcast)
+    return fake
+
+
+async def _create_users(db_session, coins):
+    users = [User(username=f"user{i}", hashed_password="x", shilka_coins=c) for i, c in enumerate(coins)]
+    db_session.add_all(users)
+    await db_session.commit()
+    return users
+
+
+class TestMemberEncoding:
+    """Тесты кодирования id пользователя в элемент sorted set"""
+
+    def test_member_roundtrip(self):
+        """id восстанавливается из элемента"""
+        assert _user_id(_member(42)) == 42
+
+    def test_smaller_id_sorts_higher_on_equal_score(self):
+        """При равных монетах меньший id идёт раньше в ZREVRANGE"""
+        assert _member(1) > _member(2) > _member(1000)
+
+
+class TestCoinLeaderboard:
+    """Тесты лидерборда"""
+
+    @pytest.mark.asyncio
+    async def test_sql_fallback_without_redis(self, db_session):
+        """Без Redis лидерборд читается из БД с LIMIT"""
+        users = await _create_users(db_session, [5, 20, None, 20])
+        leaderboard = CoinLeaderboard()
+
+        top = await leaderboard.top(db_session, 3)
+
+        assert [u.id for u in top] == [users[1].id, users[3].id, users[0].id]
+        assert await leaderboard.rank(db_session, users[3].id) == 2
+        assert await leaderboard.rank(db_session, users[2].id) == 4
+
+    @pytest.mark.asyncio
+    async def test_rebuild_and_read_from_sorted_set(self, db_session, fake_redis):
+        """После перестроения топ и место берутся из sorted set"""
+        users = await _create_users(db_session, [5, 20, None, 20])
+
+        await coin_leaderboard.rebuild(db_session)
+        top = await coin_leaderboard.top(db_session, 10)
+
+        assert coin_leaderboard.is_ready
+        assert len(fake_redis.sets[LEADERBOARD_KEY]) == 4
+        assert [u.id for u in top] == [users[1].id, users[3].id, users[0].id, users[2].id]
+        assert await coin_leaderboard.rank(db_session, users[0].id) == 3
+
+    @pytest.mark.asyncio
+    async def test_increment_moves_user_up(self, db_session, fake_redis):
+        """ZINCRBY меняет позицию пользователя без запроса к БД"""
+        users = await _create_users(db_session, [10, 20])
+        await coin_leaderboard.rebuild(db_session)
+
+        await coin_leaderboard.increment(users[0].id, 15)
+
+        assert await coin_leaderboard.rank(db_session, users[0].id) == 1
+        assert fake_redis.sets[LEADERBOARD_KEY][_member(users[0].id)] == 25
+
+    @pytest.mark.asyncio
+    async def test_add_coins_updates_sorted_set(self, db_session, fake_redis, test_user):
+        """Начисление монет попадает в sorted set"""
+        await coin_leaderboard.rebuild(db_session)
+        before = fake_redis.sets[LEADERBOARD_KEY][_member(test_user.id)]
+
+        await stats_service.add_coins(test_user, 7, db_session)
+
+        assert fake_redis.sets[LEADERBOARD_KEY][_member(test_user.id)] == before + 7
+
+    @pytest.mark.asyncio
+    async def test_register_and_delete_keep_sorted_set_in_sync(self, admin_client, fake_redis, db_session):
+        """Регистрация добавляет пользователя, удаление — убирает"""
+        await coin_leaderboard.rebuild(db_session)
+
+        response = await admin_client.post(
+            "/auth/register", json={"username": "newcomer", "password": "password123"}
+        )
+        user_id = response.json()["id"]
+        assert fake_redis.sets[LEADERBOARD_KEY][_member(user_id)] == 0
+
+        response = await admin_client.delete(f"/admin/users/{user_id}")
+        assert response.status_code == 204
+        assert _member(user_id) not in fake_redis.sets[LEADERBOARD_KEY]
+
+
+    @pytest.mark.asyncio
+    async def test_cursor_pages_survive_score_change(self, db_session, fake_redis):
+        """Курсор продолжает с нужного места, даже если баланс его пользователя изменился"""
+        users = await _create_users(db_session, [50, 40, 30, 30, 30, 10])
+        await coin_leaderboard.rebuild(db_session)
+
+        # Курсор после users[2] (30 монет), затем users[2] получает монеты
+        await coin_leaderboard.increment(users[2].id, 100)
+        page = await coin_leaderboard.page_after(db_session, 30, users[2].id, 2)
+
+        assert [u.id for u in page] == [users[3].id, users[4].id]
+
+
+class TestLeaderboardEndpoints:
+    """Тесты постраничного лидерборда и места пользователя"""
+
+    @staticmethod
+    async def _walk(client, limit):
+        ids = []
+        response = await client.get(f"/stats/leaderboard?limit={limit}")
+        while True:
+            ids.extend(user["id"] for user in response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return ids
+            response = await client.get(f"/stats/leaderboard?limit={limit}&cursor={cursor}")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("use_redis", [False, True])
+    async def test_pages_cover_leaderboard_in_order(self, client, db_session, request, use_redis):
+        """Страницы по курсору и по offset дают тот же порядок, что и весь лидерборд"""
+        if use_redis:
+            request.getfixturevalue("fake_redis")
+        users = await _create_users(db_session, [7, 3, 7, 0, None, 12, 3])
+        await coin_leaderboard.rebuild(db_session)
+        expected = [users[i].id for i in (5, 0, 2, 1, 6, 3, 4)]
+
+        assert await self._walk(client, 3) == expected
+        second_page = await client.get("/stats/leaderboard?limit=3&offset=3")
+        assert [u["id"] for u in second_page.json()] == expected[3:6]
+
+    @pytest.mark.asyncio
+    async def test_entries_are_compact_and_ranked(self, client, db_session):
+        """Записи содержат только id, имя, монеты и место — и на страницах по курсору тоже"""
+        await _create_users(db_session, [50, 40, 30, 20, 10])
+
+        first = await client.get("/stats/leaderboard?limit=2&offset=1")
+        second = await client.get(f"/stats/leaderboard?limit=2&cursor={first.headers['x-next-cursor']}")
+
+        assert set(first.json()[0]) == {"id", "username", "shilka_coins", "rank"}
+        assert [e["rank"] for e in first.json() + second.json()] == [2, 3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_default_page_size(self, client, db_session):
+        """По умолчанию страница совпадает с размером лидерборда из настроек"""
+        size = settings["leaderboard"]["size"]
+        await _create_users(db_session, [i for i in range(size + 10)])
+
+        response = await client.get("/stats/leaderboard")
+
+        assert len(response.json()) == size
+        assert response.headers["x-next-cursor"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_rejected(self, client):
+        """Некорректный курсор отклоняется валидацией"""
+        response = await client.get("/stats/leaderboard?cursor=abc")
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_me_returns_rank_and_neighbors(self, authenticated_client, db_session, test_user):
+        """Пользователь получает своё место и соседей"""
+        # test_user создан первым со 100 монетами
+        await _create_users(db_session, [300, 200, 50, 10])
+
+        response = await authenticated_client.get("/stats/leaderboard/me?radius=1")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rank"] == 3
+        assert data["shilka_coins"] == 100
+        assert [u["shilka_coins"] for u in data["neighbors"]] == [200, 100, 50]
+
+    @pytest.mark.asyncio
+    async def test_me_requires_auth(self, client):
+        """Без авторизации место пользователя недоступно"""
+        response = await client.get("/stats/leaderboard/me")
+
+        assert response.status_code == 401
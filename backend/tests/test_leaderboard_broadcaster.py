@@ -0,0 +1,125 @@
+"""
+Тесты для объединения рассылок лидерборда (stats/broadcaster.py)
+"""
+import asyncio
+import time
+
+import pytest
+
+from src.redis_client import redis_client
+from src.stats.broadcaster import LOCK_KEY, MERGED_KEY, PENDING_KEY, LeaderboardBroadcaster
+
+
+class FakeCounterRedis:
+    """Минимальная in-memory замена Redis для счётчиков и блокировки с TTL"""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    async def incr(self, key):
+        return await self.incrby(key, 1)
+
+    async def incrby(self, key, amount):
+        self._alive(key)
+        self.values[key] = int(self.values.get(key, 0)) + amount
+        return self.values[key]
+
+    async def set(self, key, value, nx=False, px=None):
+        if nx and self._alive(key):
+            return None
+        self.values[key] = value
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000
+        return True
+
+    async def getset(self, key, value):
+        previous = self.values.get(key) if self._alive(key) else None
+        self.values[key] = value
+        return previous
+
+    async def pttl(self, key):
+        if not self._alive(key):
+            return -2
+        expires_at = self.expires.get(key)
+        return int((expires_at - time.monotonic()) * 1000) if expires_at else -1
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    """Рассылка с коротким интервалом, считающая публикации вместо обращения к БД"""
+    monkeypatch.setattr(redis_client, "redis", FakeCounterRedis())
+    instance = LeaderboardBroadcaster(interval_ms=20)
+    instance.publish_calls = 0
+
+    async def fake_publish():
+        instance.publish_calls += 1
+
+    monkeypatch.setattr(instance, "_publish", fake_publish)
+    yield instance
+    instance.stop()
+
+
+async def _wait_idle(broadcaster, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while broadcaster._task is not None and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+class TestLeaderboardBroadcaster:
+    """Тесты коалесцирующей рассылки"""
+
+    @pytest.mark.asyncio
+    async def test_burst_is_merged_into_one_publish(self, broadcaster):
+        """Пачка изменений за интервал даёт одну рассылку"""
+        for _ in range(10):
+            await broadcaster.request_update()
+        await _wait_idle(broadcaster)
+
+        assert broadcaster.publish_calls == 1
+        assert broadcaster.requested == 10
+        assert broadcaster.published == 1
+        assert broadcaster.merged == 9
+        assert redis_client.redis.values[MERGED_KEY] == 9
+        assert int(redis_client.redis.values[PENDING_KEY]) == 0
+
+    @pytest.mark.asyncio
+    async def test_update_after_flush_is_published(self, broadcaster):
+        """Изменение после рассылки не теряется и уходит следующей рассылкой"""
+        await broadcaster.request_update()
+        await _wait_idle(broadcaster)
+        await broadcaster.request_update()
+        await _wait_idle(broadcaster)
+
+        assert broadcaster.publish_calls == 2
+        assert broadcaster.merged == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_lock_held_by_other_worker(self, broadcaster):
+        """Пока интервал занят другим воркером, рассылка откладывается, но не теряется"""
+        await redis_client.redis.set(LOCK_KEY, "other", nx=True, px=60)
+        await broadcaster.request_update()
+
+        await asyncio.sleep(0.03)
+        assert broadcaster.publish_calls == 0
+
+        await _wait_idle(broadcaster)
+        assert broadcaster.publish_calls == 1
+
+    @pytest.mark.asyncio
+    async def test_ignored_without_redis(self, monkeypatch):
+        """Без Redis рассылать некуда: запросы игнорируются"""
+        monkeypatch.setattr(redis_client, "redis", None)
+        instance = LeaderboardBroadcaster(interval_ms=20)
+
+        await instance.request_update()
+
+        assert instance._task is None
+        assert instance.requested == 0
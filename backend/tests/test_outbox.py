@@ -0,0 +1,118 @@
+"""
+Тесты для outbox сохранения сессий (stats/outbox.py)
+"""
+import json
+
+import pytest
+from sqlalchemy import select
+
+from src.auth.models import User
+from src.stats import service as stats_service
+from src.stats.broadcaster import leaderboard_broadcaster
+from src.stats.leaderboard import coin_leaderboard
+from src.stats.models import OutboxEvent
+from src.stats.outbox import Outbox, OutboxEventType, add_event, outbox
+from src.stats.windowed import windowed_leaderboard
+from src.redis_client import redis_client
+
+
+@pytest.fixture
+def side_effects(monkeypatch):
+    """Записывает побочные эффекты вместо обращения к Redis"""
+    calls = []
+
+    async def set_coins(user_id, coins):
+        calls.append(("set_coins", user_id, coins))
+
+    async def request_update():
+        calls.append(("request_update",))
+
+    monkeypatch.setattr(coin_leaderboard, "set_coins", set_coins)
+    monkeypatch.setattr(leaderboard_broadcaster, "request_update", request_update)
+    return calls
+
+
+async def _events(db_session):
+    return (await db_session.execute(select(OutboxEvent).order_by(OutboxEvent.id))).scalars().all()
+
+
+class TestTypingSessionOutbox:
+    """Тесты записи и обработки события сохранения сессии"""
+
+    @pytest.mark.asyncio
+    async def test_session_writes_event_instead_of_side_effects(self, authenticated_client, db_session, test_user, side_effects):
+        """Запрос только записывает событие; побочные эффекты выполняет drain"""
+        payload = {"words": ["ab"], "history": [[{"char": c, "correct": True, "time": 10} for c in "ab"]], "duration": 60}
+
+        response = await authenticated_client.post("/stats/typing-session", json=payload)
+
+        assert response.status_code == 200
+        assert side_effects == []
+        [event] = await _events(db_session)
+        assert event.event_type == OutboxEventType.TYPING_SESSION_CREATED
+        assert json.loads(event.payload) == {"session_id": response.json()["id"], "user_id": test_user.id, "coins": 2}
+
+        assert await outbox.drain(db_session) == 1
+        assert side_effects == [("request_update",), ("set_coins", test_user.id, 102)]
+        assert await _events(db_session) == []
+
+    @pytest.mark.asyncio
+    async def test_deleted_user_not_added_to_leaderboards(self, db_session, side_effects):
+        """Событие удалённого пользователя только инвалидирует кэши и запрашивает рассылку"""
+        add_event(db_session, OutboxEventType.TYPING_SESSION_CREATED, {"session_id": 1, "user_id": 999, "coins": 5})
+        await db_session.commit()
+
+        assert await outbox.drain(db_session) == 1
+        assert side_effects == [("request_update",)]
+
+    @pytest.mark.asyncio
+    async def test_failed_event_retried_until_max_attempts(self, db_session, side_effects):
+        """Упавшее событие остаётся с last_error и после max_attempts не обрабатывается"""
+        worker = Outbox(poll_interval_ms=1000, batch_size=10, max_attempts=2)
+        add_event(db_session, "unknown", {})
+        user = User(username="typist", hashed_password="x")
+        db_session.add(user)
+        await db_session.flush()
+        user_id = user.id
+        add_event(db_session, OutboxEventType.TYPING_SESSION_CREATED, {"session_id": 1, "user_id": user_id, "coins": 3})
+        await db_session.commit()
+
+        assert await worker.drain(db_session) == 1
+        [failed] = await _events(db_session)
+        assert (failed.event_type, failed.attempts) == ("unknown", 1)
+        assert "unknown" in failed.last_error
+
+        assert await worker.drain(db_session) == 0
+        assert await worker.drain(db_session) == 0
+        assert (await _events(db_session))[0].attempts == 2
+        assert worker.failed == 2
+        assert side_effects == [("request_update",), ("set_coins", user_id, 0)]
+
+    @pytest.mark.asyncio
+    async def test_replayed_event_does_not_double_count(self, authenticated_client, db_session, test_user, side_effects, monkeypatch):
+        """Повторная обработка события пишет тот же баланс и не учитывает сессию в окнах дважды"""
+        markers = set()
+        recorded = []
+
+        async def set_nx(key, value, px):
+            if key in markers:
+                return False
+            markers.add(key)
+            return True
+
+        async def record(user_id, coins, wpm, moment=None):
+            recorded.append((user_id, coins))
+
+        monkeypatch.setattr(redis_client, "set_nx", set_nx)
+        monkeypatch.setattr(windowed_leaderboard, "record", record)
+        payload = {"words": ["ab"], "history": [[{"char": c, "correct": True, "time": 10} for c in "ab"]], "duration": 60}
+        response = await authenticated_client.post("/stats/typing-session", json=payload)
+        [event] = await _events(db_session)
+        event_payload = json.loads(event.payload)
+
+        for _ in range(2):
+            await stats_service.process_typing_session_created(db_session, event_payload)
+
+        assert recorded == [(test_user.id, 2)]
+        assert [call for call in side_effects if call[0] == "set_coins"] == [("set_coins", test_user.id, 102)] * 2
+        assert response.status_code == 200
@@ -5,7 +5,7 @@ import pytest
 
 from src.stats import service as stats_service
 from src.stats import schemas as stats_schemas
-import json
+from src.stats.history_codec import encode_history
 
 
 @pytest.mark.asyncio
@@ -32,11 +32,11 @@ async def test_create_typing_session_and_stats(db_session, test_user):
 
 
 @pytest.mark.asyncio
-async def test_char_error_stats_empty_and_invalid_json(db_session, test_user):
+async def test_char_error_stats_empty_and_invalid_history(db_session, test_user):
     # create a typing session with empty history -> should be skipped
     from src.stats.models import TypingSession
 
-    ts = TypingSession(user_id=test_user.id, wpm=10, accuracy=90, duration=10, words='[]', history='[]')
+    ts = TypingSession(user_id=test_user.id, wpm=10, accuracy=90, duration=10, words='[]', history=encode_history([]))
     db_session.add(ts)
     await db_session.commit()
     await db_session.refresh(ts)
@@ -45,8 +45,8 @@ async def test_char_error_stats_empty_and_invalid_json(db_session, test_user):
     # empty history yields empty stats
     assert isinstance(stats, list)
 
-    # create a session with invalid JSON history -> should be caught and skipped
-    bad = TypingSession(user_id=test_user.id, wpm=5, accuracy=50, duration=5, words='[]', history='not json')
+    # create a session with corrupted history -> should be caught and skipped
+    bad = TypingSession(user_id=test_user.id, wpm=5, accuracy=50, duration=5, words='[]', history=b'not history')
     db_session.add(bad)
     await db_session.commit()
     await db_session.refresh(bad)
@@ -60,7 +60,7 @@ async def test_char_error_stats_all_errors_filtered(db_session, test_user):
     # create a session where all chars are incorrect -> error_rate == 100 -> should be filtered out
     from src.stats.models import TypingSession
 
-    history = json.dumps([[{"char": "x", "correct": False, "time": 1}]])
+    history = encode_history([[{"char": "x", "correct": False, "time": 1}]])
     ts = TypingSession(user_id=test_user.id, wpm=1, accuracy=0, duration=10, words='[]', history=history)
     db_session.add(ts)
     await db_session.commit()
@@ -82,3 +82,124 @@ async def test_add_coins_and_leaderboard(db_session, test_user):
 
     lb = await get_leaderboard(db_session)
     assert any(u.id == test_user.id for u in lb)
+
+
+def _payload(chars):
+    return stats_schemas.WordHistoryPayload(
+        words=["w"],
+        history=[[{"char": c, "correct": ok, "time": 10} for c, ok in chars]],
+        duration=30,
+    )
+
+
+@pytest.mark.asyncio
+async def test_char_error_stats_accumulate_across_sessions(db_session, test_user):
+    # each session adds its counts to char_error_stats; the endpoint reads the aggregates
+    await stats_service.create_typing_session(test_user, _payload([("a", True), ("b", False), ("b", True)]), db_session)
+    await stats_service.create_typing_session(test_user, _payload([("a", False), ("b", True)]), db_session)
+
+    stats = {s["char"]: s for s in await stats_service.get_char_error_stats(test_user, db_session)}
+
+    assert (stats["a"]["total_typed"], stats["a"]["errors"]) == (2, 1)
+    assert (stats["b"]["total_typed"], stats["b"]["errors"]) == (3, 1)
+    assert stats["b"]["error_rate"] == 33.33
+
+
+@pytest.mark.asyncio
+async def test_admin_delete_session_subtracts_char_errors(db_session, test_user):
+    from src.admin.service import delete_session
+
+    await stats_service.create_typing_session(test_user, _payload([("a", True), ("a", True)]), db_session)
+    removed = await stats_service.create_typing_session(test_user, _payload([("a", False)]), db_session)
+    # coin transaction references the session, so drop it first as the admin flow would have to
+    from sqlalchemy import delete
+    from src.stats.models import CoinTransaction
+    await db_session.execute(delete(CoinTransaction).where(CoinTransaction.typing_session_id == removed.id))
+
+    await delete_session(db_session, removed.id)
+
+    stats = {s["char"]: s for s in await stats_service.get_char_error_stats(test_user, db_session)}
+    assert (stats["a"]["total_typed"], stats["a"]["errors"]) == (2, 0)
+
+
+@pytest.mark.asyncio
+async def test_backfill_char_error_stats_from_history(db_session, test_user):
+    # sessions stored before char_error_stats existed are picked up by the backfill script
+    from scripts.backfill_char_error_stats import backfill_user
+    from src.stats.models import TypingSession
+
+    history = encode_history([[{"char": "q", "correct": False, "time": 1}, {"char": "q", "correct": True, "time": 1}]])
+    for _ in range(2):
+        db_session.add(TypingSession(user_id=test_user.id, wpm=1, accuracy=50, words="[]", history=history))
+    db_session.add(TypingSession(user_id=test_user.id, wpm=1, accuracy=50, words="[]", history=b"not history"))
+    await db_session.commit()
+
+    assert await backfill_user(db_session, test_user.id) == 1
+    # re-running recomputes instead of adding twice
+    await backfill_user(db_session, test_user.id)
+
+    stats = await stats_service.get_char_error_stats(test_user, db_session)
+    assert [(s["char"], s["total_typed"], s["errors"]) for s in stats] == [("q", 4, 2)]
+
+
+@pytest.mark.asyncio
+async def test_create_typing_session_single_commit(db_session, test_user, monkeypatch):
+    # session, coin transaction and balance are written in one transaction
+    from sqlalchemy import select
+    from src.stats.history_codec import decode_history
+    from src.stats.models import CoinTransaction
+
+    commits = []
+    original_commit = db_session.commit
+
+    async def counting_commit():
+        commits.append(1)
+        await original_commit()
+
+    monkeypatch.setattr(db_session, "commit", counting_commit)
+    test_user.shilka_coins = 1
+    history = [[{"char": "a", "correct": True, "time": 5}, {"char": "b", "correct": False, "time": 9}],
+               [{"char": "c", "correct": False, "time": 14}, {"char": "d", "correct": False, "time": 20}]]
+    payload = stats_schemas.WordHistoryPayload(words=["ab", "cd"], history=history, duration=30)
+
+    ts = await stats_service.create_typing_session(test_user, payload, db_session)
+
+    assert len(commits) == 1
+    txn = (await db_session.execute(select(CoinTransaction))).scalar_one()
+    # reward is 1 - 3 = -2, clamped so the balance stops at zero
+    assert (txn.typing_session_id, txn.amount, test_user.shilka_coins) == (ts.id, -1, 0)
+    assert (ts.wpm, ts.accuracy) == (0.0, 25.0)
+    assert decode_history(ts.history) == history
+
+
+@pytest.mark.asyncio
+async def test_add_coins_is_atomic_and_clamped(db_session, test_user):
+    # the balance is computed in SQL, so a stale in-memory value does not lose updates
+    from sqlalchemy import update
+    from src.auth.models import User
+    from src.stats.service import add_coins
+
+    await db_session.execute(
+        update(User).where(User.id == test_user.id).values(shilka_coins=110).execution_options(synchronize_session=False)
+    )
+    await db_session.commit()
+    assert test_user.shilka_coins == 100
+
+    user = await add_coins(test_user, 5, db_session)
+    assert user.shilka_coins == 115
+
+    user = await add_coins(test_user, -500, db_session)
+    assert user.shilka_coins == 0
+
+
+@pytest.mark.asyncio
+async def test_admin_update_user_coins_clamps_and_checks_user(db_session, test_user):
+    from fastapi import HTTPException
+    from src.admin.service import update_user_coins
+
+    user = await update_user_coins(db_session, test_user.id, -500)
+    assert user.shilka_coins == 0
+
+    with pytest.raises(HTTPException) as exc:
+        await update_user_coins(db_session, 999999, 5)
+    assert exc.value.status_code == 404
@@ -1,6 +1,7 @@
 import pytest
 
-from src.stats.utils import compute_wpm, compute_accuracy
+from src.stats.history_codec import encode_history
+from src.stats.utils import compute_wpm, compute_accuracy, count_char_errors, count_char_errors_encoded, diff_leaderboard
 
 
 class CharObj:
@@ -62,3 +63,68 @@ def test_compute_accuracy_json_and_objects():
 
     history2 = [[CharObj(False), CharObj(False)]]  # total=2, correct=0 -> 0.0
     assert compute_accuracy(history2) == 0.0
+
+
+def test_diff_leaderboard_returns_only_changed_rows():
+    previous = [
+        {"id": 1, "shilka_coins": 50, "rank": 1},
+        {"id": 2, "shilka_coins": 40, "rank": 2},
+        {"id": 3, "shilka_coins": 30, "rank": 3},
+    ]
+    current = [
+        {"id": 2, "shilka_coins": 60, "rank": 1},
+        {"id": 1, "shilka_coins": 50, "rank": 2},
+        {"id": 4, "shilka_coins": 35, "rank": 3},
+    ]
+
+    changed, removed = diff_leaderboard(previous, current)
+
+    assert [row["id"] for row in changed] == [2, 1, 4]
+    assert removed == [3]
+
+
+def test_diff_leaderboard_identical_snapshots():
+    snapshot = [{"id": 1, "shilka_coins": 5, "rank": 1}]
+    assert diff_leaderboard(snapshot, list(snapshot)) == ([], [])
+
+
+def test_count_char_errors_counts_totals_and_errors():
+    history = [
+        [{"char": "a", "correct": True}, {"char": "b", "correct": False}],
+        [{"char": "a", "correct": False}, {"char": "", "correct": False}, {"char": "c"}],
+    ]
+    assert count_char_errors(history) == {"a": [2, 1], "b": [1, 1], "c": [1, 0]}
+
+
+def test_count_char_errors_encoded_skips_broken_history():
+    encoded = encode_history([[{"char": "x", "correct": False}, {"char": "x"}, {"char": ""}]])
+    assert count_char_errors_encoded(encoded) == {"x": [2, 1]}
+    assert count_char_errors_encoded(b"not history") == {}
+    assert count_char_errors_encoded(encoded[:-1]) == {}
+    assert count_char_errors_encoded(None) == {}
+
+
+def test_summarize_history_matches_separate_computations():
+    from src.stats.utils import compute_reward_from_history, summarize_history
+
+    history = [
+        [{"char": "a", "correct": True, "time": 10}, {"char": "b", "correct": True, "time": 20}],
+        [{"char": "c", "correct": False, "time": 30}, {"char": "a", "correct": True, "time": 25}],
+        [],
+        [CharObj(True), CharObj(False)],
+    ]
+    summary = summarize_history(history, 45)
+
+    assert summary.wpm == compute_wpm(["ab", "ca", "", "xx"], history, 45)
+    assert summary.accuracy == compute_accuracy(history)
+    assert summary.reward == compute_reward_from_history(history)
+    assert summary.char_errors == count_char_errors(history)
+    assert summary.columns.word_lengths == [2, 2, 0, 2]
+    assert summary.columns.times[:4] == [10, 20, 30, 25]
+
+
+def test_summarize_history_empty():
+    from src.stats.utils import summarize_history
+
+    summary = summarize_history([], None)
+    assert (summary.wpm, summary.accuracy, summary.reward, summary.char_errors) == (0.0, 100.0, 0, {})
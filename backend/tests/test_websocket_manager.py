@@ -0,0 +1,459 @@
+"""
+Тесты для WebSocket менеджера лидерборда и delta-протокола
+"""
+import asyncio
+import json
+
+import pytest
+
+from src.auth.models import User
+from src.redis_client import redis_client
+from src.stats import service as stats_service
+from src.stats.leaderboard import PUBLISH_SNAPSHOT_SCRIPT, SNAPSHOT_KEY
+from src import websocket_manager
+from src.websocket_manager import (
+    SLOW_CONSUMER_CLOSE_CODE,
+    ConnectionManager,
+    encode_message,
+    merge_leaderboard_updates,
+)
+
+
+class FakeWebSocket:
+    """WebSocket, запоминающий отправленные сообщения"""
+
+    def __init__(self, fail: bool = False, blocked: bool = False):
+        self.sent = []
+        self.fail = fail
+        self.closed_with = None
+        # Пока событие не установлено, отправка «висит», как у медленного клиента
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        await self.unblocked.wait()
+        if self.fail:
+            raise RuntimeError("connection closed")
+        self.sent.append(json.loads(payload))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class FakePubSubRedis:
+    """Минимальная in-memory замена Redis для снимков и публикаций лидерборда"""
+
+    def __init__(self):
+        self.values = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+    async def eval(self, script, numkeys, *args):
+        """Повторяет PUBLISH_SNAPSHOT_SCRIPT"""
+        assert script == PUBLISH_SNAPSHOT_SCRIPT
+        (snapshot_key, version_key), (expected, base_version, data, changes, removed, _, channel) = (
+            args[:numkeys], args[numkeys:]
+        )
+        if self.values.get(snapshot_key, "") != expected:
+            return None
+        version = await self.incr(version_key)
+        self.values[snapshot_key] = f'{{"version": {version}, "data": {data}}}'
+        await self.publish(channel, (
+            f'{{"version": {version}, "base_version": {base_version}, "data": {data}, '
+            f'"changes": {changes}, "removed": {removed}}}'
+        ))
+        return version
+
+
+UPDATE = {
+    "version": 5,
+    "base_version": 4,
+    "data": [{"id": 1, "rank": 1}, {"id": 2, "rank": 2}],
+    "changes": [{"id": 2, "rank": 2}],
+    "removed": [3],
+}
+
+
+class TestConnectionManager:
+    """Тесты рассылки обновлений"""
+
+    @pytest.mark.asyncio
+    async def test_full_and_delta_clients_get_their_messages(self):
+        """Старые клиенты получают полный список, delta-клиенты — только изменения"""
+        manager = ConnectionManager()
+        legacy, delta = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(legacy)
+        await manager.connect(delta, delta=True)
+
+        await manager.broadcast_update(UPDATE)
+        await manager.drain()
+
+        assert legacy.sent == [{"type": "leaderboard_update", "data": UPDATE["data"]}]
+        assert delta.sent == [{
+            "type": "rank_changed",
+            "version": 5,
+            "base_version": 4,
+            "data": UPDATE["changes"],
+            "removed": [3],
+        }]
+
+    @pytest.mark.asyncio
+    async def test_unknown_base_version_sends_snapshot(self):
+        """Без базовой версии delta-клиенты получают полный снимок"""
+        manager = ConnectionManager()
+        delta = FakeWebSocket()
+        await manager.connect(delta, delta=True)
+
+        await manager.broadcast_update({**UPDATE, "base_version": None})
+        await manager.drain()
+
+        assert delta.sent == [{"type": "leaderboard_snapshot", "version": 5, "data": UPDATE["data"]}]
+
+    @pytest.mark.asyncio
+    async def test_failed_connections_are_dropped(self):
+        """Соединение с ошибкой отправки отключается"""
+        manager = ConnectionManager()
+        broken = FakeWebSocket(fail=True)
+        await manager.connect(broken, delta=True)
+
+        await manager.broadcast_update(UPDATE)
+        await manager.drain()
+        await asyncio.sleep(0)
+
+        assert broken not in manager.active_connections
+        assert broken not in manager.delta_connections
+
+
+    @pytest.mark.asyncio
+    async def test_message_serialized_once_for_all_clients(self, monkeypatch):
+        """Сообщение сериализуется один раз, сколько бы ни было клиентов"""
+        manager = ConnectionManager()
+        clients = [FakeWebSocket() for _ in range(50)]
+        for client in clients:
+            await manager.connect(client)
+        calls = []
+        encode = websocket_manager.encode_message
+        monkeypatch.setattr(websocket_manager, "encode_message", lambda m: calls.append(m) or encode(m))
+
+        await manager.broadcast_leaderboard(UPDATE["data"])
+        await manager.drain()
+
+        assert len(calls) == 1
+        assert all(client.sent == [{"type": "leaderboard_update", "data": UPDATE["data"]}] for client in clients)
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_delay_others_and_is_disconnected(self):
+        """Медленный клиент не задерживает остальных и отключается при переполнении очереди"""
+        manager = ConnectionManager(send_queue_size=2)
+        slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+        await manager.connect(slow)
+        await manager.connect(fast)
+
+        # Первое сообщение «висит» в отправке, ещё два помещаются в очередь
+        for _ in range(4):
+            await manager.broadcast_leaderboard(UPDATE["data"])
+            await asyncio.sleep(0)
+        await manager.drain()
+        await asyncio.sleep(0)
+
+        assert len(fast.sent) == 4
+        assert slow.sent == []
+        assert slow not in manager.active_connections
+        assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+
+    @pytest.mark.asyncio
+    async def test_personal_messages_keep_order_with_broadcasts(self):
+        """Личные сообщения идут через ту же очередь, что и рассылки"""
+        manager = ConnectionManager()
+        client = FakeWebSocket()
+        await manager.connect(client, delta=True)
+
+        await manager.send_personal_message({"type": "leaderboard_snapshot", "version": 4, "data": []}, client)
+        await manager.broadcast_update(UPDATE)
+        await manager.drain()
+
+        assert [message["type"] for message in client.sent] == ["leaderboard_snapshot", "rank_changed"]
+
+
+class TestTopics:
+    """Тесты подписок на топики"""
+
+    @pytest.mark.asyncio
+    async def test_topic_message_reaches_only_subscribers(self):
+        """Сообщение топика получают только подписанные соединения"""
+        manager = ConnectionManager()
+        subscriber, other = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(subscriber)
+        await manager.connect(other)
+
+        assert manager.subscribe(subscriber, "rank:7")
+        manager.publish_local("rank:7", encode_message({"type": "rank_update", "rank": 3}))
+        manager.publish_local("rank:8", encode_message({"type": "rank_update", "rank": 1}))
+        await manager.drain()
+
+        assert subscriber.sent == [{"type": "rank_update", "rank": 3}]
+        assert other.sent == []
+
+    @pytest.mark.asyncio
+    async def test_unsubscribed_from_leaderboard_gets_no_updates(self):
+        """Отписавшись от leaderboard, клиент перестаёт получать лидерборд"""
+        manager = ConnectionManager()
+        client = FakeWebSocket()
+        await manager.connect(client, delta=True)
+
+        manager.unsubscribe(client, "leaderboard")
+        await manager.broadcast_update(UPDATE)
+        await manager.drain()
+
+        assert client.sent == []
+
+    @pytest.mark.asyncio
+    async def test_unknown_topic_rejected(self):
+        """На неизвестный топик подписаться нельзя"""
+        manager = ConnectionManager()
+        client = FakeWebSocket()
+        await manager.connect(client)
+
+        assert not manager.subscribe(client, "rank:abc")
+        assert not manager.subscribe(client, "everything")
+        assert not manager.subscribe(client, "wpm:median:ru:words:time")
+        assert manager.subscribe(client, "wpm:best:ru:words:time")
+
+    @pytest.mark.asyncio
+    async def test_disconnect_removes_subscriptions(self):
+        """После отключения соединение не остаётся в подписчиках"""
+        manager = ConnectionManager()
+        client = FakeWebSocket()
+        await manager.connect(client)
+        manager.subscribe(client, "rank:1")
+
+        manager.disconnect(client)
+
+        assert manager.subscribers("rank:1") == set()
+        assert manager.subscribers("leaderboard") == set()
+
+
+
+def _update(version, base_version, data, changes, removed=()):
+    return {
+        "version": version,
+        "base_version": base_version,
+        "data": [{"id": i, "rank": r} for i, r in data],
+        "changes": [{"id": i, "rank": r} for i, r in changes],
+        "removed": list(removed),
+    }
+
+
+class FakePubSub:
+    """Pub/Sub, отдающий заранее заданные сообщения и затем падающий или молчащий"""
+
+    def __init__(self, messages, fail_after=False):
+        self.messages = list(messages)
+        self.fail_after = fail_after
+        self.closed = False
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        if self.messages:
+            return self.messages.pop(0)
+        if self.fail_after:
+            raise ConnectionError("connection lost")
+        await asyncio.sleep(min(timeout, 0.01))
+        return None
+
+    async def close(self):
+        self.closed = True
+
+
+def _redis_message(update):
+    return {"type": "message", "channel": "leaderboard_update", "data": json.dumps(update)}
+
+
+def _topic_message(topic, message):
+    return {"type": "pmessage", "channel": f"ws:{topic}", "data": encode_message(message)}
+
+
+class TestRedisListener:
+    """Тесты пакетного чтения Redis и слияния обновлений"""
+
+    def test_merge_consecutive_updates(self):
+        """Слитое обновление содержит строки, затронутые любым из обновлений, в последнем виде"""
+        older = _update(5, 4, [(1, 1), (2, 2), (3, 3)], [(2, 2)], removed=[9])
+        newer = _update(6, 5, [(1, 1), (3, 2), (2, 3)], [(3, 2), (2, 3)])
+
+        merged = merge_leaderboard_updates(older, newer)
+
+        assert (merged["version"], merged["base_version"]) == (6, 4)
+        assert merged["changes"] == [{"id": 3, "rank": 2}, {"id": 2, "rank": 3}]
+        assert merged["removed"] == [9]
+        assert merged["data"] == newer["data"]
+
+    def test_merge_with_gap_forces_snapshot(self):
+        """Если версии не подряд, delta-клиенты получат полный снимок"""
+        merged = merge_leaderboard_updates(_update(5, 4, [], []), _update(8, 7, [(1, 1)], []))
+
+        assert merged["base_version"] is None
+        assert merged["version"] == 8
+
+    @pytest.mark.asyncio
+    async def test_batch_keeps_newest_per_topic_and_merges_updates(self):
+        """Из пачки рассылается одно обновление лидерборда и последнее сообщение каждого топика"""
+        manager = ConnectionManager()
+        delta, rank_client = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(delta, delta=True)
+        await manager.connect(rank_client)
+        manager.unsubscribe(rank_client, "leaderboard")
+        manager.subscribe(rank_client, "rank:1")
+        pubsub = FakePubSub([
+            _redis_message(_update(2, 1, [(1, 1), (2, 2)], [(1, 1)])),
+            _topic_message("rank:1", {"type": "rank_update", "rank": 2}),
+            _redis_message(_update(3, 2, [(2, 1), (1, 2)], [(2, 1), (1, 2)])),
+            _topic_message("rank:1", {"type": "rank_update", "rank": 1}),
+        ])
+
+        manager._accept_batch(await manager._read_batch(pubsub))
+        dispatcher = asyncio.create_task(manager._dispatch_pending())
+        await asyncio.sleep(0.01)
+        await manager.drain()
+        dispatcher.cancel()
+
+        assert manager.merged_updates == 1
+        assert [(m["version"], m["base_version"]) for m in delta.sent] == [(3, 1)]
+        assert rank_client.sent == [{"type": "rank_update", "rank": 1}]
+
+    @pytest.mark.asyncio
+    async def test_listener_resubscribes_after_redis_error(self, monkeypatch):
+        """После ошибки Redis слушатель подписывается заново и продолжает рассылку"""
+        pubsubs = [
+            FakePubSub([], fail_after=True),
+            FakePubSub([_redis_message(_update(1, None, [(1, 1)], [(1, 1)]))]),
+        ]
+        subscribed = []
+
+        async def fake_subscribe(channel, patterns=()):
+            subscribed.append(channel)
+            return pubsubs[len(subscribed) - 1]
+
+        monkeypatch.setattr(redis_client, "subscribe", fake_subscribe)
+        monkeypatch.setattr(websocket_manager, "LISTENER_RETRY_MIN_DELAY", 0.01)
+        manager = ConnectionManager()
+        client = FakeWebSocket()
+        await manager.connect(client)
+
+        await manager.start_redis_listener()
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if client.sent:
+                break
+        manager.stop_redis_listener()
+
+        assert len(subscribed) == 2
+        assert pubsubs[0].closed
+        assert client.sent == [{"type": "leaderboard_update", "data": [{"id": 1, "rank": 1}]}]
+
+class TestLeaderboardBroadcast:
+    """Тесты публикации версионированных обновлений"""
+
+    @pytest.mark.asyncio
+    async def test_second_update_contains_only_changed_rows(self, db_session, monkeypatch):
+        """Следующая версия содержит только изменившиеся строки относительно предыдущей"""
+        fake = FakePubSubRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+        users = [User(username=f"user{i}", hashed_password="x", shilka_coins=c) for i, c in enumerate([30, 20, 10])]
+        db_session.add_all(users)
+        await db_session.commit()
+
+        await stats_service.broadcast_leaderboard_update(db_session)
+        users[2].shilka_coins = 25
+        await db_session.commit()
+        await stats_service.broadcast_leaderboard_update(db_session)
+
+        first, second = (message for channel, message in fake.published if channel == "leaderboard_update")
+        assert first["version"] == 1 and first["base_version"] is None
+        assert second["version"] == 2 and second["base_version"] == 1
+        assert [(row["id"], row["rank"]) for row in second["changes"]] == [(users[2].id, 2), (users[1].id, 3)]
+        assert second["removed"] == []
+        assert len(second["data"]) == 3
+        snapshot = await stats_service.get_leaderboard_snapshot(db_session)
+        assert snapshot["version"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_snapshot_change_recomputes_changes(self, db_session, monkeypatch):
+        """Если снимок обновил другой воркер, изменения считаются от его версии, а не от прочитанной"""
+        fake = FakePubSubRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+        users = [User(username=f"user{i}", hashed_password="x", shilka_coins=c) for i, c in enumerate([30, 20])]
+        db_session.add_all(users)
+        await db_session.commit()
+        await stats_service.broadcast_leaderboard_update(db_session)
+        entries = stats_service.leaderboard_entries(users)
+        get = fake.get
+        raced = []
+
+        async def racing_get(key):
+            value = await get(key)
+            if key == SNAPSHOT_KEY and not raced:
+                # Другой воркер публикует версию 2 между чтением снимка и записью
+                raced.append(True)
+                fake.values[SNAPSHOT_KEY] = json.dumps({"version": 2, "data": [{**entries[0], "shilka_coins": 5}]})
+                fake.values["leaderboard:version"] = 2
+            return value
+
+        monkeypatch.setattr(fake, "get", racing_get)
+        fake.published.clear()
+
+        await stats_service.broadcast_leaderboard_update(db_session)
+
+        [(_, update)] = [item for item in fake.published if item[0] == "leaderboard_update"]
+        assert (update["version"], update["base_version"]) == (3, 2)
+        assert {row["id"] for row in update["changes"]} == {users[0].id, users[1].id}
+
+    @pytest.mark.asyncio
+    async def test_rank_changes_published_to_user_topics(self, db_session, monkeypatch):
+        """Изменившиеся места из топа публикуются в топики rank:<id>"""
+        fake = FakePubSubRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+        users = [User(username=f"user{i}", hashed_password="x", shilka_coins=c) for i, c in enumerate([30, 20])]
+        db_session.add_all(users)
+        await db_session.commit()
+
+        await stats_service.broadcast_leaderboard_update(db_session)
+        users[1].shilka_coins = 40
+        await db_session.commit()
+        fake.published.clear()
+        await stats_service.broadcast_leaderboard_update(db_session)
+
+        topics = {channel: message for channel, message in fake.published if channel.startswith("ws:")}
+        assert topics[f"ws:rank:{users[1].id}"]["rank"] == 1
+        assert topics[f"ws:rank:{users[0].id}"]["rank"] == 2
+
+    @pytest.mark.asyncio
+    async def test_publish_rank_update(self, db_session, monkeypatch, test_user):
+        """Место пользователя публикуется в его топик"""
+        fake = FakePubSubRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+
+        await stats_service.publish_rank_update(db_session, test_user.id)
+
+        assert fake.published == [(f"ws:rank:{test_user.id}", {
+            "type": "rank_update",
+            "topic": f"rank:{test_user.id}",
+            "user_id": test_user.id,
+            "rank": 1,
+            "shilka_coins": 100,
+        })]
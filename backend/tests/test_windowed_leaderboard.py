@@ -0,0 +1,187 @@
+"""
+Тесты для лидербордов за период (stats/windowed.py)
+"""
+import calendar
+from datetime import datetime
+
+import pytest
+
+from src.auth.models import User
+from src.redis_client import redis_client
+from src.stats.leaderboard import _member
+from src.stats.history_codec import encode_history
+from src.stats.models import CoinTransaction, TypingSession
+from src.stats.windowed import (
+    Period,
+    WindowMetric,
+    window_bounds,
+    window_bucket,
+    window_expire_at,
+    window_key,
+    windowed_leaderboard,
+)
+
+
+class FakePipeline:
+    """Пачка команд, применяемая к FakeWindowRedis при execute"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def zincrby(self, key, amount, member):
+        self.commands.append(("zincrby", key, amount, member))
+
+    def zadd(self, key, mapping, gt=False):
+        self.commands.append(("zadd", key, mapping, gt))
+
+    def expireat(self, key, when):
+        self.commands.append(("expireat", key, when))
+
+    async def execute(self):
+        for name, key, *args in self.commands:
+            zset = self.redis.sets.setdefault(key, {}) if name != "expireat" else None
+            if name == "zincrby":
+                amount, member = args
+                zset[member] = zset.get(member, 0) + amount
+            elif name == "zadd":
+                mapping, gt = args
+                for member, score in mapping.items():
+                    if not gt or score > zset.get(member, float("-inf")):
+                        zset[member] = score
+            else:
+                self.redis.expire_at[key] = args[0]
+
+
+class FakeWindowRedis:
+    """Минимальная in-memory замена Redis для оконных sorted set"""
+
+    def __init__(self):
+        self.sets = {}
+        self.expire_at = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def zrevrange(self, key, start, end, withscores=False):
+        items = sorted(self.sets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return items[start:end + 1]
+
+
+def _timestamp(*args):
+    return calendar.timegm(datetime(*args).timetuple())
+
+
+class TestWindowMath:
+    """Тесты границ, имён и истечения окон"""
+
+    def test_day_window(self):
+        """День — с полуночи до полуночи UTC"""
+        moment = datetime(2026, 10, 18, 23, 59)
+        assert window_bounds(Period.DAY, moment) == (datetime(2026, 10, 18), datetime(2026, 10, 19))
+        assert window_bucket(Period.DAY, moment) == "2026-10-18"
+
+    def test_week_window_starts_on_monday(self):
+        """Неделя — ISO-неделя с понедельника"""
+        # 18 октября 2026 — воскресенье
+        moment = datetime(2026, 10, 18, 12)
+        assert window_bounds(Period.WEEK, moment) == (datetime(2026, 10, 12), datetime(2026, 10, 19))
+        assert window_bucket(Period.WEEK, moment) == "2026-W42"
+
+    def test_week_bucket_uses_iso_year(self):
+        """Неделя на стыке лет относится к ISO-году"""
+        assert window_bucket(Period.WEEK, datetime(2027, 1, 1)) == "2026-W53"
+        assert window_bucket(Period.WEEK, datetime(2025, 12, 29)) == "2026-W01"
+
+    def test_month_window_across_year_end(self):
+        """Декабрьское окно заканчивается 1 января"""
+        moment = datetime(2026, 12, 31, 10)
+        assert window_bounds(Period.MONTH, moment) == (datetime(2026, 12, 1), datetime(2027, 1, 1))
+        assert window_bucket(Period.MONTH, moment) == "2026-12"
+
+    def test_window_key(self):
+        """Ключ содержит метрику, период и имя окна"""
+        key = window_key(WindowMetric.COINS, Period.MONTH, datetime(2026, 2, 10))
+        assert key == "leaderboard:coins:month:2026-02"
+
+    @pytest.mark.parametrize("period, moment, expected", [
+        (Period.DAY, datetime(2026, 10, 18, 5), (2026, 10, 20)),
+        (Period.WEEK, datetime(2026, 10, 18, 5), (2026, 10, 26)),
+        (Period.MONTH, datetime(2026, 1, 31), (2026, 3, 1)),
+        (Period.MONTH, datetime(2026, 12, 5), (2027, 2, 1)),
+    ])
+    def test_window_kept_until_next_window_ends(self, period, moment, expected):
+        """Окно истекает в конце следующего за ним окна"""
+        assert window_expire_at(period, moment) == _timestamp(*expected)
+
+    def test_unknown_period_rejected(self):
+        """Неизвестный период — ошибка"""
+        with pytest.raises(ValueError):
+            window_bounds("year", datetime(2026, 1, 1))
+
+
+class TestWindowedLeaderboard:
+    """Тесты обновления и чтения лидербордов за период"""
+
+    @pytest.mark.asyncio
+    async def test_record_updates_all_windows(self, monkeypatch):
+        """Транзакция попадает во все окна: монеты суммируются, скорость — лучшая"""
+        fake = FakeWindowRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+        moment = datetime(2026, 10, 18, 12)
+
+        await windowed_leaderboard.record(7, 10, 55.0, moment)
+        await windowed_leaderboard.record(7, 5, 40.0, moment)
+
+        for period in (Period.DAY, Period.WEEK, Period.MONTH):
+            assert fake.sets[window_key(WindowMetric.COINS, period, moment)][_member(7)] == 15
+            assert fake.sets[window_key(WindowMetric.WPM, period, moment)][_member(7)] == 55.0
+            assert fake.expire_at[window_key(WindowMetric.COINS, period, moment)] == window_expire_at(period, moment)
+
+    @pytest.mark.asyncio
+    async def test_page_from_redis(self, db_session, monkeypatch):
+        """Страница окна читается из sorted set"""
+        fake = FakeWindowRedis()
+        monkeypatch.setattr(redis_client, "redis", fake)
+        first, second = User(username="first", hashed_password="x"), User(username="second", hashed_password="x")
+        db_session.add_all([first, second])
+        await db_session.commit()
+        moment = datetime(2026, 10, 18, 12)
+
+        await windowed_leaderboard.record(first.id, 3, 30.0, moment)
+        await windowed_leaderboard.record(second.id, 8, 20.0, moment)
+        page = await windowed_leaderboard.page(db_session, WindowMetric.COINS, Period.WEEK, 10, moment=moment)
+
+        assert [(e["rank"], e["username"], e["score"]) for e in page] == [(1, "second", 8), (2, "first", 3)]
+
+    @pytest.mark.asyncio
+    async def test_sql_fallback_counts_only_current_window(self, db_session, test_user):
+        """Без Redis окно считается по транзакциям и сессиям за период"""
+        now = datetime(2026, 10, 18, 12)
+        for created_at, amount, wpm in ((now, 5, 60.0), (now, 7, 45.0), (datetime(2026, 10, 17, 12), 100, 90.0)):
+            session = TypingSession(
+                user_id=test_user.id, wpm=wpm, accuracy=100, words="[]", history=encode_history([]), created_at=created_at
+            )
+            db_session.add(session)
+            await db_session.flush()
+            db_session.add(CoinTransaction(
+                user_id=test_user.id, typing_session_id=session.id, amount=amount, created_at=created_at
+            ))
+        await db_session.commit()
+
+        coins = await windowed_leaderboard.page(db_session, WindowMetric.COINS, Period.DAY, 10, moment=now)
+        wpm = await windowed_leaderboard.page(db_session, WindowMetric.WPM, Period.DAY, 10, moment=now)
+        weekly = await windowed_leaderboard.page(db_session, WindowMetric.COINS, Period.WEEK, 10, moment=now)
+
+        assert [e["score"] for e in coins] == [12]
+        assert [e["score"] for e in wpm] == [60.0]
+        assert [e["score"] for e in weekly] == [112]
+
+    @pytest.mark.asyncio
+    async def test_endpoint_validates_period(self, client):
+        """Эндпоинт принимает только day, week и month"""
+        ok = await client.get("/stats/leaderboard/window/week?metric=wpm")
+        bad = await client.get("/stats/leaderboard/window/year")
+
+        assert ok.status_code == 200
+        assert bad.status_code == 422
@@ -0,0 +1,113 @@
+"""
+Тесты для лидербордов по скорости (stats/wpm_leaderboard.py)
+"""
+import pytest
+from sqlalchemy import select
+
+from src.auth.models import User
+from src.stats.history_codec import encode_history
+from src.stats.models import TypingSession, UserWpmStat
+from src.stats.wpm_leaderboard import WpmMetric, wpm_leaderboard
+
+
+async def _record(db_session, user, wpm, language="ru", typing_mode="words", test_type="time"):
+    session = TypingSession(
+        user_id=user.id, wpm=wpm, accuracy=100, duration=30, words="[]", history=encode_history([]),
+        language=language, typing_mode=typing_mode, test_type=test_type,
+    )
+    db_session.add(session)
+    await wpm_leaderboard.record_session(db_session, session)
+    await db_session.commit()
+    return session
+
+
+async def _create_users(db_session, count):
+    users = [User(username=f"typist{i}", hashed_password="x") for i in range(count)]
+    db_session.add_all(users)
+    await db_session.commit()
+    return users
+
+
+class TestWpmLeaderboard:
+    """Тесты агрегатов и выборки лидерборда по скорости"""
+
+    @pytest.mark.asyncio
+    async def test_record_session_updates_best_and_average(self, db_session, test_user):
+        """UPSERT накапливает количество, сумму, среднее и лучший результат"""
+        for wpm in (40, 60, 50):
+            await _record(db_session, test_user, wpm)
+
+        stat = (await db_session.execute(select(UserWpmStat))).scalar_one()
+        assert stat.sessions_count == 3
+        assert stat.best_wpm == 60
+        assert stat.avg_wpm == pytest.approx(50)
+
+    @pytest.mark.asyncio
+    async def test_incomplete_session_is_not_counted(self, db_session, test_user):
+        """Сессия без языка, режима или типа теста не попадает в категории"""
+        await _record(db_session, test_user, 80, test_type=None)
+
+        assert (await db_session.execute(select(UserWpmStat))).first() is None
+
+    @pytest.mark.asyncio
+    async def test_page_orders_by_metric_within_category(self, db_session):
+        """Лидерборд категории упорядочен по выбранной метрике, другие категории не мешают"""
+        fast, steady, other = await _create_users(db_session, 3)
+        await _record(db_session, fast, 100)
+        await _record(db_session, fast, 20)
+        await _record(db_session, steady, 70)
+        await _record(db_session, other, 150, language="en")
+
+        best = await wpm_leaderboard.page(db_session, WpmMetric.BEST, "ru", "words", "time", 10)
+        average = await wpm_leaderboard.page(db_session, WpmMetric.AVERAGE, "ru", "words", "time", 10)
+
+        assert [(e["rank"], e["id"]) for e in best] == [(1, fast.id), (2, steady.id)]
+        assert [e["id"] for e in average] == [steady.id, fast.id]
+        assert average[1]["avg_wpm"] == 60
+
+    @pytest.mark.asyncio
+    async def test_refresh_after_session_deleted(self, db_session, test_user):
+        """После удаления сессии агрегаты пересчитываются по оставшимся"""
+        await _record(db_session, test_user, 40)
+        best = await _record(db_session, test_user, 90)
+
+        await db_session.delete(best)
+        await db_session.flush()
+        await wpm_leaderboard.refresh(db_session, test_user.id, "ru", "words", "time")
+        await db_session.commit()
+
+        stat = (await db_session.execute(select(UserWpmStat))).scalar_one()
+        assert (stat.sessions_count, stat.best_wpm) == (1, 40)
+
+
+class TestWpmLeaderboardEndpoint:
+    """Тесты REST-доступа к лидерборду по скорости"""
+
+    @pytest.mark.asyncio
+    async def test_session_appears_in_wpm_leaderboard(self, authenticated_client, test_user):
+        """Сохранённая сессия сразу видна в лидерборде своей категории"""
+        payload = {
+            "words": ["привет", "мир"],
+            "history": [[{"char": c, "correct": True, "time": 100} for c in "привет"]],
+            "duration": 30,
+            "mode": "words",
+            "language": "ru",
+            "testType": "time",
+        }
+        created = await authenticated_client.post("/stats/typing-session", json=payload)
+
+        response = await authenticated_client.get(
+            "/stats/leaderboard/wpm?language=ru&mode=words&testType=time&metric=best"
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [(e["id"], e["rank"]) for e in data] == [(test_user.id, 1)]
+        assert data[0]["best_wpm"] == created.json()["wpm"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_metric_rejected(self, client):
+        """Неизвестная метрика отклоняется валидацией"""
+        response = await client.get("/stats/leaderboard/wpm?language=ru&mode=words&testType=time&metric=median")
+
+        assert response.status_code == 422
@@ -51,15 +51,61 @@ export const getRandomSentences = async (
   return response.data;
 };
 
+export interface IngestionJob {
+  id: string;
+  status: "queued" | "running" | "done" | "failed";
+  language: string;
+  total_chars: number;
+  processed_chars: number;
+  progress: number;
+  words_processed: number;
+  words_per_second: number;
+  words_created: number;
+  sentences_created: number;
+  error: string | null;
+}
+
+// Как часто опрашивать состояние фоновой загрузки (мс)
+const JOB_POLL_INTERVAL_MS = 1000;
+
+/**
+ * Получить состояние фоновой загрузки текста (только для админов)
+ */
+export const getIngestionJob = async (jobId: string): Promise<IngestionJob> => {
+  const response = await myapiInstance.get<IngestionJob>(
+    `/content/jobs/${jobId}`
+  );
+  return response.data;
+};
+
 /**
  * Загрузить текст на сервер (только для админов)
+ *
+ * Текст ставится в фоновую очередь (POST /content/jobs), после чего состояние
+ * задачи опрашивается до завершения: большой текст не упирается в таймаут
+ * одного HTTP-запроса.
  */
 export const uploadText = async (
-  payload: TextUploadRequest
+  payload: TextUploadRequest,
+  onProgress?: (job: IngestionJob) => void
 ): Promise<TextUploadResponse> => {
-  const response = await myapiInstance.post<TextUploadResponse>(
-    "/content/upload",
+  const created = await myapiInstance.post<IngestionJob>(
+    "/content/jobs",
     payload
   );
-  return response.data;
+  let job = created.data;
+  while (job.status === "queued" || job.status === "running") {
+    onProgress?.(job);
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    job = await getIngestionJob(job.id);
+  }
+  if (job.status === "failed") {
+    throw new Error(job.error || "Ingestion job failed");
+  }
+  return {
+    message: `Successfully processed: ${job.words_created} words, ${job.sentences_created} sentences`,
+    words_created: job.words_created,
+    sentences_created: job.sentences_created,
+    language: job.language,
+  };
 };
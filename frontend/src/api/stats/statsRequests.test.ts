@@ -2,6 +2,7 @@ import { describe, it, expect, vi, beforeEach } from "vitest";
 import {
   addCoins,
   fetchLeaderboard,
+  fetchLeaderboardPosition,
   postWordHistory,
   fetchTypingSessions,
 } from "./statsRequests";
@@ -46,6 +47,20 @@ describe("statsRequests", () => {
     });
   });
 
+  describe("fetchLeaderboardPosition", () => {
+    it("должен отправлять GET запрос на /stats/leaderboard/me", async () => {
+      const mockPosition = { rank: 150, shilka_coins: 20, neighbors: [] };
+      vi.mocked(myapiInstance.get).mockResolvedValue({ data: mockPosition });
+
+      const result = await fetchLeaderboardPosition();
+
+      expect(myapiInstance.get).toHaveBeenCalledWith("/stats/leaderboard/me", {
+        params: { radius: 0 },
+      });
+      expect(result).toEqual(mockPosition);
+    });
+  });
+
   describe("postWordHistory", () => {
     it("должен отправлять POST запрос с payload", async () => {
       const payload = {
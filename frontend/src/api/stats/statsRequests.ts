@@ -1,5 +1,6 @@
 import { myapiInstance } from "..";
 import type { CharErrorResponse } from "../../types/CharErrorResponse";
+import type { LeaderboardPosition } from "../../types/LeaderboardPosition";
 import type { TypingSession } from "../../types/TypingSession";
 import type { WordHistoryPayload } from "../../types/WordHistoryPayload";
 
@@ -13,6 +14,15 @@ export const fetchLeaderboard = async () => {
   return response.data;
 };
 
+// Место текущего пользователя: лидерборд отдаёт только топ
+export const fetchLeaderboardPosition =
+  async (): Promise<LeaderboardPosition> => {
+    const response = await myapiInstance.get(`/stats/leaderboard/me`, {
+      params: { radius: 0 },
+    });
+    return response.data;
+  };
+
 export const postWordHistory = async (payload: WordHistoryPayload) => {
   const response = await myapiInstance.post(`/stats/typing-session`, payload);
   return response.data;
@@ -33,6 +33,7 @@ const ContentUploadModal: React.FC<ContentUploadModalProps> = ({
   const [rawText, setRawText] = useState("");
   const [language, setLanguage] = useState<"ru" | "en">(defaultLanguage);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState<number | null>(null);
   const ref = useRef<HTMLTextAreaElement | null>(null);
 
   const handleUpload = async () => {
@@ -43,10 +44,13 @@ const ContentUploadModal: React.FC<ContentUploadModalProps> = ({
 
     setLoading(true);
     try {
-      const response = await uploadText({
-        raw_text: rawText,
-        language,
-      });
+      const response = await uploadText(
+        {
+          raw_text: rawText,
+          language,
+        },
+        (job) => setProgress(job.progress)
+      );
 
       console.log("Upload success:", response);
       alert(
@@ -60,6 +64,7 @@ const ContentUploadModal: React.FC<ContentUploadModalProps> = ({
       alert("Ошибка при загрузке текста");
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -149,6 +154,12 @@ const ContentUploadModal: React.FC<ContentUploadModalProps> = ({
                   <Text fontSize="xs" opacity={0.6}>
                     Примечание: дубликаты будут автоматически пропущены
                   </Text>
+
+                  {progress !== null && (
+                    <Text fontSize="sm">
+                      Обработано: {Math.round(progress * 100)}%
+                    </Text>
+                  )}
                 </VStack>
               </DialogBody>
 
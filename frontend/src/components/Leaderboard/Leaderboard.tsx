@@ -2,14 +2,21 @@ import { Box, type BoxProps, Text } from "@chakra-ui/react";
 import React from "react";
 import { LEADERBOARD_CONFIG } from "../../config/constants";
 import { useAppSelector } from "../../store";
+import type { LeaderboardPosition } from "../../types/LeaderboardPosition";
 import type { Me } from "../../types/User";
 import { LeaderboardItem } from "../LeaderboardItem/LeaderboardItem";
 
 export interface LeaderboardProps extends BoxProps {
   leaderboard: Me[];
+  // Место текущего пользователя, если он не попал в загруженный топ
+  currentUserPosition?: LeaderboardPosition | null;
 }
 
-const Leaderboard: React.FC<LeaderboardProps> = ({ leaderboard, ...rest }) => {
+const Leaderboard: React.FC<LeaderboardProps> = ({
+  leaderboard,
+  currentUserPosition,
+  ...rest
+}) => {
   const currentUser = useAppSelector((state) => state.user.user);
 
   // Храним предыдущие позиции пользователей для анимации
@@ -30,7 +37,16 @@ const Leaderboard: React.FC<LeaderboardProps> = ({ leaderboard, ...rest }) => {
 
   // Используем useMemo для оптимизации вычислений
   const { topUsers, currentUserIndex, showCurrentUser } = React.useMemo(() => {
-    const userIndex = leaderboard.findIndex((u) => u.id === currentUser?.id);
+    let userIndex = leaderboard.findIndex((u) => u.id === currentUser?.id);
+    let userRow = currentUser;
+    // Лидерборд содержит только топ: место остальных берём из /stats/leaderboard/me
+    if (userIndex === -1 && currentUser && currentUserPosition?.rank) {
+      userIndex = currentUserPosition.rank - 1;
+      userRow = {
+        ...currentUser,
+        shilka_coins: currentUserPosition.shilka_coins,
+      };
+    }
     const isUserBelowTop = userIndex > LEADERBOARD_CONFIG.TOP_USERS_COUNT;
 
     return {
@@ -43,9 +59,9 @@ const Leaderboard: React.FC<LeaderboardProps> = ({ leaderboard, ...rest }) => {
         )
         .filter((u) => u && typeof u.id === "number" && !!u.username),
       currentUserIndex: userIndex,
-      showCurrentUser: isUserBelowTop && currentUser,
+      showCurrentUser: isUserBelowTop && userRow,
     };
-  }, [leaderboard, currentUser]);
+  }, [leaderboard, currentUser, currentUserPosition]);
 
   // Отслеживаем изменения позиций и монет
   React.useEffect(() => {
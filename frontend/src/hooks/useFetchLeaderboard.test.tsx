@@ -1,7 +1,10 @@
 import { describe, it, expect, vi, beforeEach } from "vitest";
 import { renderHook, waitFor } from "@testing-library/react";
 import useFetchLeaderboard from "./useFetchLeaderboard";
-import { fetchLeaderboard } from "../api/stats/statsRequests";
+import {
+  fetchLeaderboard,
+  fetchLeaderboardPosition,
+} from "../api/stats/statsRequests";
 
 // Мокируем API запросы
 vi.mock("../api/stats/statsRequests");
@@ -55,4 +58,20 @@ describe("useFetchLeaderboard", () => {
       "Не удалось загрузить список лидеров: Network error"
     );
   });
+
+  it("должен загружать место пользователя вне топа", async () => {
+    vi.mocked(fetchLeaderboard).mockResolvedValue([]);
+    vi.mocked(fetchLeaderboardPosition).mockResolvedValue({
+      rank: 150,
+      shilka_coins: 20,
+    });
+
+    const { result } = renderHook(() =>
+      useFetchLeaderboard({ enableWebSocket: false, userId: 7 })
+    );
+
+    await waitFor(() => {
+      expect(result.current.position).toEqual({ rank: 150, shilka_coins: 20 });
+    });
+  });
 });
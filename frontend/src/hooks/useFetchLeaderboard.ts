@@ -1,15 +1,24 @@
 import React from "react";
+import type { LeaderboardPosition } from "../types/LeaderboardPosition";
 import type { Me } from "../types/User";
-import { fetchLeaderboard } from "../api/stats/statsRequests";
+import {
+  fetchLeaderboard,
+  fetchLeaderboardPosition,
+} from "../api/stats/statsRequests";
 import { useLeaderboardWebSocket } from "./useLeaderboardWebSocket";
 
 interface UseFetchLeaderboardOptions {
   enableWebSocket?: boolean;
+  // Текущий пользователь: его место загружается отдельно, т.к. лидерборд отдаёт только топ
+  userId?: number;
 }
 
 const useFetchLeaderboard = (options: UseFetchLeaderboardOptions = {}) => {
-  const { enableWebSocket = true } = options;
+  const { enableWebSocket = true, userId } = options;
   const [leaderboard, setLeaderboard] = React.useState<Me[]>([]);
+  const [position, setPosition] = React.useState<LeaderboardPosition | null>(
+    null
+  );
   const [isLoading, setIsLoading] = React.useState(false);
   const [error, setError] = React.useState<string | null>(null);
 
@@ -31,6 +40,22 @@ const useFetchLeaderboard = (options: UseFetchLeaderboardOptions = {}) => {
     loadLeaderboard();
   }, []);
 
+  React.useEffect(() => {
+    if (userId === undefined) return;
+
+    const loadPosition = async () => {
+      try {
+        const data = await fetchLeaderboardPosition();
+        setPosition({ rank: data.rank, shilka_coins: data.shilka_coins });
+      } catch {
+        // Без места пользователя лидерборд показывает только топ
+        setPosition(null);
+      }
+    };
+
+    loadPosition();
+  }, [userId]);
+
   // WebSocket для real-time обновлений
   const handleLeaderboardUpdate = React.useCallback((data: Me[]) => {
     console.log(
@@ -43,10 +68,12 @@ const useFetchLeaderboard = (options: UseFetchLeaderboardOptions = {}) => {
 
   const { isConnected: wsConnected } = useLeaderboardWebSocket({
     onLeaderboardUpdate: handleLeaderboardUpdate,
+    rankUserId: userId,
+    onRankUpdate: setPosition,
     enabled: enableWebSocket,
   });
 
-  return { leaderboard, isLoading, error, wsConnected };
+  return { leaderboard, position, isLoading, error, wsConnected };
 };
 
 export default useFetchLeaderboard;
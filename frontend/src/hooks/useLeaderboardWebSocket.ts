@@ -1,22 +1,35 @@
 import { useEffect, useRef, useState, useCallback } from "react";
+import type { LeaderboardPosition } from "../types/LeaderboardPosition";
 import type { Me } from "../types/User";
 import { logger } from "../utils/logger";
 
 interface WebSocketMessage {
-  type: "leaderboard_update" | "ping" | "pong" | "error";
+  type:
+    | "leaderboard_update"
+    | "rank_update"
+    | "subscribed"
+    | "ping"
+    | "pong"
+    | "error";
   data?: Me[];
   message?: string;
+  rank?: number | null;
+  shilka_coins?: number;
 }
 
 interface UseLeaderboardWebSocketOptions {
   onLeaderboardUpdate?: (leaderboard: Me[]) => void;
+  // Пользователь, место которого нужно получать (топик rank:<id>)
+  rankUserId?: number;
+  onRankUpdate?: (position: LeaderboardPosition) => void;
   enabled?: boolean;
 }
 
 export const useLeaderboardWebSocket = (
   options: UseLeaderboardWebSocketOptions = {}
 ) => {
-  const { onLeaderboardUpdate, enabled = true } = options;
+  const { onLeaderboardUpdate, rankUserId, onRankUpdate, enabled = true } =
+    options;
   const [isConnected, setIsConnected] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const wsRef = useRef<WebSocket | null>(null);
@@ -81,6 +94,13 @@ export const useLeaderboardWebSocket = (
         setError(null);
         reconnectAttemptsRef.current = 0;
 
+        // Место пользователя приходит сразу после подписки и при каждом изменении
+        if (rankUserId !== undefined) {
+          ws.send(
+            JSON.stringify({ type: "subscribe", topic: `rank:${rankUserId}` })
+          );
+        }
+
         // Запускаем ping для поддержания соединения
         pingIntervalRef.current = setInterval(() => {
           if (ws.readyState === WebSocket.OPEN) {
@@ -110,6 +130,19 @@ export const useLeaderboardWebSocket = (
               }
               break;
 
+            case "rank_update":
+              if (onRankUpdate) {
+                onRankUpdate({
+                  rank: message.rank ?? null,
+                  shilka_coins: message.shilka_coins ?? 0,
+                });
+              }
+              break;
+
+            case "subscribed":
+              logger.debug("Subscribed to WebSocket topic");
+              break;
+
             case "ping":
               // Отвечаем на ping от сервера
               ws.send(JSON.stringify({ type: "pong" }));
@@ -168,7 +201,13 @@ export const useLeaderboardWebSocket = (
       logger.error("Error creating WebSocket:", err);
       setError("Failed to create WebSocket connection");
     }
-  }, [enabled, getWebSocketUrl, onLeaderboardUpdate]);
+  }, [
+    enabled,
+    getWebSocketUrl,
+    onLeaderboardUpdate,
+    rankUserId,
+    onRankUpdate,
+  ]);
 
   const reconnect = useCallback(() => {
     disconnect();
@@ -21,8 +21,11 @@ const Stats = () => {
     loadMore: loadMoreSessions,
     hasMore: hasMoreSessions,
   } = useFetchSessions();
-  const { leaderboard, isLoading: isLoadingLeaderboard } =
-    useFetchLeaderboard();
+  const {
+    leaderboard,
+    position,
+    isLoading: isLoadingLeaderboard,
+  } = useFetchLeaderboard({ userId: user?.id });
   const totalStats = calculateTotalStats(sessions);
 
   useEffect(() => {
@@ -51,7 +54,7 @@ const Stats = () => {
 
       {/* Leaderboard - левая колонка (3 из 12) на десктопе, полная ширина на мобильных */}
       <GridItem colSpan={{ base: 12, lg: 4 }} rowSpan={{ base: "auto", lg: 2 }}>
-        <Leaderboard leaderboard={leaderboard} />
+        <Leaderboard leaderboard={leaderboard} currentUserPosition={position} />
       </GridItem>
 
       {/* StatsChart - правая верхняя часть (9 из 12) */}
@@ -0,0 +1,4 @@
+export type LeaderboardPosition = {
+  rank: number | null;
+  shilka_coins: number;
+};